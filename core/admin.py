@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import BotIdentity
+
+
+@admin.register(BotIdentity)
+class BotIdentityAdmin(admin.ModelAdmin):
+    list_display = ("phone_number", "user", "household", "is_active")
+    list_filter = ("household", "is_active")
+    search_fields = ("phone_number", "user__username")
+    ordering = ("phone_number",)
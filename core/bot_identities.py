@@ -0,0 +1,66 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .households import resolve_household
+from .metrics import record_cache
+from .models import BotIdentity
+
+logger = logging.getLogger(__name__)
+
+BOT_IDENTITY_CACHE_TIMEOUT = 300
+_SOURCE_IDENTITY = "identity"
+_SOURCE_LEGACY = "legacy"
+_SOURCE_UNKNOWN = "unknown"
+
+
+def _identity_key(phone_number):
+    return f"bot-identity:{phone_number}"
+
+
+def _legacy_stamp():
+    # Entradas do modo antigo dependem das configurações; um deploy que as muda invalida o cache.
+    return (settings.FINANCE_BOT_USER_ID, tuple(settings.TWILIO_ALLOWED_NUMBERS))
+
+
+def _resolve_from_db(phone_number):
+    identity = (
+        BotIdentity.objects.filter(phone_number=phone_number, is_active=True, user__is_active=True)
+        .values_list("user_id", "household_id")
+        .first()
+    )
+    if identity:
+        return _SOURCE_IDENTITY, *identity
+    if phone_number not in settings.TWILIO_ALLOWED_NUMBERS:
+        return _SOURCE_UNKNOWN, None, None
+    # Modo antigo: números de TWILIO_ALLOWED_NUMBERS usam o usuário FINANCE_BOT_USER_ID.
+    user = User.objects.filter(pk=settings.FINANCE_BOT_USER_ID).first()
+    if user is None:
+        logger.error(f"Usuário principal do bot (ID: {settings.FINANCE_BOT_USER_ID}) não foi encontrado no banco de dados.")
+        return _SOURCE_UNKNOWN, None, None
+    household = resolve_household(user)[0]
+    return _SOURCE_LEGACY, user.id, household.id if household else None
+
+
+def resolve_bot_identity(phone_number):
+    """
+    Retorna (id do usuário, id da casa) do número que escreveu para o bot, ou
+    (None, None) se não for autorizado. Fica em cache por número até o mapeamento
+    mudar, então uma mensagem com o cache quente não faz nenhuma query de identidade.
+    Só ids vão para o cache: nada de objetos User (com o hash da senha) nem dados velhos.
+    """
+    key = _identity_key(phone_number)
+    cached = cache.get(key)
+    hit = cached is not None and (cached[0] != _SOURCE_LEGACY or cached[3] == _legacy_stamp())
+    record_cache("bot_identity", hit)
+    if hit:
+        return cached[1], cached[2]
+    source, user_id, household_id = _resolve_from_db(phone_number)
+    cache.set(key, (source, user_id, household_id, _legacy_stamp()), BOT_IDENTITY_CACHE_TIMEOUT)
+    return user_id, household_id
+
+
+def invalidate_bot_identities(*phone_numbers):
+    cache.delete_many([_identity_key(phone_number) for phone_number in phone_numbers])
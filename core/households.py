@@ -1,29 +1,62 @@
+from django.core.cache import cache
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.views import View
 
+from .metrics import record_cache
 from .models import HouseholdMembership
 
+ROLE_PRIMARY = "primary"
+ROLE_MEMBER = "member"
+HOUSEHOLD_CACHE_TIMEOUT = 300
+
+
+def _resolution_key(user_id):
+    return f"household-resolution:{user_id}"
 
-def get_current_household(request):
-    if not request.user.is_authenticated:
-        return None
 
+def _resolve_from_db(user):
     membership = (
         HouseholdMembership.objects.select_related("household")
-        .filter(user=request.user, is_primary=True)
+        .filter(user=user, is_primary=True)
         .first()
     )
     if membership:
-        return membership.household
+        return membership.household, ROLE_PRIMARY
 
     fallback = (
         HouseholdMembership.objects.select_related("household")
-        .filter(user=request.user)
+        .filter(user=user)
         .first()
     )
-    return fallback.household if fallback else None
+    return (fallback.household, ROLE_MEMBER) if fallback else (None, None)
+
+
+def resolve_household(user):
+    """
+    Retorna (household, papel) do usuário, guardado em cache por usuário até que
+    uma associação ou a própria casa mude. `date_joined` diferencia ids reaproveitados.
+    """
+    if not user.is_authenticated:
+        return None, None
+    stamp = user.date_joined.timestamp()
+    cached = cache.get(_resolution_key(user.pk))
+    hit = bool(cached) and cached[0] == stamp
+    record_cache("household", hit)
+    if hit:
+        return cached[1], cached[2]
+    household, role = _resolve_from_db(user)
+    cache.set(_resolution_key(user.pk), (stamp, household, role), HOUSEHOLD_CACHE_TIMEOUT)
+    return household, role
+
+
+def invalidate_household_resolution(*user_ids):
+    cache.delete_many([_resolution_key(user_id) for user_id in user_ids])
+
+
+def get_current_household(request):
+    return resolve_household(request.user)[0]
 
 
 class HouseholdRequiredMixin(View):
@@ -0,0 +1,188 @@
+"""
+Gravação em lote dos SystemLog.
+
+Os registros entram numa fila em memória e uma thread em segundo plano grava com
+`bulk_create` quando a fila enche ou a cada poucos segundos. Erros repetidos (mesmo
+fingerprint) só somam ocorrências na linha ainda pendente. Se o banco estiver
+fora, o lote vai para um arquivo local (JSON por linha) que o comando
+`ingest_system_log_spool` importa depois.
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import deque
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .log_fingerprint import error_fingerprint
+from .models import SystemLog
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = 50
+FLUSH_INTERVAL = 2.0
+SPOOL_SUFFIX = ".jsonl"
+
+
+def spool_dir() -> Path:
+    configured = getattr(settings, "SYSTEM_LOG_SPOOL_DIR", None)
+    return Path(configured) if configured else Path(tempfile.gettempdir()) / "financeirov2-log-spool"
+
+
+def is_buffered() -> bool:
+    return getattr(settings, "SYSTEM_LOG_BUFFERED", False)
+
+
+def _to_model(record) -> SystemLog:
+    created_at = parse_datetime(record["created_at"]) or timezone.now()
+    return SystemLog(
+        level=record["level"],
+        source=record["source"],
+        message=record["message"][:255],
+        details=record.get("details", ""),
+        created_at=created_at,
+        last_seen_at=created_at,
+        fingerprint=record.get("fingerprint", ""),
+        occurrences=record.get("occurrences", 1),
+    )
+
+
+def _save_grouped(logs) -> None:
+    """
+    Logs com fingerprint viram uma linha só: se já existe uma pendente, soma as
+    ocorrências e avança last_seen_at; senão cria uma com o total do lote.
+    """
+    fresh, groups = [], {}
+    for log in logs:
+        if not log.fingerprint:
+            fresh.append(log)
+            continue
+        first = groups.get(log.fingerprint)
+        if first is None:
+            groups[log.fingerprint] = log
+        else:
+            first.occurrences += log.occurrences
+            first.last_seen_at = max(first.last_seen_at, log.last_seen_at)
+    open_logs = dict(
+        SystemLog.objects.filter(fingerprint__in=list(groups), is_resolved=Value(False)).values_list(
+            "fingerprint", "id"
+        )
+    )
+    for fingerprint, log in groups.items():
+        if fingerprint not in open_logs:
+            fresh.append(log)
+            continue
+        SystemLog.objects.filter(pk=open_logs[fingerprint]).update(
+            occurrences=F("occurrences") + log.occurrences,
+            last_seen_at=Greatest(F("last_seen_at"), Value(log.last_seen_at)),
+        )
+    SystemLog.objects.bulk_create(fresh)
+
+
+def spool_records(records) -> Path:
+    directory = spool_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"systemlog-{os.getpid()}{SPOOL_SUFFIX}"
+    with path.open("a", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return path
+
+
+def write_records(records) -> int:
+    """Grava os registros no banco; se falhar, manda para o spool local."""
+    if not records:
+        return 0
+    try:
+        with transaction.atomic():
+            _save_grouped([_to_model(record) for record in records])
+        return len(records)
+    except DatabaseError:
+        logger.warning("Banco indisponível; %d log(s) enviados para o spool.", len(records))
+        try:
+            spool_records(records)
+        except OSError:
+            logger.exception("Falha ao gravar o spool de logs.")
+        return 0
+
+
+class SystemLogBuffer:
+    def __init__(self, max_size=FLUSH_SIZE, interval=FLUSH_INTERVAL):
+        self.max_size = max_size
+        self.interval = interval
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def enqueue(self, level, source, message, details="", occurrences=1, fingerprint=None):
+        record = {
+            "level": level,
+            "source": source,
+            "message": message[:255],
+            "details": details,
+            "created_at": timezone.now().isoformat(),
+            "fingerprint": fingerprint if fingerprint is not None else error_fingerprint(level, source, message, details),
+            "occurrences": occurrences,
+        }
+        if not is_buffered():
+            write_records([record])
+            return
+        with self._lock:
+            self._queue.append(record)
+            full = len(self._queue) >= self.max_size
+        if self.interval is None:
+            if full:
+                self.flush()
+            return
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        with self._lock:
+            records = list(self._queue)
+            self._queue.clear()
+        return write_records(records)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="systemlog-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Falha ao gravar logs em lote.")
+            finally:
+                # A thread tem conexões próprias; não deixa nenhuma aberta entre os lotes.
+                connections.close_all()
+
+
+system_log_buffer = SystemLogBuffer()
+atexit.register(system_log_buffer.flush)
+
+
+def enqueue_system_log(level, source, message, details="", occurrences=1, fingerprint=None):
+    """`fingerprint` substitui o calculado a partir da mensagem (ex.: queries lentas agrupam pelo SQL)."""
+    system_log_buffer.enqueue(level, source, message, details, occurrences, fingerprint)
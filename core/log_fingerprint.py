@@ -0,0 +1,55 @@
+import hashlib
+import re
+from pathlib import PurePosixPath
+from urllib.parse import urlparse
+
+from .models import SystemLog
+
+TOP_FRAMES = 3
+# Logs INFO são registros de auditoria (ex.: mensagens do webhook) e não são agrupados.
+GROUPED_LEVELS = {SystemLog.LEVEL_ERROR, SystemLog.LEVEL_WARNING}
+
+_PY_FRAME = re.compile(r'File "([^"]+)", line \d+, in (\S+)')
+_JS_FRAME = re.compile(r"at (?:(\S+) \()?([^\s()]+?):\d+:\d+\)?")
+_EXC_TYPE = re.compile(r"^\s*([A-Za-z_][\w.]*(?:Error|Exception|Warning|Interrupt|Exit))\b(?::|$)", re.MULTILINE)
+
+_UUID = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE)
+_HEX = re.compile(r"\b0x[0-9a-f]+\b", re.IGNORECASE)
+_QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Troca ids, endereços, valores entre aspas e números por `?`, para agrupar a mesma falha."""
+    normalized = _UUID.sub("?", message)
+    normalized = _HEX.sub("?", normalized)
+    normalized = _QUOTED.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip().lower()
+
+
+def _frame_file(path: str) -> str:
+    # Só o nome do arquivo: o caminho muda entre deploys e a query string muda a cada build do frontend.
+    return PurePosixPath(urlparse(path).path.replace("\\", "/")).name
+
+
+def top_frames(details: str) -> tuple[str, list[str]]:
+    """Tipo da exceção e as funções mais internas do traceback (Python ou stack do navegador)."""
+    python_frames = _PY_FRAME.findall(details)
+    types = _EXC_TYPE.findall(details)
+    if python_frames:
+        frames = [f"{_frame_file(path)}:{func}" for path, func in python_frames[-TOP_FRAMES:]]
+        return (types[-1] if types else ""), frames
+    js_frames = _JS_FRAME.findall(details)
+    frames = [f"{_frame_file(path)}:{func or '?'}" for func, path in js_frames[:TOP_FRAMES]]
+    return (types[0] if types else ""), frames
+
+
+def error_fingerprint(level, source, message, details="") -> str:
+    """Fingerprint de erros e avisos; vazio para os níveis que não são agrupados."""
+    if level not in GROUPED_LEVELS:
+        return ""
+    exc_type, frames = top_frames(details or "")
+    parts = [level, source, exc_type, normalize_message(message or ""), *frames]
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,79 @@
+"""
+Retenção dos SystemLog por nível.
+
+Os logs vencidos são removidos em lotes de ids vencidos com transações curtas,
+para não segurar o lock da tabela num DELETE gigante. Antes de apagar cada lote,
+a contagem diária é somada em SystemLogDailySummary.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import SystemLog, SystemLogDailySummary
+
+CHUNK_SIZE = 1000
+DEFAULT_RETENTION_DAYS = {
+    SystemLog.LEVEL_INFO: 7,
+    SystemLog.LEVEL_WARNING: 30,
+    SystemLog.LEVEL_PERF: 30,
+    SystemLog.LEVEL_ERROR: 180,
+}
+
+
+def retention_days() -> dict:
+    return {**DEFAULT_RETENTION_DAYS, **getattr(settings, "SYSTEM_LOG_RETENTION_DAYS", {})}
+
+
+def _expired(level, cutoff):
+    # Usa last_seen_at para não apagar um erro que continua acontecendo; o filtro em
+    # created_at (nunca maior que last_seen_at) só existe para aproveitar o índice (level, created_at).
+    return SystemLog.objects.filter(level=level, created_at__lt=cutoff, last_seen_at__lt=cutoff)
+
+
+def _summarize(level, logs) -> None:
+    rows = logs.annotate(day=TruncDate("created_at")).values("day", "source").annotate(total=Sum("occurrences"))
+    for row in rows:
+        updated = SystemLogDailySummary.objects.filter(date=row["day"], level=level, source=row["source"]).update(
+            count=F("count") + row["total"]
+        )
+        if not updated:
+            SystemLogDailySummary.objects.create(
+                date=row["day"], level=level, source=row["source"], count=row["total"]
+            )
+
+
+def purge_expired_logs(windows=None, chunk_size=CHUNK_SIZE, pause=0.0, now=None) -> dict:
+    """
+    Remove os logs vencidos de cada nível em lotes de até `chunk_size` logs, cada um
+    na sua transação, dormindo `pause` segundos entre eles. Retorna o total removido por nível.
+    """
+    windows = windows or retention_days()
+    now = now or timezone.now()
+    deleted = {}
+    for level, days in windows.items():
+        expired = _expired(level, now - timedelta(days=days))
+        deleted[level] = 0
+        start = None
+        while True:
+            # Pula direto para os próximos ids vencidos: num nível esparso (poucos ERRO
+            # entre milhões de INFO) não há transações vazias entre eles.
+            pending = expired.filter(id__gte=start) if start is not None else expired
+            ids = list(pending.order_by("id").values_list("id", flat=True)[:chunk_size])
+            if not ids:
+                break
+            chunk = expired.filter(id__gte=ids[0], id__lte=ids[-1])
+            with transaction.atomic():
+                _summarize(level, chunk)
+                count, _ = chunk.delete()
+            deleted[level] += count
+            if len(ids) < chunk_size:
+                break
+            start = ids[-1] + 1
+            if pause:
+                time.sleep(pause)
+    return deleted
@@ -1,9 +1,6 @@
-from datetime import timedelta
-
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 
-from core.models import SystemLog
+from core.log_retention import CHUNK_SIZE, purge_expired_logs, retention_days
 
 
 class Command(BaseCommand):
@@ -13,12 +10,26 @@ class Command(BaseCommand):
         parser.add_argument(
             "--days",
             type=int,
-            default=30,
-            help="Remove logs com mais de X dias (padrão: 30).",
+            help="Remove logs de todos os níveis com mais de X dias (padrão: SYSTEM_LOG_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help=f"Logs apagados por transação (padrão: {CHUNK_SIZE}).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Segundos de espera entre os lotes, para limitar a carga no banco.",
         )
 
     def handle(self, *args, **options):
-        days = options["days"]
-        cutoff = timezone.now() - timedelta(days=days)
-        deleted, _ = SystemLog.objects.filter(created_at__lt=cutoff).delete()
-        self.stdout.write(self.style.SUCCESS(f"{deleted} logs antigos removidos."))
+        windows = retention_days()
+        if options["days"] is not None:
+            windows = {level: options["days"] for level in windows}
+        deleted = purge_expired_logs(windows, chunk_size=options["chunk_size"], pause=options["pause"])
+        for level, count in deleted.items():
+            self.stdout.write(f"{level}: {count} removidos (retenção de {windows[level]} dias).")
+        self.stdout.write(self.style.SUCCESS(f"{sum(deleted.values())} logs antigos removidos."))
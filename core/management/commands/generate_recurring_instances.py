@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from finance.models import RecurringRule
-from finance.services import generate_recurring_instances
+from finance.services import generate_recurring_instances_for_rules
 
 
 class Command(BaseCommand):
@@ -12,8 +12,5 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         months_ahead = options["months_ahead"]
-        created_total = 0
-        for rule in RecurringRule.objects.filter(active=True):
-            created = generate_recurring_instances(rule, months_ahead)
-            created_total += len(created)
-        self.stdout.write(self.style.SUCCESS(f"Instâncias criadas: {created_total}"))
+        created = generate_recurring_instances_for_rules(RecurringRule.objects.filter(active=True), months_ahead)
+        self.stdout.write(self.style.SUCCESS(f"Instâncias criadas: {len(created)}"))
@@ -0,0 +1,64 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.log_buffer import SPOOL_SUFFIX, spool_dir, write_records
+
+CLAIMED_SUFFIX = ".ingesting"
+REJECTED_SUFFIX = ".rejected"
+REQUIRED_KEYS = {"level", "source", "message", "created_at"}
+
+
+def _parse_lines(path):
+    """Separa as linhas válidas das corrompidas (ex.: escrita parcial quando o processo caiu)."""
+    records, rejected = [], []
+    for line in path.read_text(encoding="utf-8", errors="replace").splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            rejected.append(line)
+            continue
+        if isinstance(record, dict) and REQUIRED_KEYS <= record.keys():
+            records.append(record)
+        else:
+            rejected.append(line)
+    return records, rejected
+
+
+class Command(BaseCommand):
+    help = "Importa para o banco os logs gravados no spool local enquanto o banco estava indisponível."
+
+    def handle(self, *args, **options):
+        directory = spool_dir()
+        if not directory.is_dir():
+            self.stdout.write("Nenhum spool encontrado.")
+            return
+
+        # Sobras de uma execução interrompida vêm primeiro, antes que um novo rename as sobrescreva.
+        claimed_files = sorted(directory.glob(f"*{CLAIMED_SUFFIX}"))
+        for path in sorted(directory.glob(f"*{SPOOL_SUFFIX}")):
+            # Renomeia antes de ler: o processo dono do arquivo passa a escrever num novo.
+            claimed = path.with_suffix(CLAIMED_SUFFIX)
+            if claimed.exists():
+                continue
+            path.rename(claimed)
+            claimed_files.append(claimed)
+
+        imported = rejected_total = 0
+        for claimed in claimed_files:
+            records, rejected = _parse_lines(claimed)
+            if rejected:
+                quarantine = claimed.with_suffix(REJECTED_SUFFIX)
+                with quarantine.open("a", encoding="utf-8") as handle:
+                    handle.write("\n".join(rejected) + "\n")
+                rejected_total += len(rejected)
+                self.stderr.write(f"{len(rejected)} linha(s) inválida(s) de {claimed.name} movidas para {quarantine.name}.")
+            # Se o banco ainda estiver fora, write_records devolve o lote ao spool.
+            imported += write_records(records)
+            claimed.unlink()
+        message = f"{imported} logs importados do spool."
+        if rejected_total:
+            message += f" {rejected_total} linha(s) em quarentena."
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.testcases import LiveServerThread
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core.models import WebhookMessage
+from core.webhook_loadtest import (
+    TWILIO_TIMEOUT,
+    loadtest_phone_numbers,
+    run_load_test,
+    seed_loadtest_senders,
+    summarize,
+)
+
+DRAIN_TIMEOUT = 60
+
+
+def _without_static(handler):
+    return handler
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga do webhook do Twilio: vários números conversam com o bot ao mesmo tempo. "
+        "Sem --url, sobe um servidor local com um banco de teste descartável."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--senders", type=int, default=10, help="Números simulados (padrão: 10).")
+        parser.add_argument("--rounds", type=int, default=1, help="Vezes que cada número repete o roteiro.")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=0,
+            help="Máximo de requisições em andamento (padrão: uma por número).",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=TWILIO_TIMEOUT,
+            help=f"Segundos até a requisição contar como erro (padrão: {TWILIO_TIMEOUT:.0f}, o limite do Twilio).",
+        )
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            dest="async_mode",
+            help="Usa o modo de resposta imediata (TWILIO_WEBHOOK_ASYNC) no servidor local.",
+        )
+        parser.add_argument("--url", help="Testa um servidor já rodando (ex.: http://127.0.0.1:8000).")
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help="Com --url, cadastra os números simulados no banco configurado antes do teste.",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options["url"]:
+            if options["seed"]:
+                phones = seed_loadtest_senders(options["senders"])
+            else:
+                phones = loadtest_phone_numbers(options["senders"])
+            samples = self._run(options["url"], phones, options)
+        else:
+            samples = self._run_local(options)
+        self._report(samples, time.perf_counter() - start)
+
+    def _run(self, base_url, phones, options):
+        return run_load_test(
+            base_url,
+            phones,
+            rounds=options["rounds"],
+            concurrency=options["concurrency"],
+            timeout=options["timeout"],
+        )
+
+    def _run_local(self, options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        old_name = connection.settings_dict["NAME"]
+        tmpdir = None
+        if connection.vendor == "sqlite":
+            # O SQLite em memória dos testes não é compartilhável entre as threads do servidor.
+            tmpdir = tempfile.mkdtemp(prefix="loadtest-")
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir, "loadtest.sqlite3")
+        setup_test_environment()
+        overrides = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "127.0.0.1"],
+            TWILIO_REPLY_BACKEND="core.webhook_worker.LocMemReplyBackend",
+            TWILIO_WEBHOOK_ASYNC=options["async_mode"],
+        )
+        overrides.enable()
+        server = None
+        try:
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            phones = seed_loadtest_senders(options["senders"])
+            server = LiveServerThread("127.0.0.1", _without_static)
+            server.daemon = True
+            server.start()
+            server.is_ready.wait()
+            if server.error:
+                raise server.error
+            samples = self._run(f"http://127.0.0.1:{server.port}", phones, options)
+            if options["async_mode"]:
+                self._drain()
+            return samples
+        finally:
+            if server is not None:
+                server.terminate()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            overrides.disable()
+            teardown_test_environment()
+            if tmpdir:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def _drain(self):
+        # No modo assíncrono a latência medida é a do ack; espera o worker terminar a fila.
+        open_statuses = [WebhookMessage.STATUS_PENDING, WebhookMessage.STATUS_PROCESSING]
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        while WebhookMessage.objects.filter(status__in=open_statuses).exists() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        counts = {status: WebhookMessage.objects.filter(status=status).count() for status, _ in WebhookMessage.STATUS_CHOICES}
+        self.stdout.write(
+            "Processamento em segundo plano: "
+            + ", ".join(f"{count} {status}" for status, count in counts.items())
+        )
+
+    def _report(self, samples, elapsed):
+        if not samples:
+            self.stdout.write("Nenhuma requisição enviada.")
+            return
+        self.stdout.write(
+            f"{'comando':<10}{'n':>6}{'erros':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}{'queries':>10}"
+        )
+        for command, stats in summarize(samples).items():
+            queries = "-" if stats["queries_avg"] is None else f"{stats['queries_avg']:.1f}/{stats['queries_max']}"
+            self.stdout.write(
+                f"{command:<10}{stats['count']:>6}{stats['error_rate']:>8.1%}"
+                f"{stats['p50']:>9.0f}{stats['p95']:>9.0f}{stats['p99']:>9.0f}{stats['max']:>9.0f}{queries:>10}"
+            )
+        errors = [sample for sample in samples if sample.failed]
+        summary = (
+            f"{len(samples)} requisições em {elapsed:.1f} s ({len(samples) / elapsed:.1f}/s), "
+            f"{len(errors)} com erro."
+        )
+        if errors:
+            kinds = sorted({sample.error or f"HTTP {sample.status}" for sample in errors})
+            self.stdout.write(self.style.WARNING(f"{summary} Erros: {', '.join(kinds)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
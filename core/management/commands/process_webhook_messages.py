@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import WebhookMessage
+from core.webhook import process_webhook_message
+
+
+class Command(BaseCommand):
+    help = "Processa mensagens do webhook que ficaram pendentes (ex.: após reiniciar o servidor)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale-minutes",
+            type=int,
+            default=5,
+            help="Mensagens pegas por um worker há mais de X minutos voltam para a fila (padrão: 5).",
+        )
+
+    def handle(self, *args, **options):
+        # Uma mensagem presa em "processando" não gravou nada: o status final e os
+        # lançamentos são salvos na mesma transação, então é seguro reprocessar.
+        stale = timezone.now() - timedelta(minutes=options["stale_minutes"])
+        # Conta a partir do claim, não da chegada: com a fila atrasada, uma mensagem
+        # antiga pode ter acabado de ser pega por um worker.
+        WebhookMessage.objects.filter(
+            status=WebhookMessage.STATUS_PROCESSING, claimed_at__lt=stale
+        ).update(status=WebhookMessage.STATUS_PENDING)
+
+        pending = WebhookMessage.objects.filter(status=WebhookMessage.STATUS_PENDING).order_by("id")
+        processed = 0
+        for message_id in pending.values_list("id", flat=True):
+            process_webhook_message(message_id)
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(f"{processed} mensagens processadas."))
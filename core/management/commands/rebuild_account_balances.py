@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Household
+from finance.services import rebuild_account_balances
+
+
+class Command(BaseCommand):
+    help = "Recalcula o histórico de saldo diário das contas a partir dos lançamentos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--household",
+            help="Slug da casa a recalcular (padrão: todas).",
+        )
+
+    def handle(self, *args, **options):
+        household = None
+        if options["household"]:
+            household = Household.objects.filter(slug=options["household"]).first()
+            if household is None:
+                raise CommandError(f"Casa '{options['household']}' não encontrada.")
+        total = rebuild_account_balances(household)
+        self.stdout.write(self.style.SUCCESS(f"{total} saldos diários recalculados."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.models import QuickExpenseMonthlyTotal
+
+
+class Command(BaseCommand):
+    help = "Recalcula os totais mensais dos gastos rápidos e corrige os que divergem."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Reconciliar só o usuário com este id.")
+
+    def handle(self, *args, **options):
+        fixed = QuickExpenseMonthlyTotal.reconcile(user_id=options["user"])
+        self.stdout.write(self.style.SUCCESS(f"{fixed} totais mensais corrigidos."))
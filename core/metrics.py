@@ -0,0 +1,245 @@
+"""
+Métricas no formato texto do Prometheus, sem dependências externas.
+
+Cada processo acumula seus valores em memória e grava de tempos em tempos um
+snapshot JSON em METRICS_DIR (um arquivo por pid). A view /metrics soma os
+arquivos dos processos vivos, então os números cobrem todos os workers do gunicorn;
+os de processos que já morreram são apagados (os contadores recomeçam, como num restart).
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import ContextDecorator
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500)
+FLUSH_INTERVAL = 5
+
+
+def metrics_dir() -> Path:
+    configured = getattr(settings, "METRICS_DIR", None)
+    return Path(configured) if configured else Path(tempfile.gettempdir()) / "financeirov2-metrics"
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _label_key(labelnames, labels) -> str:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Esperado labels {labelnames}, recebido {sorted(labels)}.")
+    return json.dumps([[name, str(labels[name])] for name in labelnames])
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._values = {}
+        self._last_flush = 0.0
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        self._values[metric.name] = {}
+        return metric
+
+    def update(self, name, key, apply):
+        with self._lock:
+            series = self._values[name]
+            series[key] = apply(series.get(key))
+            due = time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self._values))
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+        try:
+            directory = metrics_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            target = directory / f"{os.getpid()}.json"
+            temp = target.with_suffix(".tmp")
+            temp.write_text(json.dumps(self.snapshot()))
+            os.replace(temp, target)
+        except OSError:
+            pass
+
+    def collect(self) -> dict:
+        """Soma os snapshots de todos os processos, usando os valores vivos deste."""
+        merged = {name: {} for name in self._metrics}
+        snapshots = [self.snapshot()]
+        own = f"{os.getpid()}.json"
+        directory = metrics_dir()
+        if directory.is_dir():
+            for path in directory.glob("*.json"):
+                if path.name == own:
+                    continue
+                if not path.stem.isdigit() or not _pid_alive(int(path.stem)):
+                    # Worker morto ou deploy anterior; um pid reutilizado regravaria o arquivo.
+                    path.unlink(missing_ok=True)
+                    continue
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+        for values in snapshots:
+            for name, series in values.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in series.items():
+                    merged[name][key] = metric.merge(merged[name].get(key), value)
+        return merged
+
+    def render(self) -> str:
+        merged = self.collect()
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(merged[name].items()):
+                lines.extend(metric.exposition(json.loads(key), value))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
+
+
+def _escape(value) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        registry.update(self.name, key, lambda current: (current or 0) + amount)
+
+    @staticmethod
+    def merge(current, value):
+        return (current or 0) + value
+
+    def exposition(self, pairs, value):
+        return [f"{self.name}{_format_labels(pairs)} {value}"]
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # Como decorator, cada chamada usa um timer novo; o início não é compartilhado entre threads.
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+
+        def apply(current):
+            current = current or {"buckets": [0] * len(self.buckets), "sum": 0, "count": 0}
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    current["buckets"][idx] += 1
+            current["sum"] += value
+            current["count"] += 1
+            return current
+
+        registry.update(self.name, key, apply)
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    @staticmethod
+    def merge(current, value):
+        if current is None:
+            return {"buckets": list(value["buckets"]), "sum": value["sum"], "count": value["count"]}
+        return {
+            "buckets": [left + right for left, right in zip(current["buckets"], value["buckets"])],
+            "sum": current["sum"] + value["sum"],
+            "count": current["count"] + value["count"],
+        }
+
+    def exposition(self, pairs, value):
+        lines = []
+        for bound, count in zip(self.buckets, value["buckets"]):
+            lines.append(f"{self.name}_bucket{_format_labels(pairs + [['le', str(bound)]])} {count}")
+        lines.append(f"{self.name}_bucket{_format_labels(pairs + [['le', '+Inf']])} {value['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(pairs)} {value['sum']}")
+        lines.append(f"{self.name}_count{_format_labels(pairs)} {value['count']}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "financeiro_http_request_duration_seconds", "Duração das requisições por view.", ["view"]
+)
+REQUEST_QUERIES = Histogram(
+    "financeiro_db_queries_per_request", "Queries de banco por requisição.", ["view"], buckets=COUNT_BUCKETS
+)
+IMPORT_DURATION = Histogram(
+    "financeiro_import_duration_seconds", "Duração das etapas de importação de fatura.", ["stage"]
+)
+IMPORT_ITEMS = Counter(
+    "financeiro_import_items_total", "Itens lidos (parse) e parcelas criadas (confirm) na importação.", ["stage"]
+)
+RECURRING_GENERATED = Counter(
+    "financeiro_recurring_instances_generated_total", "Ocorrências de contas recorrentes geradas."
+)
+WEBHOOK_LATENCY = Histogram(
+    "financeiro_webhook_message_duration_seconds", "Tempo de processamento das mensagens do webhook."
+)
+CACHE_REQUESTS = Counter(
+    "financeiro_cache_requests_total", "Consultas aos caches da aplicação.", ["cache", "result"]
+)
+
+
+def record_cache(name, hit):
+    CACHE_REQUESTS.inc(cache=name, result="hit" if hit else "miss")
@@ -1,12 +1,29 @@
+import logging
+import time
 import traceback
 
 from django.conf import settings
+from django.db import connection
 from django.shortcuts import redirect
 from django.urls import reverse
 
-from .households import get_current_household
-
+from .households import resolve_household
+from .log_buffer import enqueue_system_log
+from .metrics import REQUEST_LATENCY, REQUEST_QUERIES
 from .models import SystemLog
+from .perf import (
+    QueryTimer,
+    finish_request,
+    perf_store,
+    query_budget,
+    server_timing_header,
+    start_request,
+    time_budget_ms,
+)
+from .slow_queries import record_slow_queries
+from .slow_queries import threshold_ms as slow_query_threshold_ms
+
+logger = logging.getLogger(__name__)
 
 
 class SystemLogMiddleware:
@@ -24,16 +41,51 @@ class SystemLogMiddleware:
     def _log_exception(self, exc):
         try:
             message = str(exc) or "Erro interno no servidor"
-            SystemLog.objects.create(
-                level=SystemLog.LEVEL_ERROR,
-                source=SystemLog.SOURCE_BACKEND,
-                message=message[:255],
-                details=traceback.format_exc(),
+            enqueue_system_log(
+                SystemLog.LEVEL_ERROR,
+                SystemLog.SOURCE_BACKEND,
+                message,
+                traceback.format_exc(),
             )
         except Exception:
             pass
 
 
+class PerformanceMiddleware:
+    """Conta queries e mede banco, templates e tempo total; responde com Server-Timing."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings, token = start_request()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(QueryTimer(timings, slow_ms=slow_query_threshold_ms())):
+                response = self.get_response(request)
+        finally:
+            finish_request(token)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        flagged = timings.queries > query_budget() or total_ms > time_budget_ms()
+        match = getattr(request, "resolver_match", None)
+        if timings.slow_queries:
+            record_slow_queries(match.view_name if match else request.path, timings.slow_queries)
+        if match and match.view_name:
+            perf_store.record(match.view_name, total_ms, timings.queries, flagged)
+            REQUEST_LATENCY.observe(total_ms / 1000, view=match.view_name)
+            REQUEST_QUERIES.observe(timings.queries, view=match.view_name)
+            if flagged:
+                logger.warning(
+                    "Orçamento excedido em %s: %d queries, %.0f ms",
+                    match.view_name,
+                    timings.queries,
+                    total_ms,
+                )
+        response["Server-Timing"] = server_timing_header(timings, total_ms, flagged)
+        return response
+
+
 class HouseholdMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -45,11 +97,12 @@ class HouseholdMiddleware:
 
     def __call__(self, request):
         request.household = None
+        request.household_role = None
         if request.user.is_authenticated:
             if self._is_exempt(request.path):
                 return self.get_response(request)
 
-            request.household = get_current_household(request)
+            request.household, request.household_role = resolve_household(request.user)
             if request.household is None:
                 return redirect("household-missing")
 
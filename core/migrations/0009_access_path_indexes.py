@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_cardstatementinitialbalance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quickexpense',
+            index=models.Index(fields=['user', 'data'], name='quickexpense_user_data_idx'),
+        ),
+    ]
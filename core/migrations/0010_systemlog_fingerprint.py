@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemlog',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='systemlog',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='systemlog',
+            name='level',
+            field=models.CharField(choices=[('ERRO', 'Erro'), ('AVISO', 'Aviso'), ('INFO', 'Info'), ('PERF', 'Desempenho')], default='ERRO', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['fingerprint', 'is_resolved'], name='systemlog_fingerprint_idx'),
+        ),
+    ]
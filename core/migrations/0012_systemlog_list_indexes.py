@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_systemlog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['is_resolved', 'created_at'], name='systemlog_resolved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['level', 'created_at'], name='systemlog_level_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:37
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    SystemLog = apps.get_model("core", "SystemLog")
+    SystemLog.objects.update(last_seen_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_systemlog_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemlog',
+            name='last_seen_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_systemlog_last_seen_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemLogDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('level', models.CharField(choices=[('ERRO', 'Erro'), ('AVISO', 'Aviso'), ('INFO', 'Info'), ('PERF', 'Desempenho')], max_length=10)),
+                ('source', models.CharField(choices=[('BACKEND', 'Backend'), ('FRONTEND', 'Frontend')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-date', 'level', 'source'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'level', 'source'), name='unique_systemlog_summary_day')],
+            },
+        ),
+    ]
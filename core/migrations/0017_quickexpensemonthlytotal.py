@@ -0,0 +1,54 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_monthly_totals(apps, schema_editor):
+    QuickExpense = apps.get_model("core", "QuickExpense")
+    QuickExpenseMonthlyTotal = apps.get_model("core", "QuickExpenseMonthlyTotal")
+    rows = (
+        QuickExpense.objects.order_by()
+        .values("user_id", month=TruncMonth("data"))
+        .annotate(amount=Sum("valor"), entries=Count("id"))
+    )
+    QuickExpenseMonthlyTotal.objects.bulk_create(
+        QuickExpenseMonthlyTotal(
+            user_id=row["user_id"],
+            year=row["month"].year,
+            month=row["month"].month,
+            total=row["amount"],
+            count=row["entries"],
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_botidentity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuickExpenseMonthlyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quick_expense_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-year', '-month'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'year', 'month'), name='unique_quick_expense_month_total')],
+            },
+        ),
+        migrations.RunPython(backfill_monthly_totals, migrations.RunPython.noop),
+    ]
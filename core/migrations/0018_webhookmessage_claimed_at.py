@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-19 05:07
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def claim_processing_messages(apps, schema_editor):
+    # Mensagens já em processamento precisam de um claimed_at para poderem vencer.
+    WebhookMessage = apps.get_model("core", "WebhookMessage")
+    WebhookMessage.objects.filter(status="processing").update(claimed_at=F("received_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_quickexpensemonthlytotal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookmessage',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(claim_processing_messages, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='webhookmessage',
+            index=models.Index(fields=['sender', 'status'], name='webhookmessage_sender_idx'),
+        ),
+    ]
@@ -1,6 +1,12 @@
+from collections import defaultdict
+from decimal import Decimal
+
 from django.contrib.auth.models import User
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
 
 
 class Household(models.Model):
@@ -30,6 +36,7 @@ class SystemLog(models.Model):
     LEVEL_ERROR = "ERRO"
     LEVEL_WARNING = "AVISO"
     LEVEL_INFO = "INFO"
+    LEVEL_PERF = "PERF"
     SOURCE_BACKEND = "BACKEND"
     SOURCE_FRONTEND = "FRONTEND"
 
@@ -37,6 +44,7 @@ class SystemLog(models.Model):
         (LEVEL_ERROR, "Erro"),
         (LEVEL_WARNING, "Aviso"),
         (LEVEL_INFO, "Info"),
+        (LEVEL_PERF, "Desempenho"),
     ]
 
     SOURCE_CHOICES = [
@@ -48,16 +56,45 @@ class SystemLog(models.Model):
     source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
     message = models.CharField(max_length=255)
     details = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # default em vez de auto_now_add: logs gravados em lote mantêm a hora em que ocorreram.
+    created_at = models.DateTimeField(default=timezone.now)
     is_resolved = models.BooleanField(default=False)
+    # Agrupa ocorrências repetidas do mesmo problema (ex.: a mesma query lenta).
+    # created_at é a primeira ocorrência; last_seen_at, a mais recente.
+    fingerprint = models.CharField(max_length=40, blank=True)
+    occurrences = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["fingerprint", "is_resolved"], name="systemlog_fingerprint_idx"),
+            models.Index(fields=["is_resolved", "created_at"], name="systemlog_resolved_idx"),
+            models.Index(fields=["level", "created_at"], name="systemlog_level_idx"),
+        ]
 
     def __str__(self):
         return f"{self.get_level_display()} - {self.message}"
 
 
+class SystemLogDailySummary(models.Model):
+    """Contagem diária dos logs já removidos pela retenção, para manter a tendência."""
+
+    date = models.DateField()
+    level = models.CharField(max_length=10, choices=SystemLog.LEVEL_CHOICES)
+    source = models.CharField(max_length=10, choices=SystemLog.SOURCE_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-date", "level", "source"]
+        constraints = [
+            models.UniqueConstraint(fields=["date", "level", "source"], name="unique_systemlog_summary_day"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.level}/{self.source}: {self.count}"
+
+
 # core/models.py
 
 class QuickExpense(models.Model):
@@ -70,9 +107,109 @@ class QuickExpense(models.Model):
     # Campo para saber se isso já foi oficializado/lançado na fatura depois
     processado = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "data"], name="quickexpense_user_data_idx"),
+        ]
+
     def __str__(self):
         return f"{self.data} - {self.descricao} - R$ {self.valor}"
 
+    def save(self, *args, **kwargs):
+        before = None
+        if not self._state.adding:
+            before = QuickExpense.objects.filter(pk=self.pk).values_list("user_id", "data", "valor").first()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if before:
+                QuickExpenseMonthlyTotal.apply_delta(before[0], before[1], -before[2], -1)
+            QuickExpenseMonthlyTotal.apply_delta(self.user_id, self.data, Decimal(str(self.valor)), 1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            QuickExpenseMonthlyTotal.apply_delta(self.user_id, self.data, -Decimal(str(self.valor)), -1)
+        return result
+
+
+class QuickExpenseMonthlyTotal(models.Model):
+    """Total e quantidade de gastos rápidos por usuário e mês, atualizados a cada gravação."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="quick_expense_totals")
+    year = models.IntegerField()
+    month = models.IntegerField()
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["-year", "-month"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "year", "month"], name="unique_quick_expense_month_total")
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.year}-{self.month:02d}: R$ {self.total}"
+
+    @classmethod
+    def apply_delta(cls, user_id, day, amount, count):
+        """Soma `amount`/`count` ao mês de `day` com F(), sem ler o total atual."""
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, year=day.year, month=day.month)], ignore_conflicts=True
+        )
+        cls.objects.filter(user_id=user_id, year=day.year, month=day.month).update(
+            total=F("total") + amount, count=F("count") + count
+        )
+
+    @classmethod
+    def remove_expenses(cls, expenses):
+        """Desconta gastos que serão apagados em massa (queryset.delete() não chama delete())."""
+        months = defaultdict(lambda: [Decimal("0"), 0])
+        rows = expenses.order_by().values("user_id", "data").annotate(amount=Sum("valor"), removed=Count("id"))
+        for row in rows:
+            month = months[(row["user_id"], row["data"].replace(day=1))]
+            month[0] += row["amount"]
+            month[1] += row["removed"]
+        for (user_id, day), (amount, removed) in months.items():
+            cls.apply_delta(user_id, day, -amount, -removed)
+
+    @classmethod
+    def reconcile(cls, user_id=None):
+        """Recalcula os totais a partir dos gastos e corrige os que divergem; retorna quantos mudaram."""
+        expenses = QuickExpense.objects.all()
+        stored = cls.objects.all()
+        if user_id is not None:
+            expenses = expenses.filter(user_id=user_id)
+            stored = stored.filter(user_id=user_id)
+        actual = {
+            (row["user_id"], row["month"].year, row["month"].month): (row["amount"], row["entries"])
+            for row in expenses.order_by()
+            .values("user_id", month=TruncMonth("data"))
+            .annotate(amount=Sum("valor"), entries=Count("id"))
+        }
+        fixed = 0
+        with transaction.atomic():
+            for row in stored.select_for_update():
+                key = (row.user_id, row.year, row.month)
+                amount, entries = actual.pop(key, (Decimal("0"), 0))
+                if (row.total, row.count) == (amount, entries):
+                    continue
+                fixed += 1
+                if entries:
+                    row.total, row.count = amount, entries
+                    row.save(update_fields=["total", "count"])
+                else:
+                    row.delete()
+            cls.objects.bulk_create(
+                cls(user_id=owner_id, year=year, month=month, total=amount, count=entries)
+                for (owner_id, year, month), (amount, entries) in actual.items()
+            )
+        return fixed + len(actual)
+
+    @classmethod
+    def monthly_total(cls, user_id, year, month):
+        total = cls.objects.filter(user_id=user_id, year=year, month=month).values_list("total", flat=True).first()
+        return total if total is not None else Decimal("0.00")
+
 
 class CardStatementInitialBalance(models.Model):
     """
@@ -93,3 +230,58 @@ class CardStatementInitialBalance(models.Model):
 
     def __str__(self):
         return f"{self.user} - {self.year}-{self.month:02d}: R$ {self.saldo_inicial}"
+
+
+class WebhookMessage(models.Model):
+    """
+    Mensagem recebida pelo webhook do Twilio, única por MessageSid: reentregas do
+    Twilio encontram a mesma linha e não processam a mensagem de novo. As mensagens
+    de um mesmo número são processadas uma por vez, na ordem de chegada.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSING = "processing"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pendente"),
+        (STATUS_PROCESSING, "Processando"),
+        (STATUS_DONE, "Processada"),
+        (STATUS_FAILED, "Falhou"),
+    ]
+
+    message_sid = models.CharField(max_length=64, unique=True)
+    sender = models.CharField(max_length=32)
+    body = models.TextField(blank=True)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    reply = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    received_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-received_at"]
+        indexes = [
+            models.Index(fields=["status", "received_at"], name="webhookmessage_status_idx"),
+            models.Index(fields=["sender", "status"], name="webhookmessage_sender_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.message_sid} ({self.get_status_display()})"
+
+
+class BotIdentity(models.Model):
+    """Número de WhatsApp autorizado a usar o bot, com o usuário e a casa a que pertence."""
+
+    phone_number = models.CharField(max_length=20, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bot_identities")
+    household = models.ForeignKey(Household, on_delete=models.CASCADE, related_name="bot_identities")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["phone_number"]
+
+    def __str__(self):
+        return f"{self.phone_number} -> {self.user}"
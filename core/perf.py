@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+PERF_SAMPLE_SIZE = 200
+DEFAULT_QUERY_BUDGET = 40
+DEFAULT_TIME_BUDGET_MS = 800
+
+
+@dataclass
+class RequestTimings:
+    queries: int = 0
+    db_ms: float = 0.0
+    template_ms: float = 0.0
+    slow_queries: list = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class RouteStats:
+    route: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p95_queries: int
+    flagged: int
+
+
+_current_timings = ContextVar("request_timings", default=None)
+
+
+def query_budget() -> int:
+    return getattr(settings, "PERF_QUERY_BUDGET", DEFAULT_QUERY_BUDGET)
+
+
+def time_budget_ms() -> float:
+    return getattr(settings, "PERF_TIME_BUDGET_MS", DEFAULT_TIME_BUDGET_MS)
+
+
+class QueryTimer:
+    """
+    execute_wrapper que conta as queries e soma o tempo de banco da requisição.
+    Queries acima de `slow_ms` são guardadas para serem registradas ao fim da requisição.
+    """
+
+    def __init__(self, timings: RequestTimings, slow_ms=None):
+        self.timings = timings
+        self.slow_ms = slow_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.timings.queries += 1
+            self.timings.db_ms += elapsed_ms
+            if self.slow_ms is not None and not many and elapsed_ms >= self.slow_ms:
+                self.timings.slow_queries.append((sql, params, elapsed_ms))
+
+
+def start_request() -> tuple[RequestTimings, object]:
+    timings = RequestTimings()
+    return timings, _current_timings.set(timings)
+
+
+def finish_request(token) -> None:
+    _current_timings.reset(token)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current_timings.get()
+        if timings is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Backend Django padrão que mede o tempo de render das templates de nível superior."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class PerformanceStore:
+    """Janela móvel em memória (por processo) das últimas requisições de cada rota."""
+
+    def __init__(self, size=PERF_SAMPLE_SIZE):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+
+    def record(self, route, total_ms, queries, flagged):
+        with self._lock:
+            self._samples[route].append((total_ms, queries, flagged))
+
+    def snapshot(self) -> list[RouteStats]:
+        with self._lock:
+            samples = {route: list(values) for route, values in self._samples.items()}
+        stats = [
+            RouteStats(
+                route=route,
+                count=len(values),
+                p50_ms=round(percentile([value[0] for value in values], 50), 1),
+                p95_ms=round(percentile([value[0] for value in values], 95), 1),
+                p95_queries=percentile([value[1] for value in values], 95),
+                flagged=sum(1 for value in values if value[2]),
+            )
+            for route, values in samples.items()
+        ]
+        return sorted(stats, key=lambda stat: stat.p95_ms, reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+perf_store = PerformanceStore()
+
+
+def server_timing_header(timings: RequestTimings, total_ms: float, flagged: bool) -> str:
+    parts = [
+        f'db;dur={timings.db_ms:.1f};desc="{timings.queries} queries"',
+        f"tpl;dur={timings.template_ms:.1f}",
+        f"total;dur={total_ms:.1f}",
+    ]
+    if flagged:
+        parts.append('budget;desc="exceeded"')
+    return ", ".join(parts)
@@ -0,0 +1,44 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def client_ip(request) -> str:
+    """
+    IP do cliente. Atrás de proxies, usa a entrada do X-Forwarded-For acrescentada
+    pelo proxy mais externo confiável; as anteriores vêm do cliente e podem ser forjadas.
+    """
+    hops = getattr(settings, "TRUSTED_PROXY_HOPS", 0)
+    forwarded = [ip.strip() for ip in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if ip.strip()]
+    if hops and len(forwarded) >= hops:
+        return forwarded[-hops]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+class TokenBucket:
+    """
+    Token bucket guardado no cache compartilhado, por chave (sessão ou IP).
+    Leitura e escrita não são atômicas: sob concorrência o limite é aproximado,
+    o que basta para conter tempestades de requisições.
+    """
+
+    def __init__(self, name, capacity, refill_per_second):
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+
+    def take(self, key, amount=1) -> int:
+        """Consome até `amount` tokens e retorna quantos foram concedidos."""
+        cache_key = f"{self.name}:{key}"
+        now = time.time()
+        tokens, updated_at = cache.get(cache_key) or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+        granted = min(int(tokens), amount)
+        timeout = math.ceil(self.capacity / self.refill_per_second) + 1
+        cache.set(cache_key, (tokens - granted, now), timeout)
+        return granted
+
+    def retry_after(self) -> int:
+        return math.ceil(1 / self.refill_per_second)
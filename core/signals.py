@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .bot_identities import invalidate_bot_identities
+from .households import invalidate_household_resolution
+from .models import BotIdentity, Household, HouseholdMembership
+
+
+@receiver([post_save, post_delete], sender=HouseholdMembership)
+def membership_changed(sender, instance, **kwargs):
+    invalidate_household_resolution(instance.user_id)
+
+
+@receiver(post_save, sender=Household)
+def household_changed(sender, instance, **kwargs):
+    user_ids = HouseholdMembership.objects.filter(household=instance).values_list("user_id", flat=True)
+    invalidate_household_resolution(*user_ids)
+    invalidate_bot_identities(*BotIdentity.objects.filter(household=instance).values_list("phone_number", flat=True))
+
+
+@receiver(pre_save, sender=BotIdentity)
+def bot_identity_renumbered(sender, instance, **kwargs):
+    # Troca de número: o número antigo também sai do cache.
+    if instance.pk:
+        old = BotIdentity.objects.filter(pk=instance.pk).values_list("phone_number", flat=True).first()
+        if old and old != instance.phone_number:
+            invalidate_bot_identities(old)
+
+
+@receiver([post_save, post_delete], sender=BotIdentity)
+def bot_identity_changed(sender, instance, **kwargs):
+    invalidate_bot_identities(instance.phone_number)
+
+
+@receiver(post_save, sender=User)
+def bot_user_changed(sender, instance, created, update_fields=None, **kwargs):
+    # O login só grava last_login; não vale uma query a cada autenticação.
+    if not created and update_fields != frozenset({"last_login"}):
+        invalidate_bot_identities(*BotIdentity.objects.filter(user=instance).values_list("phone_number", flat=True))
@@ -0,0 +1,85 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from .log_buffer import enqueue_system_log
+from .models import SystemLog
+
+DEFAULT_THRESHOLD_MS = 200
+PARAMS_PREVIEW_CHARS = 2000
+EXPLAINED_MAX = 1000
+
+_explained = set()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def threshold_ms() -> float:
+    return getattr(settings, "SLOW_QUERY_THRESHOLD_MS", DEFAULT_THRESHOLD_MS)
+
+
+def normalize_sql(sql: str) -> str:
+    """Troca literais e placeholders por `?` e colapsa listas de IN, para agrupar a mesma query."""
+    normalized = _STRING_LITERAL.sub("?", sql)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def sql_fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize_sql(sql).encode("utf-8")).hexdigest()
+
+
+def _explain(sql, params) -> str:
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return ""
+    prefix = "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            return "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+    except DatabaseError:
+        return ""
+
+
+def _should_explain(fingerprint) -> bool:
+    # O EXPLAIN vai só no primeiro log de cada query do processo; depois as ocorrências só somam.
+    if not getattr(settings, "SLOW_QUERY_EXPLAIN", False) or fingerprint in _explained:
+        return False
+    if len(_explained) >= EXPLAINED_MAX:
+        _explained.clear()
+    _explained.add(fingerprint)
+    return True
+
+
+def record_slow_queries(view_name, slow_queries) -> None:
+    """
+    Envia as queries lentas de uma requisição para o buffer de logs como PERF, com o
+    fingerprint do SQL: uma query já aberta só soma ocorrências na mesma linha.
+    """
+    for sql, params, duration_ms in slow_queries:
+        fingerprint = sql_fingerprint(sql)
+        details = [
+            f"View: {view_name or '-'}",
+            f"Duração: {duration_ms:.1f} ms",
+            f"SQL: {sql}",
+            f"Parâmetros: {params!r}"[:PARAMS_PREVIEW_CHARS],
+        ]
+        if _should_explain(fingerprint):
+            plan = _explain(sql, params)
+            if plan:
+                details.append(f"EXPLAIN:\n{plan}")
+        enqueue_system_log(
+            SystemLog.LEVEL_PERF,
+            SystemLog.SOURCE_BACKEND,
+            f"Query lenta ({duration_ms:.0f} ms) em {view_name or '-'}",
+            "\n".join(details),
+            fingerprint=fingerprint,
+        )
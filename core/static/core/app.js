@@ -138,33 +138,63 @@ const escapeHtml = (value) =>
     .replace(/"/g, "&quot;")
     .replace(/'/g, "&#39;");
 
-let isSendingFrontendLog = false;
-
-const sendFrontendLog = async ({ message, details, level = "ERRO" }) => {
-  if (isSendingFrontendLog) return;
-  isSendingFrontendLog = true;
-  try {
-    const csrfToken = getCookie("csrftoken");
-    await fetch("/api/log-error/", {
-      method: "POST",
-      credentials: "same-origin",
-      headers: {
-        "Content-Type": "application/json",
-        ...(csrfToken ? { "X-CSRFToken": csrfToken } : {}),
-      },
-      body: JSON.stringify({
-        message,
-        details,
-        level,
-      }),
-    });
-  } catch (error) {
-    console.error("Falha ao enviar log do frontend:", error);
-  } finally {
-    isSendingFrontendLog = false;
+// Erros ficam numa fila e vão juntos num único POST a cada poucos segundos ou
+// quando a aba é escondida; uma tempestade de erros vira poucas requisições.
+const FRONTEND_LOG_FLUSH_MS = 5000;
+const FRONTEND_LOG_BATCH_SIZE = 50;
+// Requisições com keepalive têm o corpo limitado a 64 KB; acima disso o fetch é rejeitado.
+const FRONTEND_LOG_MAX_BYTES = 60000;
+const FRONTEND_LOG_DETAILS_MAX = 4000;
+const pendingFrontendLogs = [];
+const logEncoder = new TextEncoder();
+
+const takeFrontendLogBatch = () => {
+  const errors = [];
+  let size = logEncoder.encode('{"errors":[]}').length;
+  while (pendingFrontendLogs.length && errors.length < FRONTEND_LOG_BATCH_SIZE) {
+    const entrySize = logEncoder.encode(JSON.stringify(pendingFrontendLogs[0])).length + 1;
+    if (errors.length && size + entrySize > FRONTEND_LOG_MAX_BYTES) break;
+    size += entrySize;
+    errors.push(pendingFrontendLogs.shift());
   }
+  return errors;
 };
 
+const flushFrontendLogs = () => {
+  if (!pendingFrontendLogs.length) return;
+  const errors = takeFrontendLogBatch();
+  const csrfToken = getCookie("csrftoken");
+  fetch("/api/log-error/", {
+    method: "POST",
+    credentials: "same-origin",
+    keepalive: true,
+    headers: {
+      "Content-Type": "application/json",
+      ...(csrfToken ? { "X-CSRFToken": csrfToken } : {}),
+    },
+    body: JSON.stringify({ errors }),
+  }).catch((error) => {
+    console.error("Falha ao enviar logs do frontend:", error);
+  });
+};
+
+const sendFrontendLog = ({ message, details, level = "ERRO" }) => {
+  // Acima de dois lotes pendentes, descarta: o servidor já teria limitado mesmo.
+  if (pendingFrontendLogs.length >= FRONTEND_LOG_BATCH_SIZE * 2) return;
+  pendingFrontendLogs.push({
+    message: String(message ?? "").slice(0, 255),
+    details: String(details ?? "").slice(0, FRONTEND_LOG_DETAILS_MAX),
+    level,
+  });
+  if (pendingFrontendLogs.length >= FRONTEND_LOG_BATCH_SIZE) flushFrontendLogs();
+};
+
+setInterval(flushFrontendLogs, FRONTEND_LOG_FLUSH_MS);
+
+document.addEventListener("visibilitychange", () => {
+  if (document.visibilityState === "hidden") flushFrontendLogs();
+});
+
 window.addEventListener("error", (event) => {
   const message = event?.message || "Erro de JavaScript";
   const details =
@@ -439,6 +469,7 @@ const resetImportModal = () => {
 
 const logsState = {
   items: [],
+  nextCursor: null,
 };
 
 const updateLogsPendingBadge = async () => {
@@ -487,10 +518,13 @@ const renderSystemLogs = () => {
           </button>`;
 
       return `
-        <tr class="log-row" data-detail-id="${detailId}">
+        <tr class="log-row" data-detail-id="${detailId}" data-log-id="${log.id}">
           <td>${formatDateTime(log.created_at)}</td>
           <td>${escapeHtml(log.source_label || log.source)}</td>
-          <td>${escapeHtml(log.message)}</td>
+          <td>
+            ${escapeHtml(log.message)}
+            ${log.occurrences > 1 ? `<span class="badge bg-secondary ms-1">${log.occurrences}×</span>` : ""}
+          </td>
           <td>${statusBadge}</td>
           <td class="text-end">
             <div class="btn-group btn-group-sm" role="group">
@@ -510,24 +544,51 @@ const renderSystemLogs = () => {
           <td colspan="5">
             <div class="p-3">
               <p class="text-muted small mb-2">Traceback / Detalhes</p>
-              <pre class="mb-0 small">${escapeHtml(log.details || "-")}</pre>
+              <pre class="mb-0 small">${escapeHtml(log.details ?? "Carregando...")}</pre>
             </div>
           </td>
         </tr>
       `;
     })
-    .join("");
+    .join("") +
+    (logsState.nextCursor
+      ? `<tr><td colspan="5" class="text-center">
+          <button class="btn btn-sm btn-outline-secondary" data-action="more">Carregar mais</button>
+        </td></tr>`
+      : "");
 };
 
 const loadSystemLogs = async () => {
   try {
-    logsState.items = await apiFetch("/api/system-logs/");
+    const data = await apiFetch("/api/system-logs/");
+    logsState.items = data.results;
+    logsState.nextCursor = data.next_cursor;
     renderSystemLogs();
   } catch (error) {
     showToast(`Erro ao carregar logs: ${error.message}`, "danger");
   }
 };
 
+const loadMoreSystemLogs = async () => {
+  try {
+    const data = await apiFetch(`/api/system-logs/?cursor=${encodeURIComponent(logsState.nextCursor)}`);
+    logsState.items = logsState.items.concat(data.results);
+    logsState.nextCursor = data.next_cursor;
+    renderSystemLogs();
+  } catch (error) {
+    showToast(`Erro ao carregar logs: ${error.message}`, "danger");
+  }
+};
+
+// A lista não traz os tracebacks; eles são buscados quando a linha é expandida ou copiada.
+const fetchLogDetails = async (log) => {
+  if (log.details === undefined) {
+    const data = await apiFetch(`/api/system-logs/${log.id}/`);
+    log.details = data.details;
+  }
+  return log.details;
+};
+
 const copyLogDetails = async (details) => {
   if (navigator?.clipboard?.writeText) {
     await navigator.clipboard.writeText(details);
@@ -545,13 +606,17 @@ const handleSystemLogsTableClick = async (event) => {
   const actionButton = event.target.closest("button[data-action]");
   if (actionButton) {
     const action = actionButton.dataset.action;
+    if (action === "more") {
+      await loadMoreSystemLogs();
+      return;
+    }
     const logId = Number(actionButton.dataset.logId);
     const log = logsState.items.find((item) => item.id === logId);
     if (!log) return;
 
     if (action === "copy") {
       try {
-        await copyLogDetails(log.details || "");
+        await copyLogDetails((await fetchLogDetails(log)) || "");
         showToast("Erro copiado para a área de transferência.", "success");
       } catch (error) {
         showToast("Não foi possível copiar o erro.", "danger");
@@ -595,6 +660,14 @@ const handleSystemLogsTableClick = async (event) => {
     const detailId = row.dataset.detailId;
     const target = document.getElementById(detailId);
     if (target) {
+      const log = logsState.items.find((item) => item.id === Number(row.dataset.logId));
+      if (log && log.details === undefined) {
+        fetchLogDetails(log)
+          .then((details) => {
+            target.querySelector("pre").textContent = details || "-";
+          })
+          .catch((error) => showToast(`Erro ao carregar detalhes: ${error.message}`, "danger"));
+      }
       const collapse = bootstrap.Collapse.getOrCreateInstance(target, { toggle: false });
       collapse.toggle();
     }
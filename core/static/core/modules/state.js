@@ -41,4 +41,5 @@ export const monthNames = [
 
 export const logsState = {
   items: [],
+  nextCursor: null,
 };
@@ -1,5 +1,6 @@
 const chartState = {
   line: null,
+  cashFlow: null,
   expenseDonut: null,
   incomeDonut: null,
 };
@@ -19,10 +20,12 @@ const renderCharts = () => {
   if (typeof Chart === "undefined") return;
 
   const lineData = getJson("line-chart-data");
+  const cashFlowData = getJson("cash-flow-chart-data");
   const expenseData = getJson("expense-chart-data");
   const incomeData = getJson("income-chart-data");
 
   const lineCanvas = document.getElementById("expenseLineChart");
+  const cashFlowCanvas = document.getElementById("cashFlowChart");
   const expenseCanvas = document.getElementById("expenseDonutChart");
   const incomeCanvas = document.getElementById("incomeDonutChart");
 
@@ -55,6 +58,44 @@ const renderCharts = () => {
     });
   }
 
+  if (cashFlowCanvas && cashFlowData) {
+    chartState.cashFlow?.destroy();
+    chartState.cashFlow = new Chart(cashFlowCanvas, {
+      data: {
+        labels: cashFlowData.labels,
+        datasets: [
+          {
+            type: "bar",
+            label: "Receitas",
+            data: cashFlowData.income,
+            backgroundColor: "rgba(34, 197, 94, 0.6)",
+          },
+          {
+            type: "bar",
+            label: "Despesas",
+            data: cashFlowData.expense,
+            backgroundColor: "rgba(244, 63, 94, 0.6)",
+          },
+          {
+            type: "line",
+            label: "Saldo acumulado",
+            data: cashFlowData.balance,
+            borderColor: "#4c7dff",
+            backgroundColor: "rgba(76, 125, 255, 0.2)",
+            tension: 0.3,
+          },
+        ],
+      },
+      options: {
+        responsive: true,
+        plugins: { legend: { position: "bottom" } },
+        scales: {
+          x: { grid: { display: false } },
+        },
+      },
+    });
+  }
+
   if (expenseCanvas && expenseData) {
     chartState.expenseDonut?.destroy();
     chartState.expenseDonut = new Chart(expenseCanvas, {
@@ -0,0 +1,65 @@
+(() => {
+  const initChart = async () => {
+    const canvas = document.getElementById("netWorthChart");
+    if (!canvas || typeof Chart === "undefined") return;
+
+    let data;
+    try {
+      const response = await fetch(canvas.dataset.url, { headers: { Accept: "application/json" } });
+      data = await response.json();
+    } catch (error) {
+      console.error("Erro ao carregar patrimônio líquido:", error);
+      return;
+    }
+
+    new Chart(canvas, {
+      data: {
+        labels: data.labels,
+        datasets: [
+          {
+            type: "line",
+            label: "Patrimônio líquido",
+            data: data.net_worth,
+            borderColor: "#2563eb",
+            backgroundColor: "rgba(37, 99, 235, 0.15)",
+            tension: 0.3,
+            fill: true,
+          },
+          {
+            type: "bar",
+            label: "Investimentos",
+            data: data.investments,
+            backgroundColor: "rgba(16, 185, 129, 0.5)",
+          },
+          {
+            type: "bar",
+            label: "Contas",
+            data: data.cash,
+            backgroundColor: "rgba(14, 116, 144, 0.4)",
+          },
+          {
+            type: "bar",
+            label: "Parcelas a vencer",
+            data: data.liabilities.map((value) => -value),
+            backgroundColor: "rgba(239, 68, 68, 0.45)",
+          },
+        ],
+      },
+      options: {
+        responsive: true,
+        plugins: {
+          legend: { position: "bottom" },
+        },
+        scales: {
+          y: {
+            ticks: {
+              callback: (value) => `R$ ${value}`,
+            },
+          },
+        },
+      },
+    });
+  };
+
+  document.addEventListener("DOMContentLoaded", initChart);
+})();
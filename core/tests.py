@@ -1,3 +1,774 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import slow_queries
+from .log_buffer import SystemLogBuffer, system_log_buffer
+from .log_fingerprint import error_fingerprint
+from .metrics import RECURRING_GENERATED, Histogram, registry
+from .bot_identities import resolve_bot_identity
+from .models import (
+    BotIdentity,
+    CardStatementInitialBalance,
+    Household,
+    HouseholdMembership,
+    QuickExpense,
+    QuickExpenseMonthlyTotal,
+    SystemLog,
+    SystemLogDailySummary,
+    WebhookMessage,
+)
+from .perf import percentile, perf_store
+from .slow_queries import normalize_sql, sql_fingerprint
+from .utils_webhook import FinanceBot
+from .webhook_loadtest import parse_server_queries, run_load_test, seed_loadtest_senders, summarize
+from .webhook import (
+    get_bot_state_key,
+    handle_add_expense,
+    handle_clear_month,
+    handle_set_initial_balance,
+    process_webhook_message,
+)
+from .webhook_worker import outbox
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        perf_store.reset()
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
+        self.client.login(username="ana", password="pass1234")
+
+    def test_response_carries_server_timing_and_route_stats(self):
+        response = self.client.get(reverse("finance:categories"))
+
+        header = response["Server-Timing"]
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(header, r"tpl;dur=[\d.]+")
+        self.assertNotIn("budget", header)
+        stats = {stat.route: stat for stat in perf_store.snapshot()}
+        self.assertEqual(stats["finance:categories"].count, 1)
+        self.assertEqual(stats["finance:categories"].flagged, 0)
+
+        response = self.client.get(reverse("system-logs"))
+        self.assertContains(response, "<code>finance:categories</code>")
+
+    @override_settings(PERF_QUERY_BUDGET=0)
+    def test_requests_over_budget_are_flagged(self):
+        with self.assertLogs("core.middleware", level="WARNING"):
+            response = self.client.get(reverse("finance:categories"))
+
+        self.assertIn('budget;desc="exceeded"', response["Server-Timing"])
+        self.assertEqual(perf_store.snapshot()[0].flagged, 1)
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([], 95), 0)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.metrics_dir.cleanup)
+        settings_override = override_settings(METRICS_DIR=self.metrics_dir.name, METRICS_TOKEN="segredo")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
+
+    def test_metrics_require_owner_or_token(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer errado").status_code, 403)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer segredo")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "# TYPE financeiro_http_request_duration_seconds histogram")
+
+        self.client.login(username="ana", password="pass1234")
+        self.client.get(reverse("finance:categories"))
+        response = self.client.get(url)
+        self.assertContains(
+            response, 'financeiro_http_request_duration_seconds_count{view="finance:categories"}'
+        )
+        self.assertContains(response, 'financeiro_cache_requests_total{cache="household",result="hit"}')
+
+    def test_counters_are_summed_across_worker_files(self):
+        before = registry.collect()[RECURRING_GENERATED.name].get("[]", 0)
+        RECURRING_GENERATED.inc(2)
+        other_worker = {RECURRING_GENERATED.name: {"[]": 5}}
+        Path(self.metrics_dir.name, f"{os.getppid()}.json").write_text(json.dumps(other_worker))
+
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer segredo")
+        self.assertContains(response, f"{RECURRING_GENERATED.name} {before + 7}")
+
+    def test_files_of_dead_workers_are_dropped(self):
+        before = registry.collect()[RECURRING_GENERATED.name].get("[]", 0)
+        dead = Path(self.metrics_dir.name, "999999999.json")
+        dead.write_text(json.dumps({RECURRING_GENERATED.name: {"[]": 5}}))
+
+        self.assertEqual(registry.collect()[RECURRING_GENERATED.name].get("[]", 0), before)
+        self.assertFalse(dead.exists())
+
+    def test_timer_decorator_keeps_start_per_call(self):
+        histogram = Histogram("financeiro_test_timer_seconds", "Teste.")
+
+        @histogram.time()
+        def wait(delay):
+            time.sleep(delay)
+
+        # The long call starts first; the short one starts later and both finish together.
+        long_call = threading.Thread(target=wait, args=(0.3,))
+        short_call = threading.Thread(target=wait, args=(0.05,))
+        long_call.start()
+        time.sleep(0.25)
+        short_call.start()
+        long_call.join()
+        short_call.join()
+
+        value = registry.snapshot()[histogram.name]["[]"]
+        self.assertEqual(value["count"], 2)
+        # With a shared start time the long call would be recorded as ~0.05 s.
+        self.assertGreater(value["sum"], 0.3)
+
+
+class SlowQueryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
+        self.client.login(username="ana", password="pass1234")
+        slow_queries._explained.clear()
+
+    def test_fingerprint_ignores_literals_and_in_list_length(self):
+        self.assertEqual(
+            normalize_sql("SELECT *  FROM t0 WHERE id IN (%s, %s, %s) AND name = 'x'"),
+            "SELECT * FROM t0 WHERE id IN (...) AND name = ?",
+        )
+        self.assertEqual(
+            sql_fingerprint("SELECT * FROM t WHERE id IN (1, 2)"),
+            sql_fingerprint("SELECT * FROM t WHERE id IN (%s)"),
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN=True)
+    def test_slow_queries_are_logged_once_per_fingerprint(self):
+        url = reverse("finance:categories")
+        self.client.get(url)
+        first = SystemLog.objects.filter(level=SystemLog.LEVEL_PERF)
+        count = first.count()
+        self.assertGreater(count, 0)
+        log = first.filter(details__contains="finance_category").first()
+        self.assertIn("View: finance:categories", log.details)
+        self.assertIn("EXPLAIN:", log.details)
+
+        self.client.get(url)
+        self.assertEqual(SystemLog.objects.filter(level=SystemLog.LEVEL_PERF).count(), count)
+        log.refresh_from_db()
+        self.assertEqual(log.occurrences, 2)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0, SYSTEM_LOG_BUFFERED=True)
+    def test_slow_queries_go_through_the_log_buffer(self):
+        # No writer thread: the test flushes explicitly.
+        with mock.patch.object(system_log_buffer, "interval", None), mock.patch.object(
+            system_log_buffer, "max_size", 10_000
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse("finance:categories"))
+            self.assertFalse([query for query in queries if "core_systemlog" in query["sql"]])
+            self.assertGreater(system_log_buffer.pending(), 0)
+            system_log_buffer.flush()
+        self.assertTrue(SystemLog.objects.filter(level=SystemLog.LEVEL_PERF).exists())
+
+
+class SystemLogBufferTests(TestCase):
+    def setUp(self):
+        self.spool = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spool.cleanup)
+        settings_override = override_settings(SYSTEM_LOG_BUFFERED=True, SYSTEM_LOG_SPOOL_DIR=self.spool.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # No thread: the tests trigger the flush explicitly.
+        self.buffer = SystemLogBuffer(max_size=3, interval=None)
+
+    def test_records_are_written_in_one_batch_with_original_time(self):
+        self.buffer.enqueue(SystemLog.LEVEL_ERROR, SystemLog.SOURCE_FRONTEND, "Falha no login")
+        self.buffer.enqueue(SystemLog.LEVEL_ERROR, SystemLog.SOURCE_FRONTEND, "Falha no checkout")
+        self.assertEqual(SystemLog.objects.count(), 0)
+        self.assertEqual(self.buffer.pending(), 2)
+
+        queued_at = timezone.now()
+        with mock.patch("django.utils.timezone.now", return_value=queued_at + timedelta(hours=1)):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(SystemLog.objects.count(), 2)
+        self.assertLess(SystemLog.objects.first().created_at, queued_at + timedelta(minutes=1))
+
+    def test_full_queue_flushes(self):
+        for idx in range(3):
+            self.buffer.enqueue(SystemLog.LEVEL_INFO, SystemLog.SOURCE_BACKEND, f"Msg {idx}")
+        self.assertEqual(SystemLog.objects.count(), 3)
+        self.assertEqual(self.buffer.pending(), 0)
+
+    def test_database_outage_spools_and_command_ingests(self):
+        self.buffer.enqueue(SystemLog.LEVEL_ERROR, SystemLog.SOURCE_BACKEND, "Sem banco", "trace")
+        with mock.patch.object(SystemLog.objects, "bulk_create", side_effect=DatabaseError("down")):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(SystemLog.objects.count(), 0)
+        self.assertEqual(len(list(Path(self.spool.name).glob("*.jsonl"))), 1)
+
+        call_command("ingest_system_log_spool", stdout=StringIO())
+        log = SystemLog.objects.get()
+        self.assertEqual((log.message, log.details), ("Sem banco", "trace"))
+        self.assertEqual(list(Path(self.spool.name).iterdir()), [])
+
+    def test_corrupt_lines_are_quarantined_and_leftovers_ingested(self):
+        self.buffer.enqueue(SystemLog.LEVEL_ERROR, SystemLog.SOURCE_BACKEND, "Antes da queda")
+        with mock.patch.object(SystemLog.objects, "bulk_create", side_effect=DatabaseError("down")):
+            self.buffer.flush()
+        spool = next(Path(self.spool.name).glob("*.jsonl"))
+        # A crash mid-write leaves a truncated last line.
+        with spool.open("a", encoding="utf-8") as handle:
+            handle.write('{"level": "ERRO", "mess\n')
+        # A previous run died after claiming this file.
+        leftover = Path(self.spool.name, "systemlog-1.ingesting")
+        record = json.loads(spool.read_text().splitlines()[0])
+        leftover.write_text(json.dumps({**record, "message": "Sobra", "fingerprint": ""}) + "\n")
+
+        out, err = StringIO(), StringIO()
+        call_command("ingest_system_log_spool", stdout=out, stderr=err)
+
+        self.assertEqual(set(SystemLog.objects.values_list("message", flat=True)), {"Antes da queda", "Sobra"})
+        self.assertIn("1 linha(s) em quarentena", out.getvalue())
+        remaining = list(Path(self.spool.name).iterdir())
+        self.assertEqual([path.suffix for path in remaining], [".rejected"])
+        self.assertIn('"mess', remaining[0].read_text())
+
+    @override_settings(SYSTEM_LOG_BUFFERED=False)
+    def test_unbuffered_mode_writes_immediately(self):
+        self.client.post("/api/log-error/", data=json.dumps({"message": "JS"}), content_type="application/json")
+        self.assertEqual(SystemLog.objects.get().source, SystemLog.SOURCE_FRONTEND)
+
+
+class SystemLogListTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
+        self.client.login(username="ana", password="pass1234")
+        now = timezone.now()
+        self.logs = SystemLog.objects.bulk_create(
+            SystemLog(
+                level=SystemLog.LEVEL_ERROR if idx % 2 else SystemLog.LEVEL_INFO,
+                source=SystemLog.SOURCE_BACKEND,
+                message=f"Log {idx}",
+                details=f"Traceback {idx}",
+                created_at=now - timedelta(days=idx),
+                is_resolved=idx == 4,
+            )
+            for idx in range(5)
+        )
+
+    def _api(self, **params):
+        return self.client.get(reverse("system-logs-api"), params).json()
+
+    def test_api_pages_by_cursor_without_details(self):
+        messages, cursor = [], None
+        while True:
+            data = self._api(limit=2, **({"cursor": cursor} if cursor else {}))
+            self.assertTrue(all("details" not in item for item in data["results"]))
+            messages += [item["message"] for item in data["results"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(messages, [f"Log {idx}" for idx in range(5)])
+
+    def test_api_filters(self):
+        self.assertEqual(len(self._api(level=SystemLog.LEVEL_ERROR)["results"]), 2)
+        self.assertEqual([item["message"] for item in self._api(resolved="1")["results"]], ["Log 4"])
+        since = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.assertEqual(len(self._api(since=since)["results"]), 2)
+        self.assertEqual(len(self._api(source=SystemLog.SOURCE_FRONTEND)["results"]), 0)
+
+    def test_details_are_loaded_on_demand(self):
+        log = self.logs[0]
+        response = self.client.get(reverse("system-logs"))
+        self.assertContains(response, "Log 0")
+        self.assertNotContains(response, "Traceback 0")
+
+        response = self.client.get(reverse("system-log-details", args=[log.id]))
+        self.assertContains(response, "Traceback 0")
+        data = self.client.get(reverse("system-log-detail-api", args=[log.id])).json()
+        self.assertEqual(data["details"], "Traceback 0")
+
+    def test_pending_count_and_filters_use_indexes(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plan check is written for SQLite.")
+        requests = {
+            "systemlog_resolved_idx": (reverse("system-logs-pending-count"), {}),
+            "systemlog_level_idx": (reverse("system-logs-api"), {"level": SystemLog.LEVEL_ERROR}),
+        }
+        for index, (url, params) in requests.items():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, params)
+            sql = next(query["sql"] for query in queries if "core_systemlog" in query["sql"])
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = " ".join(row[-1] for row in cursor.fetchall())
+            self.assertIn(index, plan)
+
+
+PYTHON_TRACEBACK = """Traceback (most recent call last):
+  File "/srv/app/releases/{release}/finance/views.py", line {line}, in entry_list
+    page = keyset_paginate(queryset)
+  File "/srv/app/releases/{release}/finance/pagination.py", line 61, in keyset_paginate
+    values = decode_cursor(queryset.model)
+KeyError: '{key}'
+"""
+
+JS_STACK = """TypeError: Cannot read properties of undefined (reading 'total')
+    at renderTotals (https://app.example/static/core/app.js?v={build}:{line}:17)
+    at loadDashboard (https://app.example/static/core/app.js?v={build}:210:5)"""
+
+
+class ErrorFingerprintTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
+        self.client.login(username="ana", password="pass1234")
+
+    def _fingerprint(self, message, details, level=SystemLog.LEVEL_ERROR):
+        return error_fingerprint(level, SystemLog.SOURCE_BACKEND, message, details)
+
+    def test_fingerprint_ignores_ids_paths_and_line_numbers(self):
+        first = self._fingerprint("'abc'", PYTHON_TRACEBACK.format(release="v1", line=540, key="abc"))
+        again = self._fingerprint("'xyz'", PYTHON_TRACEBACK.format(release="v2", line=548, key="xyz"))
+        self.assertEqual(first, again)
+        other_view = PYTHON_TRACEBACK.format(release="v1", line=540, key="abc").replace("entry_list", "receivable_list")
+        self.assertNotEqual(first, self._fingerprint("'abc'", other_view))
+
+        message = "Cannot read properties of undefined"
+        self.assertEqual(
+            self._fingerprint(message, JS_STACK.format(build="111", line=88)),
+            self._fingerprint(message, JS_STACK.format(build="222", line=91)),
+        )
+        self.assertEqual(self._fingerprint("Webhook msg", "", level=SystemLog.LEVEL_INFO), "")
+
+    def test_repeated_errors_update_one_row_until_resolved(self):
+        payload = {"message": "Falha 42", "details": JS_STACK.format(build="1", line=5)}
+        for _ in range(3):
+            self.client.post(reverse("log-error"), data=json.dumps(payload), content_type="application/json")
+        log = SystemLog.objects.get()
+        self.assertEqual(log.occurrences, 3)
+        self.assertGreaterEqual(log.last_seen_at, log.created_at)
+
+        log.is_resolved = True
+        log.save(update_fields=["is_resolved"])
+        self.client.post(reverse("log-error"), data=json.dumps(payload), content_type="application/json")
+        self.assertEqual(SystemLog.objects.filter(is_resolved=False).get().occurrences, 1)
+
+    @override_settings(SYSTEM_LOG_BUFFERED=True)
+    def test_batch_collapses_repeats_into_one_insert(self):
+        buffer = SystemLogBuffer(interval=None)
+        for idx in range(5):
+            buffer.enqueue(SystemLog.LEVEL_ERROR, SystemLog.SOURCE_BACKEND, f"Timeout após {idx} s")
+        buffer.enqueue(SystemLog.LEVEL_INFO, SystemLog.SOURCE_BACKEND, "Webhook msg")
+        buffer.enqueue(SystemLog.LEVEL_INFO, SystemLog.SOURCE_BACKEND, "Webhook msg")
+        buffer.flush()
+
+        self.assertEqual(SystemLog.objects.filter(level=SystemLog.LEVEL_ERROR).get().occurrences, 5)
+        self.assertEqual(SystemLog.objects.filter(level=SystemLog.LEVEL_INFO).count(), 2)
+
+
+class SystemLogRetentionTests(TestCase):
+    def _log(self, level, days_ago, last_seen_days_ago=None, source=SystemLog.SOURCE_BACKEND):
+        created_at = timezone.now() - timedelta(days=days_ago)
+        last_seen = timezone.now() - timedelta(days=days_ago if last_seen_days_ago is None else last_seen_days_ago)
+        return SystemLog.objects.create(
+            level=level, source=source, message="Log", created_at=created_at, last_seen_at=last_seen
+        )
+
+    @override_settings(SYSTEM_LOG_RETENTION_DAYS={"INFO": 7, "ERRO": 90})
+    def test_levels_expire_on_their_own_window_in_chunks(self):
+        for _ in range(7):
+            self._log(SystemLog.LEVEL_INFO, days_ago=10)
+        self._log(SystemLog.LEVEL_INFO, days_ago=10, source=SystemLog.SOURCE_FRONTEND)
+        kept_info = self._log(SystemLog.LEVEL_INFO, days_ago=2)
+        recent_error = self._log(SystemLog.LEVEL_ERROR, days_ago=10)
+        recurring_error = self._log(SystemLog.LEVEL_ERROR, days_ago=120, last_seen_days_ago=1)
+        self._log(SystemLog.LEVEL_ERROR, days_ago=120)
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("cleanup_system_logs", "--chunk-size", "3", stdout=StringIO())
+
+        self.assertEqual(
+            set(SystemLog.objects.values_list("id", flat=True)), {kept_info.id, recent_error.id, recurring_error.id}
+        )
+        deletes = [query["sql"] for query in queries if query["sql"].startswith("DELETE")]
+        self.assertGreaterEqual(len(deletes), 3)
+        self.assertTrue(all('"id" >=' in sql and '"id" <' in sql for sql in deletes))
+
+        summaries = {
+            (summary.level, summary.source): summary.count for summary in SystemLogDailySummary.objects.all()
+        }
+        self.assertEqual(
+            summaries,
+            {
+                (SystemLog.LEVEL_INFO, SystemLog.SOURCE_BACKEND): 7,
+                (SystemLog.LEVEL_INFO, SystemLog.SOURCE_FRONTEND): 1,
+                (SystemLog.LEVEL_ERROR, SystemLog.SOURCE_BACKEND): 1,
+            },
+        )
+
+    @override_settings(SYSTEM_LOG_RETENTION_DAYS={"INFO": 7, "ERRO": 90})
+    def test_sparse_level_is_deleted_without_empty_chunks(self):
+        self._log(SystemLog.LEVEL_ERROR, days_ago=120)
+        for _ in range(30):
+            self._log(SystemLog.LEVEL_INFO, days_ago=1)
+        self._log(SystemLog.LEVEL_ERROR, days_ago=120)
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("cleanup_system_logs", "--chunk-size", "3", "--pause", "0", stdout=StringIO())
+
+        self.assertEqual(SystemLog.objects.count(), 30)
+        deletes = [query["sql"] for query in queries if query["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 1)
+
+    def test_days_option_applies_to_every_level(self):
+        self._log(SystemLog.LEVEL_ERROR, days_ago=3)
+        self._log(SystemLog.LEVEL_PERF, days_ago=3)
+        call_command("cleanup_system_logs", "--days", "1", stdout=StringIO())
+        self.assertFalse(SystemLog.objects.exists())
+
+
+@override_settings(FRONTEND_LOG_BURST=3, FRONTEND_LOG_RATE_PER_MINUTE=6)
+class FrontendLogBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _post(self, payload):
+        return self.client.post(reverse("log-error"), data=json.dumps(payload), content_type="application/json")
+
+    def test_batch_is_deduplicated(self):
+        errors = [{"message": "Falha no gráfico", "details": "at render (app.js:1:1)"}] * 4
+        errors.append({"message": "Sem rede", "level": SystemLog.LEVEL_WARNING})
+        response = self._post({"errors": errors})
+
+        self.assertEqual(response.json(), {"created": True, "accepted": 2, "dropped": 0})
+        self.assertEqual(
+            dict(SystemLog.objects.values_list("message", "occurrences")), {"Falha no gráfico": 4, "Sem rede": 1}
+        )
+        self.assertEqual(SystemLog.objects.get(message="Sem rede").level, SystemLog.LEVEL_WARNING)
+
+    def test_token_bucket_limits_each_client(self):
+        errors = [{"message": f"Erro {word}"} for word in ("um", "dois", "três", "quatro")]
+        self.assertEqual(self._post({"errors": errors}).json()["dropped"], 1)
+
+        response = self._post({"message": "Mais um"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "10")
+        self.assertEqual(SystemLog.objects.count(), 3)
+
+        # Another client has its own bucket.
+        response = self.client.post(
+            reverse("log-error"), data=json.dumps({"message": "Outro"}), content_type="application/json",
+            REMOTE_ADDR="10.0.0.2",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(TRUSTED_PROXY_HOPS=1)
+    def test_anonymous_clients_behind_the_router_get_their_own_bucket(self):
+        def post(forwarded_for):
+            return self.client.post(
+                reverse("log-error"), data=json.dumps({"message": f"Erro de {forwarded_for}"}),
+                content_type="application/json", REMOTE_ADDR="10.1.1.1", HTTP_X_FORWARDED_FOR=forwarded_for,
+            )
+
+        for _ in range(3):
+            self.assertEqual(post("203.0.113.5").status_code, 200)
+        self.assertEqual(post("203.0.113.5").status_code, 429)
+        # Same router address, different client; a spoofed leading entry doesn't change the key.
+        self.assertEqual(post("203.0.113.9").status_code, 200)
+        self.assertEqual(post("1.2.3.4, 203.0.113.5").status_code, 429)
+
+
+@override_settings(
+    TWILIO_WEBHOOK_ASYNC=True,
+    TWILIO_WEBHOOK_THREADED=False,
+    TWILIO_REPLY_BACKEND="core.webhook_worker.LocMemReplyBackend",
+    TWILIO_ALLOWED_NUMBERS=["+5516999999999"],
+)
+class AsyncWebhookTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        outbox.clear()
+        self.user = get_user_model().objects.create_user(username="bot", password="pass1234")
+        today = timezone.localdate()
+        CardStatementInitialBalance.objects.create(
+            user=self.user, year=today.year, month=today.month, saldo_inicial=Decimal("100.00")
+        )
+        settings_override = override_settings(FINANCE_BOT_USER_ID=self.user.id)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _deliver(self, body, sid="SM123", sender="whatsapp:+5516999999999"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("twilio_webhook"), {"Body": body, "From": sender, "MessageSid": sid})
+
+    def test_ack_is_empty_and_reply_goes_through_rest_client(self):
+        response = self._deliver("15,50 - Almoço")
+
+        self.assertEqual(response["Content-Type"], "application/xml")
+        self.assertNotIn("<Message>", response.content.decode())
+        self.assertEqual(QuickExpense.objects.get().valor, Decimal("15.50"))
+        message = WebhookMessage.objects.get()
+        self.assertEqual(message.status, WebhookMessage.STATUS_DONE)
+        self.assertEqual(outbox, [("+5516999999999", message.reply)])
+        self.assertIn("Almoço", message.reply)
+
+    def test_redelivered_message_sid_is_a_no_op(self):
+        self._deliver("15,50 - Almoço")
+        self._deliver("15,50 - Almoço")
+        self._deliver("20 - Lanche", sid="SM124")
+
+        self.assertEqual(QuickExpense.objects.count(), 2)
+        self.assertEqual(WebhookMessage.objects.count(), 2)
+        self.assertEqual(len(outbox), 2)
+
+    def test_unknown_sender_is_not_stored(self):
+        self._deliver("15 - Almoço", sender="whatsapp:+5511000000000")
+        self.assertFalse(WebhookMessage.objects.exists())
+
+    def test_command_processes_messages_left_pending(self):
+        WebhookMessage.objects.create(message_sid="SM900", sender="+5516999999999", body="10 - Café")
+        call_command("process_webhook_messages", stdout=StringIO())
+
+        self.assertEqual(WebhookMessage.objects.get().status, WebhookMessage.STATUS_DONE)
+        self.assertEqual(QuickExpense.objects.get().descricao, "Café")
+        self.assertEqual(len(outbox), 1)
+
+    def test_messages_from_one_sender_run_in_order(self):
+        CardStatementInitialBalance.objects.all().delete()
+        first = WebhookMessage.objects.create(message_sid="SM901", sender="+5516999999999", body="12,50 - Almoço")
+        second = WebhookMessage.objects.create(message_sid="SM902", sender="+5516999999999", body="1000")
+
+        # The newer message must wait while an older one from the same sender is open.
+        process_webhook_message(second.id)
+        second.refresh_from_db()
+        self.assertEqual(second.status, WebhookMessage.STATUS_PENDING)
+
+        # Finishing the older message drains the sender's queue in order.
+        process_webhook_message(first.id)
+        self.assertEqual(
+            set(WebhookMessage.objects.values_list("status", flat=True)), {WebhookMessage.STATUS_DONE}
+        )
+        self.assertEqual(QuickExpense.objects.get().descricao, "Almoço")
+        self.assertEqual(CardStatementInitialBalance.objects.get().saldo_inicial, Decimal("1000"))
+
+    def test_stale_reset_uses_claim_time(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        WebhookMessage.objects.create(
+            message_sid="SM903",
+            sender="+5516999999999",
+            body="10 - Café",
+            status=WebhookMessage.STATUS_PROCESSING,
+            received_at=long_ago,
+            claimed_at=timezone.now(),
+        )
+        call_command("process_webhook_messages", stdout=StringIO())
+        self.assertEqual(WebhookMessage.objects.get().status, WebhookMessage.STATUS_PROCESSING)
+        self.assertFalse(QuickExpense.objects.exists())
+
+        WebhookMessage.objects.update(claimed_at=long_ago)
+        call_command("process_webhook_messages", stdout=StringIO())
+        self.assertEqual(WebhookMessage.objects.get().status, WebhookMessage.STATUS_DONE)
+
+
+@override_settings(TWILIO_ALLOWED_NUMBERS=[])
+class BotIdentityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        today = timezone.localdate()
+        self.identities = {}
+        for username, phone in (("ana", "+5516911111111"), ("bia", "+5516922222222")):
+            user = get_user_model().objects.create_user(username=username, password="pass1234")
+            CardStatementInitialBalance.objects.create(
+                user=user, year=today.year, month=today.month, saldo_inicial=Decimal("0")
+            )
+            self.identities[username] = BotIdentity.objects.create(
+                phone_number=phone, user=user, household=self.household
+            )
+
+    def _deliver(self, phone, body):
+        return self.client.post(reverse("twilio_webhook"), {"Body": body, "From": f"whatsapp:{phone}"})
+
+    def test_each_member_records_own_expenses(self):
+        self._deliver("+5516911111111", "10 - Café")
+        self._deliver("+5516922222222", "25 - Almoço")
+
+        self.assertEqual(
+            dict(QuickExpense.objects.values_list("user__username", "descricao")), {"ana": "Café", "bia": "Almoço"}
+        )
+        response = self._deliver("+5516900000000", "10 - Intruso")
+        self.assertEqual(response.content, b"")
+        self.assertEqual(QuickExpense.objects.count(), 2)
+
+    def test_warm_lookup_makes_no_identity_queries(self):
+        resolve_bot_identity("+5516911111111")
+        with CaptureQueriesContext(connection) as queries:
+            user_id, household_id = resolve_bot_identity("+5516911111111")
+            self._deliver("+5516911111111", "menu")
+        self.assertEqual((user_id, household_id), (self.identities["ana"].user_id, self.household.id))
+        # Only ids are cached, never User instances.
+        self.assertEqual(cache.get("bot-identity:+5516911111111")[1:3], (user_id, household_id))
+        tables = {BotIdentity._meta.db_table, get_user_model()._meta.db_table, Household._meta.db_table}
+        self.assertFalse([query["sql"] for query in queries if any(f'"{table}"' in query["sql"] for table in tables)])
+
+    def test_changes_invalidate_the_cache(self):
+        identity = self.identities["ana"]
+        resolve_bot_identity(identity.phone_number)
+
+        identity.is_active = False
+        identity.save()
+        self.assertEqual(resolve_bot_identity(identity.phone_number), (None, None))
+
+        identity.is_active = True
+        identity.phone_number = "+5516933333333"
+        identity.save()
+        self.assertEqual(resolve_bot_identity("+5516911111111"), (None, None))
+        self.assertEqual(resolve_bot_identity("+5516933333333")[0], identity.user_id)
+
+        identity.delete()
+        self.assertEqual(resolve_bot_identity("+5516933333333"), (None, None))
+
+    @override_settings(TWILIO_ALLOWED_NUMBERS=["+5516999999999"])
+    def test_allowed_numbers_fall_back_to_the_bot_user(self):
+        bia = self.identities["bia"].user
+        with self.settings(FINANCE_BOT_USER_ID=bia.id):
+            self.assertEqual(resolve_bot_identity("+5516999999999")[0], bia.id)
+        ana = self.identities["ana"].user
+        with self.settings(FINANCE_BOT_USER_ID=ana.id):
+            self.assertEqual(resolve_bot_identity("+5516999999999")[0], ana.id)
+
+
+class QuickExpenseMonthlyTotalTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.today = timezone.localdate()
+
+    def _total(self):
+        row = QuickExpenseMonthlyTotal.objects.get(user=self.user, year=self.today.year, month=self.today.month)
+        return row.total, row.count
+
+    def test_totals_follow_create_update_and_delete(self):
+        coffee = QuickExpense.objects.create(user=self.user, descricao="Café", valor=Decimal("7.50"))
+        QuickExpense.objects.create(user=self.user, descricao="Almoço", valor=Decimal("32.00"))
+        self.assertEqual(self._total(), (Decimal("39.50"), 2))
+
+        coffee.valor = Decimal("9.00")
+        coffee.save()
+        self.assertEqual(self._total(), (Decimal("41.00"), 2))
+
+        coffee.delete()
+        self.assertEqual(self._total(), (Decimal("32.00"), 1))
+
+        handle_clear_month(self.user.id, "+5516999999999")
+        self.assertEqual(self._total(), (Decimal("0.00"), 0))
+
+    def test_webhook_replies_report_the_materialized_month_total(self):
+        cache.clear()
+        phone = "+5516999999999"
+        handle_add_expense(self.user.id, phone, "20 - Almoço")
+        reply = handle_set_initial_balance(self.user.id, phone, "100")
+        self.assertIn("Total da fatura: R$ 120.00", reply)
+
+        # The total comes from the totals row, not from summing the month's expenses.
+        QuickExpenseMonthlyTotal.objects.filter(user=self.user).update(total=Decimal("50.00"))
+        reply = handle_add_expense(self.user.id, phone, "5,50 - Café")
+        self.assertIn("Total da fatura: R$ 155.50", reply)
+
+    def test_bot_total_is_one_query(self):
+        QuickExpense.objects.create(user=self.user, descricao="Café", valor=Decimal("7.50"))
+        bot = FinanceBot("whatsapp:+5516999999999", self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(bot.get_monthly_total(), Decimal("7.50"))
+
+    def test_reconcile_fixes_drift(self):
+        QuickExpense.objects.create(user=self.user, descricao="Café", valor=Decimal("7.50"))
+        QuickExpenseMonthlyTotal.objects.update(total=Decimal("999"), count=9)
+        QuickExpenseMonthlyTotal.objects.create(user=self.user, year=2001, month=1, total=Decimal("5"), count=1)
+
+        out = StringIO()
+        call_command("reconcile_quick_expense_totals", stdout=out)
+
+        self.assertIn("2 totais", out.getvalue())
+        self.assertEqual(self._total(), (Decimal("7.50"), 1))
+        self.assertFalse(QuickExpenseMonthlyTotal.objects.filter(year=2001).exists())
+
+
+class WebhookCacheStateTests(TestCase):
+    phone = "+5516999999999"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pending_expense_lives_in_one_state_record(self):
+        user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        handle_add_expense(user.id, self.phone, "15 - Almoço")
+        self.assertEqual(cache.get(get_bot_state_key(self.phone))["pending"]["descricao"], "Almoço")
+
+        handle_set_initial_balance(user.id, self.phone, "100")
+        self.assertIsNone(cache.get(get_bot_state_key(self.phone)))
+        self.assertEqual(QuickExpense.objects.get().descricao, "Almoço")
+
+
+@override_settings(TWILIO_ALLOWED_NUMBERS=[], TWILIO_REPLY_BACKEND="core.webhook_worker.LocMemReplyBackend")
+class WebhookLoadTestTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_scripted_conversations_report_latency_and_queries(self):
+        phones = seed_loadtest_senders(2)
+        # One request at a time: the live server shares the in-memory SQLite connection across threads.
+        samples = run_load_test(self.live_server_url, phones, concurrency=1)
+
+        self.assertEqual(len(samples), 12)
+        self.assertFalse([sample for sample in samples if sample.failed])
+        self.assertTrue(all(sample.replied for sample in samples))
+        summary = summarize(samples)
+        self.assertEqual(set(summary), {"menu", "despesa", "saldo", "extrato", "excluir"})
+        self.assertEqual(summary["despesa"]["count"], 4)
+        self.assertIsNotNone(summary["saldo"]["queries_max"])
+        # Each sender added two expenses and deleted the last one.
+        self.assertEqual(QuickExpense.objects.count(), 2)
+        self.assertEqual(CardStatementInitialBalance.objects.count(), 2)
+
+    def test_command_against_running_server(self):
+        out = StringIO()
+        call_command("loadtest_webhook", url=self.live_server_url, senders=1, seed=True, concurrency=1, stdout=out)
+        self.assertIn("6 requisições", out.getvalue())
+        self.assertIn("0 com erro", out.getvalue())
+
+    def test_server_timing_query_count(self):
+        self.assertEqual(parse_server_queries('db;dur=1.2;desc="7 queries", total;dur=3.0'), 7)
+        self.assertIsNone(parse_server_queries(""))
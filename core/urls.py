@@ -10,6 +10,8 @@ urlpatterns = [
     path("logs/", views.system_logs_view, name="system-logs"),
     path("logs/<int:log_id>/resolve/", views.system_log_resolve, name="system-log-resolve"),
     path("logs/<int:log_id>/delete/", views.system_log_delete, name="system-log-delete"),
+    path("logs/<int:log_id>/details/", views.system_log_details, name="system-log-details"),
+    path("metrics/", views.metrics_view, name="metrics"),
     path("api/log-error/", views.log_error_api, name="log-error"),
     path("api/system-logs/", views.system_logs_api, name="system-logs-api"),
     path("api/system-logs/<int:log_id>/", views.system_log_detail_api, name="system-log-detail-api"),
@@ -2,10 +2,10 @@
 import logging
 from decimal import Decimal, InvalidOperation
 from django.core.cache import cache
-from django.db.models import Sum
 from django.utils import timezone
 
-from .models import QuickExpense, SystemLog
+from .log_buffer import enqueue_system_log
+from .models import QuickExpense, QuickExpenseMonthlyTotal, SystemLog
 
 logger = logging.getLogger(__name__)
 
@@ -43,11 +43,11 @@ class FinanceBot:
     def process_message(self, incoming_msg):
         # 1. Log incoming message for audit purposes
         try:
-            SystemLog.objects.create(
-                level=SystemLog.LEVEL_INFO,
-                source=SystemLog.SOURCE_BACKEND,
-                message=f"Webhook msg from {self.sender}",
-                details=incoming_msg,
+            enqueue_system_log(
+                SystemLog.LEVEL_INFO,
+                SystemLog.SOURCE_BACKEND,
+                f"Webhook msg from {self.sender}",
+                incoming_msg or "",
             )
         except Exception as e:
             logger.error(f"Failed to create SystemLog: {e}")
@@ -128,15 +128,8 @@ class FinanceBot:
     # =========================
 
     def get_monthly_total(self):
-        today = timezone.now()
-        return (
-            QuickExpense.objects.filter(
-                user=self.user,
-                data__month=today.month,
-                data__year=today.year,
-            ).aggregate(Sum("valor"))["valor__sum"]
-            or Decimal("0.00")
-        )
+        today = timezone.localdate()
+        return QuickExpenseMonthlyTotal.monthly_total(self.user.id, today.year, today.month)
 
     def menu_options(self):
         total = self.get_monthly_total() + self._get_initial_balance()
@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect, render
 from .utils_webhook import FinanceBot
 import json
+from datetime import datetime, time
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
@@ -11,16 +13,23 @@ from .forms import UserRegisterForm
 import logging
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
+from django.utils.crypto import constant_time_compare
 from django.http import HttpResponse, HttpResponseForbidden
 from django.contrib.auth.models import User
+from django.db.models import Q, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from finance.pagination import PAGE_SIZE, keyset_paginate
 from twilio.twiml.messaging_response import MessagingResponse
 
 
 logger = logging.getLogger(__name__)
-from .models import (
-    HouseholdMembership,
-    SystemLog,
-)
+from .households import ROLE_PRIMARY
+from .log_buffer import enqueue_system_log
+from .metrics import registry
+from .perf import perf_store, query_budget, time_budget_ms
+from .rate_limit import TokenBucket, client_ip
+from .models import SystemLog
 
 logger = logging.getLogger(__name__)
 
@@ -105,41 +114,175 @@ def _json_body(request):
 def _can_manage_logs(request):
     if request.user.is_superuser:
         return True
-    if request.household is None:
-        return False
-    return HouseholdMembership.objects.filter(
-        user=request.user, household=request.household, is_primary=True
-    ).exists()
+    return request.household_role == ROLE_PRIMARY
+
+
+LOG_ORDERING = ("-created_at", "-id")
+FRONTEND_LOG_MAX_BATCH = 50
+LOG_API_MAX_LIMIT = 200
+LOG_LIST_FIELDS = (
+    "id", "level", "source", "message", "created_at", "last_seen_at", "is_resolved", "occurrences"
+)
+
 
+def _parse_log_bound(value, end=False):
+    """Aceita data (AAAA-MM-DD) ou data/hora ISO; datas sem hora cobrem o dia inteiro."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        moment = datetime.combine(day, time.max if end else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _resolved_filter(flag):
+    # Com `Value` o SQLite recebe `is_resolved = 0`; o `NOT is_resolved` padrão não usa o índice.
+    return Q(is_resolved=Value(flag))
+
+
+def _filtered_logs(params):
+    """
+    Logs filtrados por nível, fonte, status e período. Sem `details`: o traceback
+    só é carregado quando a linha é expandida.
+    """
+    logs = SystemLog.objects.only(*LOG_LIST_FIELDS)
+    level = params.get("level")
+    if level in {choice[0] for choice in SystemLog.LEVEL_CHOICES}:
+        logs = logs.filter(level=level)
+    source = params.get("source")
+    if source in {choice[0] for choice in SystemLog.SOURCE_CHOICES}:
+        logs = logs.filter(source=source)
+    resolved = params.get("resolved")
+    if resolved in {"0", "1", "false", "true"}:
+        logs = logs.filter(_resolved_filter(resolved in {"1", "true"}))
+    since = _parse_log_bound(params.get("since"))
+    if since:
+        logs = logs.filter(created_at__gte=since)
+    until = _parse_log_bound(params.get("until"), end=True)
+    if until:
+        logs = logs.filter(created_at__lte=until)
+    return logs
+
+
+def _system_logs_context(request):
+    cursor = request.GET.get("cursor")
+    page = keyset_paginate(_filtered_logs(request.GET), LOG_ORDERING, cursor=cursor)
+    next_url = None
+    if page.next_cursor:
+        params = request.GET.copy()
+        params["cursor"] = page.next_cursor
+        next_url = f"{request.path}?{params.urlencode()}"
+    return {
+        "logs": page.items,
+        "next_url": next_url,
+        "filters": request.GET,
+        "level_choices": SystemLog.LEVEL_CHOICES,
+        "source_choices": SystemLog.SOURCE_CHOICES,
+    }
+
+
+def _serialize_log(log, details=False):
+    data = {
+        "id": log.id,
+        "level": log.level,
+        "level_label": log.get_level_display(),
+        "source": log.source,
+        "source_label": log.get_source_display(),
+        "message": log.message,
+        "created_at": log.created_at.isoformat(),
+        "last_seen_at": log.last_seen_at.isoformat(),
+        "is_resolved": log.is_resolved,
+        "occurrences": log.occurrences,
+    }
+    if details:
+        data["details"] = log.details
+    return data
+
+
+def _has_metrics_token(request):
+    token = getattr(settings, "METRICS_TOKEN", "")
+    header = request.headers.get("Authorization", "")
+    return bool(token) and constant_time_compare(header, f"Bearer {token}")
 
-def _system_logs_context():
-    logs = SystemLog.objects.order_by("-created_at")
-    return {"logs": logs}
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    allowed = _has_metrics_token(request) or (
+        request.user.is_authenticated and _can_manage_logs(request)
+    )
+    if not allowed:
+        return HttpResponseForbidden("Acesso negado.")
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @login_required
 def system_logs_view(request):
     if not _can_manage_logs(request):
         return HttpResponseForbidden("Acesso negado.")
-    return render(request, "core/system_logs.html", _system_logs_context())
+    context = _system_logs_context(request)
+    if request.GET.get("cursor"):
+        return render(request, "partials/_system_log_rows.html", context)
+    if request.headers.get("HX-Request") == "true":
+        return render(request, "partials/_system_logs_table.html", context)
+    context.update(
+        {
+            "route_stats": perf_store.snapshot(),
+            "query_budget": query_budget(),
+            "time_budget_ms": time_budget_ms(),
+        }
+    )
+    return render(request, "core/system_logs.html", context)
+
+
+def _frontend_log_entries(payload):
+    """Aceita um erro avulso (formato antigo), uma lista ou {"errors": [...]}."""
+    if isinstance(payload, dict):
+        payload = payload["errors"] if isinstance(payload.get("errors"), list) else [payload]
+    if not isinstance(payload, list):
+        return []
+    return [entry for entry in payload[:FRONTEND_LOG_MAX_BATCH] if isinstance(entry, dict)]
+
+
+def _frontend_log_bucket():
+    return TokenBucket(
+        "frontend-log-bucket",
+        capacity=getattr(settings, "FRONTEND_LOG_BURST", 30),
+        refill_per_second=getattr(settings, "FRONTEND_LOG_RATE_PER_MINUTE", 30) / 60,
+    )
+
+
+def _client_key(request):
+    session_key = getattr(request, "session", None) and request.session.session_key
+    return session_key or client_ip(request)
 
 
 @require_http_methods(["POST"])
 def log_error_api(request):
-    payload = _json_body(request)
-    message = payload.get("message") or "Erro no frontend"
-    details = payload.get("details") or ""
-    level = payload.get("level") or SystemLog.LEVEL_ERROR
-    if level not in {choice[0] for choice in SystemLog.LEVEL_CHOICES}:
-        level = SystemLog.LEVEL_ERROR
-
-    SystemLog.objects.create(
-        level=level,
-        source=SystemLog.SOURCE_FRONTEND,
-        message=message[:255],
-        details=details,
-    )
-    return JsonResponse({"created": True})
+    # Erros idênticos no mesmo lote viram um registro só, com o total de ocorrências.
+    distinct = {}
+    levels = {choice[0] for choice in SystemLog.LEVEL_CHOICES}
+    for entry in _frontend_log_entries(_json_body(request)):
+        message = str(entry.get("message") or "Erro no frontend")[:255]
+        details = str(entry.get("details") or "")
+        level = entry.get("level") if entry.get("level") in levels else SystemLog.LEVEL_ERROR
+        key = (level, message, details)
+        distinct[key] = distinct.get(key, 0) + 1
+
+    bucket = _frontend_log_bucket()
+    accepted = bucket.take(_client_key(request), len(distinct)) if distinct else 0
+    for (level, message, details), count in list(distinct.items())[:accepted]:
+        enqueue_system_log(level, SystemLog.SOURCE_FRONTEND, message, details, occurrences=count)
+
+    if distinct and not accepted:
+        response = JsonResponse({"created": False, "accepted": 0, "dropped": len(distinct)}, status=429)
+        response["Retry-After"] = str(bucket.retry_after())
+        return response
+    return JsonResponse({"created": bool(accepted), "accepted": accepted, "dropped": len(distinct) - accepted})
 
 
 @login_required
@@ -147,30 +290,26 @@ def log_error_api(request):
 def system_logs_api(request):
     if not _can_manage_logs(request):
         return JsonResponse({"error": "Acesso negado."}, status=403)
-    logs = SystemLog.objects.order_by("-created_at")
-    data = [
-        {
-            "id": log.id,
-            "level": log.level,
-            "level_label": log.get_level_display(),
-            "source": log.source,
-            "source_label": log.get_source_display(),
-            "message": log.message,
-            "details": log.details,
-            "created_at": log.created_at.isoformat(),
-            "is_resolved": log.is_resolved,
-        }
-        for log in logs
-    ]
-    return JsonResponse(data, safe=False)
+    try:
+        limit = min(max(int(request.GET.get("limit", PAGE_SIZE)), 1), LOG_API_MAX_LIMIT)
+    except ValueError:
+        limit = PAGE_SIZE
+    page = keyset_paginate(
+        _filtered_logs(request.GET), LOG_ORDERING, cursor=request.GET.get("cursor"), page_size=limit
+    )
+    return JsonResponse(
+        {"results": [_serialize_log(log) for log in page.items], "next_cursor": page.next_cursor}
+    )
 
 
 @login_required
-@require_http_methods(["PATCH", "DELETE"])
+@require_http_methods(["GET", "PATCH", "DELETE"])
 def system_log_detail_api(request, log_id):
     if not _can_manage_logs(request):
         return JsonResponse({"error": "Acesso negado."}, status=403)
     log = get_object_or_404(SystemLog, pk=log_id)
+    if request.method == "GET":
+        return JsonResponse(_serialize_log(log, details=True))
     if request.method == "DELETE":
         log.delete()
         return JsonResponse({"deleted": True})
@@ -189,7 +328,7 @@ def system_log_detail_api(request, log_id):
 def system_logs_pending_count_api(request):
     if not _can_manage_logs(request):
         return JsonResponse({"pending": 0})
-    count = SystemLog.objects.filter(is_resolved=False).count()
+    count = SystemLog.objects.filter(_resolved_filter(False)).count()
     return JsonResponse({"pending": count})
 
 
@@ -198,10 +337,10 @@ def system_logs_pending_count_api(request):
 def system_log_resolve(request, log_id):
     if not _can_manage_logs(request):
         return JsonResponse({"error": "Acesso negado."}, status=403)
-    log = get_object_or_404(SystemLog, pk=log_id)
+    log = get_object_or_404(SystemLog.objects.only(*LOG_LIST_FIELDS), pk=log_id)
     log.is_resolved = True
     log.save(update_fields=["is_resolved"])
-    response = render(request, "core/partials/_system_logs_table.html", _system_logs_context())
+    response = render(request, "partials/_system_log_row.html", {"log": log})
     response["HX-Trigger"] = "logs:refresh"
     return response
 
@@ -211,13 +350,22 @@ def system_log_resolve(request, log_id):
 def system_log_delete(request, log_id):
     if not _can_manage_logs(request):
         return JsonResponse({"error": "Acesso negado."}, status=403)
-    log = get_object_or_404(SystemLog, pk=log_id)
+    log = get_object_or_404(SystemLog.objects.only("id"), pk=log_id)
     log.delete()
-    response = render(request, "core/partials/_system_logs_table.html", _system_logs_context())
+    response = HttpResponse("")
     response["HX-Trigger"] = "logs:refresh"
     return response
 
 
+@login_required
+@require_http_methods(["GET"])
+def system_log_details(request, log_id):
+    if not _can_manage_logs(request):
+        return HttpResponseForbidden("Acesso negado.")
+    log = get_object_or_404(SystemLog.objects.only("id", "details"), pk=log_id)
+    return render(request, "partials/_system_log_details.html", {"log": log})
+
+
 @csrf_exempt
 @require_POST
 def twilio_webhook(request):
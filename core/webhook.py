@@ -3,21 +3,31 @@ import logging
 import re
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
+from functools import partial
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.http import HttpResponse
-from django.contrib.auth.models import User
 from django.core.cache import cache
 from twilio.twiml.messaging_response import MessagingResponse
-from core.models import QuickExpense, CardStatementInitialBalance
+from core.bot_identities import resolve_bot_identity
+from core.metrics import WEBHOOK_LATENCY
+from core.models import QuickExpense, QuickExpenseMonthlyTotal, CardStatementInitialBalance, WebhookMessage
+from core.webhook_worker import WebhookWorker, get_reply_backend
+from finance.billing import month_bounds
 
 logger = logging.getLogger(__name__)
 
 
-def get_user_cache_key(phone_number):
-    """Cria uma chave de cache única para armazenar despesas do usuário"""
-    return f"quick_expenses_{phone_number}"
+BOT_STATE_TIMEOUT = 3600  # 1 hora
+
+
+def get_bot_state_key(phone_number):
+    """Chave do estado da conversa (saldo inicial pendente e despesa que aguarda)."""
+    return f"bot_state:{phone_number}"
 
 
 def get_current_month_year():
@@ -34,56 +44,49 @@ def get_previous_month_year():
     return (today.year, today.month - 1)
 
 
-def get_pending_expense_key(phone_number):
-    """Chave de cache para despesa pendente (aguardando saldo inicial)"""
-    return f"pending_expense_{phone_number}"
+def get_month_initial_balance(user_id, year, month):
+    """Saldo inicial do mês/usuário, ou None se ainda não foi informado"""
+    return CardStatementInitialBalance.objects.filter(
+        user_id=user_id, year=year, month=month
+    ).values_list("saldo_inicial", flat=True).first()
 
 
-def get_awaiting_balance_key(phone_number):
-    """Chave de cache para sinalizar que estamos aguardando saldo inicial"""
-    return f"awaiting_initial_balance_{phone_number}"
+def format_month_total(user_id, year, month, saldo_inicial):
+    """Linha com o total da fatura, lido do total mensal materializado (sem somar os lançamentos)."""
+    total = saldo_inicial + QuickExpenseMonthlyTotal.monthly_total(user_id, year, month)
+    return f"💰 Total da fatura: R$ {total:.2f}"
 
 
-def has_month_initial_balance(user, year, month):
-    """Verifica se existe saldo inicial para o mês/usuário"""
-    return CardStatementInitialBalance.objects.filter(
-        user_id=user.id, year=year, month=month
-    ).exists()
+def get_bot_state(phone_number):
+    """Estado da conversa num único registro: {"awaiting_balance": bool, "pending": {...}}."""
+    return cache.get(get_bot_state_key(phone_number)) or {}
 
 
-def set_pending_expense(phone_number, valor, descricao):
-    """Armazena uma despesa pendente aguardando saldo inicial"""
-    cache_key = get_pending_expense_key(phone_number)
-    cache.set(cache_key, {
-        'valor': str(valor),
-        'descricao': descricao,
-        'timestamp': datetime.now().isoformat()
-    }, timeout=3600)  # 1 hora de timeout
+def await_initial_balance(phone_number, valor, descricao):
+    """Guarda a despesa pendente e marca que estamos aguardando o saldo inicial, numa escrita só."""
+    cache.set(
+        get_bot_state_key(phone_number),
+        {
+            "awaiting_balance": True,
+            "pending": {"valor": str(valor), "descricao": descricao, "timestamp": datetime.now().isoformat()},
+        },
+        timeout=BOT_STATE_TIMEOUT,
+    )
 
 
 def get_pending_expense(phone_number):
     """Recupera a despesa pendente"""
-    return cache.get(get_pending_expense_key(phone_number))
-
-
-def clear_pending_expense(phone_number):
-    """Remove a despesa pendente"""
-    cache.delete(get_pending_expense_key(phone_number))
-
-
-def set_awaiting_initial_balance(phone_number):
-    """Marca que estamos aguardando saldo inicial"""
-    cache.set(get_awaiting_balance_key(phone_number), True, timeout=3600)
+    return get_bot_state(phone_number).get("pending")
 
 
 def is_awaiting_initial_balance(phone_number):
     """Verifica se estamos aguardando saldo inicial"""
-    return cache.get(get_awaiting_balance_key(phone_number), False)
+    return get_bot_state(phone_number).get("awaiting_balance", False)
 
 
-def clear_awaiting_balance(phone_number):
-    """Limpa a flag de aguardando saldo inicial"""
-    cache.delete(get_awaiting_balance_key(phone_number))
+def clear_bot_state(phone_number):
+    """Limpa a despesa pendente e a espera pelo saldo inicial"""
+    cache.delete(get_bot_state_key(phone_number))
 
 
 def parse_initial_balance(message):
@@ -125,99 +128,6 @@ def parse_expense_message(message):
         return None, None
 
 
-def get_cached_expenses(phone_number, month_year=None):
-    """
-    Recupera despesas em cache para um mês específico ou atual
-    """
-    if month_year is None:
-        month_year = get_current_month_year()
-    
-    cache_key = get_user_cache_key(phone_number)
-    all_expenses = cache.get(cache_key, {})
-    
-    month_key = f"{month_year[0]}-{month_year[1]:02d}"
-    return all_expenses.get(month_key, [])
-
-
-def add_cached_expense(phone_number, valor, descricao):
-    """
-    Adiciona uma despesa ao cache do mês atual
-    """
-    cache_key = get_user_cache_key(phone_number)
-    all_expenses = cache.get(cache_key, {})
-    
-    month_year = get_current_month_year()
-    month_key = f"{month_year[0]}-{month_year[1]:02d}"
-    
-    if month_key not in all_expenses:
-        all_expenses[month_key] = []
-    
-    # Adiciona a despesa com timestamp para manter ordem
-    expense_entry = {
-        'valor': str(valor),
-        'descricao': descricao,
-        'timestamp': datetime.now().isoformat()
-    }
-    all_expenses[month_key].append(expense_entry)
-    
-    # Define timeout de 30 dias para o cache
-    cache.set(cache_key, all_expenses, timeout=30*24*3600)
-
-
-def remove_last_cached_expense(phone_number):
-    """
-    Remove a última despesa adicionada ao mês atual
-    Retorna a despesa removida ou None se não houver
-    """
-    cache_key = get_user_cache_key(phone_number)
-    all_expenses = cache.get(cache_key, {})
-    
-    month_year = get_current_month_year()
-    month_key = f"{month_year[0]}-{month_year[1]:02d}"
-    
-    if month_key in all_expenses and all_expenses[month_key]:
-        removed = all_expenses[month_key].pop()
-        cache.set(cache_key, all_expenses, timeout=30*24*3600)
-        return removed
-    
-    return None
-
-
-def clear_month_cached_expenses(phone_number):
-    """
-    Limpa todas as despesas do mês atual do cache
-    """
-    cache_key = get_user_cache_key(phone_number)
-    all_expenses = cache.get(cache_key, {})
-    
-    month_year = get_current_month_year()
-    month_key = f"{month_year[0]}-{month_year[1]:02d}"
-    
-    if month_key in all_expenses:
-        all_expenses[month_key] = []
-        cache.set(cache_key, all_expenses, timeout=30*24*3600)
-
-
-def format_expense_list(expenses, month_label="Mês Atual"):
-    """
-    Formata uma lista de despesas em cache para exibição
-    """
-    if not expenses:
-        return f"Nenhum lançamento para o {month_label.lower()}."
-    
-    total = Decimal('0')
-    lines = [f"📝 Extrato {month_label}:"]
-    
-    for expense in expenses:
-        valor = Decimal(expense['valor'])
-        descricao = expense['descricao']
-        lines.append(f"- R$ {valor:.2f} - {descricao}")
-        total += valor
-    
-    lines.append(f"\nTotal: R$ {total:.2f}")
-    return "\n".join(lines)
-
-
 def handle_menu_command(phone_number):
     """Retorna o menu de opções"""
     menu_text = """Olá! Escolha uma opção:
@@ -228,7 +138,7 @@ def handle_menu_command(phone_number):
     return menu_text
 
 
-def handle_add_expense(user, phone_number, message):
+def handle_add_expense(user_id, phone_number, message):
     """Processa comando de adicionar despesa.
     
     Se for o primeiro lançamento do mês, pede o saldo inicial da fatura.
@@ -237,17 +147,16 @@ def handle_add_expense(user, phone_number, message):
     year, month = get_current_month_year()
     
     # Verifica se existe saldo inicial para este mês
-    has_balance = has_month_initial_balance(user, year, month)
+    saldo_inicial = get_month_initial_balance(user_id, year, month)
     
-    if not has_balance:
+    if saldo_inicial is None:
         # Primeiro lançamento do mês: pede saldo inicial
         valor, descricao = parse_expense_message(message)
         if valor is None or descricao is None:
             return "⚠️ Formato inválido. Use: 15.50 - Almoço"
         
         # Armazena a despesa pendente
-        set_pending_expense(phone_number, valor, descricao)
-        set_awaiting_initial_balance(phone_number)
+        await_initial_balance(phone_number, valor, descricao)
         
         return "Este é o primeiro lançamento do mês. Para começar, informe o saldo inicial da sua fatura:"
     
@@ -256,11 +165,14 @@ def handle_add_expense(user, phone_number, message):
     if valor is None or descricao is None:
         return "⚠️ Formato inválido. Use: 15.50 - Almoço"
     
-    QuickExpense.objects.create(user=user, descricao=descricao, valor=valor)
-    return f"✅ Lançamento adicionado: R$ {valor:.2f} - {descricao}"
+    QuickExpense.objects.create(user_id=user_id, descricao=descricao, valor=valor)
+    return (
+        f"✅ Lançamento adicionado: R$ {valor:.2f} - {descricao}\n"
+        f"{format_month_total(user_id, year, month, saldo_inicial)}"
+    )
 
 
-def handle_set_initial_balance(user, phone_number, message):
+def handle_set_initial_balance(user_id, phone_number, message):
     """Processa o saldo inicial informado pelo usuário.
     
     Cria o CardStatementInitialBalance e registra a despesa pendente.
@@ -279,7 +191,7 @@ def handle_set_initial_balance(user, phone_number, message):
     
     # Cria/atualiza o saldo inicial
     CardStatementInitialBalance.objects.update_or_create(
-        user_id=user.id,
+        user_id=user_id,
         year=year,
         month=month,
         defaults={'saldo_inicial': saldo_inicial}
@@ -288,16 +200,18 @@ def handle_set_initial_balance(user, phone_number, message):
     # Registra a despesa pendente
     valor = Decimal(pending['valor'])
     descricao = pending['descricao']
-    QuickExpense.objects.create(user=user, descricao=descricao, valor=valor)
+    QuickExpense.objects.create(user_id=user_id, descricao=descricao, valor=valor)
     
     # Limpa estados
-    clear_pending_expense(phone_number)
-    clear_awaiting_balance(phone_number)
+    clear_bot_state(phone_number)
     
-    return f"✅ Saldo inicial de R$ {saldo_inicial:.2f} definido. Lançamento 'R$ {valor:.2f} - {descricao}' adicionado."
+    return (
+        f"✅ Saldo inicial de R$ {saldo_inicial:.2f} definido. Lançamento 'R$ {valor:.2f} - {descricao}' adicionado.\n"
+        f"{format_month_total(user_id, year, month, saldo_inicial)}"
+    )
 
 
-def handle_view_statement(user, phone_number, statement_type):
+def handle_view_statement(user_id, phone_number, statement_type):
     """Processa comando de consultar extrato.
 
     Busca o saldo inicial e as despesas do mês, exibindo o total da fatura.
@@ -311,8 +225,6 @@ def handle_view_statement(user, phone_number, statement_type):
     else:
         return None
 
-    user_id = getattr(user, 'id', settings.FINANCE_BOT_USER_ID)
-
     # Busca saldo inicial
     saldo_obj = CardStatementInitialBalance.objects.filter(
         user_id=user_id, year=year, month=month
@@ -320,7 +232,10 @@ def handle_view_statement(user, phone_number, statement_type):
     saldo_inicial = saldo_obj.saldo_inicial if saldo_obj else None
 
     # Busca despesas do mês
-    qs = QuickExpense.objects.filter(user_id=user_id, data__year=year, data__month=month).order_by('data', 'id')
+    month_start, next_month = month_bounds(year, month)
+    qs = QuickExpense.objects.filter(
+        user_id=user_id, data__gte=month_start, data__lt=next_month
+    ).order_by('data', 'id')
 
     # Converte queryset para lista
     expenses = []
@@ -359,10 +274,13 @@ def handle_view_statement(user, phone_number, statement_type):
     return "\n".join(lines)
 
 
-def handle_delete_last(user, phone_number):
+def handle_delete_last(user_id, phone_number):
     """Processa comando de excluir último lançamento (persistido no DB)"""
     year, month = get_current_month_year()
-    qs = QuickExpense.objects.filter(user_id=user.id, data__year=year, data__month=month).order_by('-data', '-id')
+    month_start, next_month = month_bounds(year, month)
+    qs = QuickExpense.objects.filter(
+        user_id=user_id, data__gte=month_start, data__lt=next_month
+    ).order_by('-data', '-id')
 
     last = qs.first()
     if not last:
@@ -374,58 +292,132 @@ def handle_delete_last(user, phone_number):
     return f"🗑️ Último lançamento ('R$ {valor:.2f} - {descricao}') foi removido."
 
 
-def handle_clear_month(user, phone_number):
+def handle_clear_month(user_id, phone_number):
     """Processa comando de limpar mês (apaga lançamentos no DB)"""
     year, month = get_current_month_year()
-    qs = QuickExpense.objects.filter(user_id=user.id, data__year=year, data__month=month)
-    deleted_count, _ = qs.delete()
+    month_start, next_month = month_bounds(year, month)
+    qs = QuickExpense.objects.filter(user_id=user_id, data__gte=month_start, data__lt=next_month)
+    with transaction.atomic():
+        QuickExpenseMonthlyTotal.remove_expenses(qs)
+        deleted_count, _ = qs.delete()
     return "✔️ Todos os lançamentos do mês atual foram zerados." if deleted_count else "Nenhum lançamento para zerar."
 
 
+def handle_incoming_message(user_id, phone_number, incoming_msg):
+    """Executa o comando da mensagem e devolve o texto da resposta (ou None)."""
+    incoming_lower = incoming_msg.lower()
+
+    # Verifica se estamos aguardando um saldo inicial
+    if is_awaiting_initial_balance(phone_number):
+        return handle_set_initial_balance(user_id, phone_number, incoming_msg)
+    if incoming_lower == "menu":
+        return handle_menu_command(phone_number)
+    if incoming_lower in ["extrato atual", "extrato anterior"]:
+        return handle_view_statement(user_id, phone_number, incoming_msg)
+    if incoming_lower == "excluir":
+        return handle_delete_last(user_id, phone_number)
+    if incoming_lower == "zerar":
+        return handle_clear_month(user_id, phone_number)
+    # Tenta processar como um lançamento de despesa
+    return handle_add_expense(user_id, phone_number, incoming_msg)
+
+
+def _claim_webhook_message(message_id):
+    """
+    Marca a mensagem como em processamento se ela ainda estiver pendente e for a
+    mais antiga em aberto do número; a mensagem seguinte fica para quem processar esta.
+    """
+    open_statuses = [WebhookMessage.STATUS_PENDING, WebhookMessage.STATUS_PROCESSING]
+    older_open = WebhookMessage.objects.filter(
+        sender=OuterRef("sender"), status__in=open_statuses, id__lt=OuterRef("id")
+    )
+    return (
+        WebhookMessage.objects.filter(pk=message_id, status=WebhookMessage.STATUS_PENDING)
+        .exclude(Exists(older_open))
+        .update(
+            status=WebhookMessage.STATUS_PROCESSING,
+            attempts=F("attempts") + 1,
+            claimed_at=timezone.now(),
+        )
+    )
+
+
+def _process_claimed_message(message):
+    user_id, _household_id = resolve_bot_identity(message.sender)
+    if user_id is None:
+        WebhookMessage.objects.filter(pk=message.id).update(status=WebhookMessage.STATUS_FAILED)
+        return
+    try:
+        with transaction.atomic():
+            message.reply = handle_incoming_message(user_id, message.sender, message.body) or ""
+            message.status = WebhookMessage.STATUS_DONE
+            message.processed_at = timezone.now()
+            message.save(update_fields=["reply", "status", "processed_at"])
+    except Exception:
+        logger.exception("Falha ao processar a mensagem %s do webhook.", message.message_sid)
+        WebhookMessage.objects.filter(pk=message.id).update(status=WebhookMessage.STATUS_FAILED)
+        return
+    if message.reply:
+        try:
+            get_reply_backend().send(message.sender, message.reply)
+        except Exception:
+            logger.exception("Falha ao enviar a resposta da mensagem %s.", message.message_sid)
+
+
+def process_webhook_message(message_id):
+    """
+    Processa uma mensagem gravada pelo webhook e envia a resposta pela API do Twilio.
+    Só quem muda o status de pendente para processando executa a mensagem; os
+    lançamentos e o status final são gravados na mesma transação. As mensagens do
+    mesmo número seguem em ordem: quem termina uma já processa a próxima pendente.
+    """
+    while message_id is not None:
+        if not _claim_webhook_message(message_id):
+            return
+        message = WebhookMessage.objects.get(pk=message_id)
+        _process_claimed_message(message)
+        message_id = (
+            WebhookMessage.objects.filter(sender=message.sender, status=WebhookMessage.STATUS_PENDING)
+            .order_by("id")
+            .values_list("id", flat=True)
+            .first()
+        )
+
+
+webhook_worker = WebhookWorker(process_webhook_message)
+
+
+def _ack_and_defer(message_sid, phone_number, incoming_msg):
+    message, created = WebhookMessage.objects.get_or_create(
+        message_sid=message_sid, defaults={"sender": phone_number, "body": incoming_msg}
+    )
+    if created:
+        transaction.on_commit(partial(webhook_worker.submit, message.id))
+    # Reentregas do mesmo MessageSid caem aqui sem reprocessar nada.
+    return HttpResponse(str(MessagingResponse()), content_type="application/xml")
+
+
 @csrf_exempt
 @require_POST
+@WEBHOOK_LATENCY.time()
 def twilio_webhook(request):
     incoming_msg = request.POST.get("Body", "").strip()
     sender = request.POST.get("From", "")  # Ex: 'whatsapp:+5511999998888'
     phone_number = sender.replace("whatsapp:", "")
+    message_sid = request.POST.get("MessageSid", "")
 
-    # 1. Verifica se o número do remetente está na lista de autorizados
-    if phone_number not in settings.TWILIO_ALLOWED_NUMBERS:
+    # 1. Identifica o usuário do número (BotIdentity ou a lista TWILIO_ALLOWED_NUMBERS)
+    user_id, _household_id = resolve_bot_identity(phone_number)
+    if user_id is None:
         logger.warning(f"Webhook recebido de número não autorizado: {phone_number}")
         return HttpResponse(status=200)
 
-    # 2. Busca o usuário padrão definido nas configurações
-    try:
-        primary_user = User.objects.get(pk=settings.FINANCE_BOT_USER_ID)
-    except User.DoesNotExist:
-        logger.error(f"Usuário principal do bot (ID: {settings.FINANCE_BOT_USER_ID}) não foi encontrado no banco de dados.")
-        return HttpResponse(status=500)
+    # 2. Modo assíncrono: grava a mensagem, responde na hora e processa em segundo plano
+    if getattr(settings, "TWILIO_WEBHOOK_ASYNC", False) and message_sid:
+        return _ack_and_defer(message_sid, phone_number, incoming_msg)
 
     resp = MessagingResponse()
-    reply = None
-
-    # 3. Processamento dos comandos
-    incoming_lower = incoming_msg.lower()
-
-    # Verifica se estamos aguardando um saldo inicial
-    if is_awaiting_initial_balance(phone_number):
-        reply = handle_set_initial_balance(primary_user, phone_number, incoming_msg)
-    elif incoming_lower == "menu":
-        reply = handle_menu_command(phone_number)
-
-    elif incoming_lower in ["extrato atual", "extrato anterior"]:
-        reply = handle_view_statement(primary_user, phone_number, incoming_msg)
-
-    elif incoming_lower == "excluir":
-        reply = handle_delete_last(primary_user, phone_number)
-
-    elif incoming_lower == "zerar":
-        reply = handle_clear_month(primary_user, phone_number)
-
-    else:
-        # Tenta processar como um lançamento de despesa
-        reply = handle_add_expense(primary_user, phone_number, incoming_msg)
-
+    reply = handle_incoming_message(user_id, phone_number, incoming_msg)
     if reply:
         resp.message(reply)
 
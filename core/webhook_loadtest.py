@@ -0,0 +1,158 @@
+"""
+Teste de carga do webhook do Twilio.
+
+Simula vários números de WhatsApp conversando ao mesmo tempo com o bot: cada
+número segue um roteiro (menu, despesa, saldo inicial, extrato, excluir) em
+ordem, e os números rodam em paralelo com asyncio. As requisições imitam as do
+Twilio (POST de formulário com From, Body e MessageSid); o TwiML da resposta é
+lido localmente, sem a biblioteca do Twilio, e as queries de cada requisição vêm
+do Server-Timing do PerformanceMiddleware.
+"""
+import asyncio
+import re
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+
+import httpx
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.urls import reverse
+
+from .bot_identities import invalidate_bot_identities
+from .models import BotIdentity, Household, HouseholdMembership
+from .perf import percentile
+
+# O Twilio desiste da requisição depois de 15 s e reenvia a mensagem.
+TWILIO_TIMEOUT = 15.0
+PHONE_PREFIX = "+5500000"
+LOADTEST_HOUSEHOLD_SLUG = "teste-de-carga"
+
+# (comando, mensagem). O primeiro lançamento do mês pede o saldo inicial.
+FIRST_ROUND = (
+    ("menu", "menu"),
+    ("despesa", "12,50 - Almoço"),
+    ("saldo", "1000"),
+    ("despesa", "8 - Café"),
+    ("extrato", "extrato atual"),
+    ("excluir", "excluir"),
+)
+NEXT_ROUNDS = tuple(step for step in FIRST_ROUND if step[0] != "saldo")
+
+_QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+@dataclass
+class Sample:
+    command: str
+    latency_ms: float
+    status: int = 0
+    queries: int | None = None
+    replied: bool = False
+    error: str = ""
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.error) or not 200 <= self.status < 300
+
+
+def loadtest_phone_numbers(count):
+    return [f"{PHONE_PREFIX}{index:06d}" for index in range(1, count + 1)]
+
+
+def seed_loadtest_senders(count):
+    """Cria (ou reaproveita) um usuário e um BotIdentity por número simulado."""
+    User = get_user_model()
+    phones = loadtest_phone_numbers(count)
+    with transaction.atomic():
+        household, _ = Household.objects.get_or_create(
+            slug=LOADTEST_HOUSEHOLD_SLUG, defaults={"name": "Teste de carga"}
+        )
+        for index, phone in enumerate(phones, start=1):
+            user, _ = User.objects.get_or_create(username=f"loadtest-{index:06d}")
+            HouseholdMembership.objects.get_or_create(user=user, household=household, defaults={"is_primary": True})
+            BotIdentity.objects.update_or_create(
+                phone_number=phone, defaults={"user": user, "household": household, "is_active": True}
+            )
+    invalidate_bot_identities(*phones)
+    return phones
+
+
+def parse_server_queries(header):
+    match = _QUERIES_RE.search(header or "")
+    return int(match.group(1)) if match else None
+
+
+def _has_message(body):
+    # Substituto local do MessagingResponse: basta saber se o TwiML tem <Message>.
+    try:
+        return ET.fromstring(body).find("Message") is not None
+    except ET.ParseError:
+        return False
+
+
+async def _send(client, url, semaphore, phone, command, body, sid):
+    data = {"From": f"whatsapp:{phone}", "Body": body, "MessageSid": sid}
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, data=data)
+        except httpx.HTTPError as exc:
+            return Sample(command, (time.perf_counter() - start) * 1000, error=type(exc).__name__)
+    return Sample(
+        command,
+        (time.perf_counter() - start) * 1000,
+        status=response.status_code,
+        queries=parse_server_queries(response.headers.get("Server-Timing")),
+        replied=_has_message(response.text) if response.content else False,
+    )
+
+
+async def _converse(client, url, semaphore, phone, rounds, samples):
+    for round_number in range(rounds):
+        script = FIRST_ROUND if round_number == 0 else NEXT_ROUNDS
+        for step, (command, body) in enumerate(script):
+            sid = f"SMLOAD{phone.lstrip('+')}{round_number:03d}{step:02d}"
+            samples.append(await _send(client, url, semaphore, phone, command, body, sid))
+
+
+async def _run(url, phones, rounds, concurrency, timeout):
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency or len(phones))
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        await asyncio.gather(*(_converse(client, url, semaphore, phone, rounds, samples) for phone in phones))
+    return samples
+
+
+def run_load_test(base_url, phones, rounds=1, concurrency=None, timeout=TWILIO_TIMEOUT):
+    """
+    Cada número segue o roteiro `rounds` vezes; os números rodam em paralelo, com no
+    máximo `concurrency` requisições em andamento. Respostas que passam de `timeout`
+    contam como erro, como as que o Twilio reenviaria.
+    """
+    url = base_url.rstrip("/") + reverse("twilio_webhook")
+    return asyncio.run(_run(url, phones, rounds, concurrency, timeout))
+
+
+def summarize(samples):
+    """Latência (p50/p95/p99/máx), taxa de erro e queries por comando."""
+    by_command = {}
+    for sample in samples:
+        by_command.setdefault(sample.command, []).append(sample)
+    summary = {}
+    for command, items in by_command.items():
+        latencies = [item.latency_ms for item in items]
+        queries = [item.queries for item in items if item.queries is not None]
+        errors = sum(1 for item in items if item.failed)
+        summary[command] = {
+            "count": len(items),
+            "errors": errors,
+            "error_rate": errors / len(items),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies),
+            "queries_avg": sum(queries) / len(queries) if queries else None,
+            "queries_max": max(queries) if queries else None,
+        }
+    return summary
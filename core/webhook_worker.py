@@ -0,0 +1,75 @@
+"""
+Processamento em segundo plano das mensagens do webhook do Twilio.
+
+O webhook só grava a mensagem e responde um TwiML vazio; um pool de threads do
+próprio processo executa os comandos e envia a resposta pela API REST do Twilio.
+O backend de envio é configurável (TWILIO_REPLY_BACKEND), como os backends de e-mail
+do Django, para que os testes usem um substituto local.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLY_BACKEND = "core.webhook_worker.TwilioReplyBackend"
+WORKER_THREADS = 2
+
+
+class TwilioReplyBackend:
+    def __init__(self):
+        from twilio.rest import Client
+
+        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+    def send(self, phone_number, body):
+        self.client.messages.create(
+            from_=f"whatsapp:{settings.TWILIO_WHATSAPP_FROM}",
+            to=f"whatsapp:{phone_number}",
+            body=body,
+        )
+
+
+# Respostas enviadas pelo LocMemReplyBackend, como o mail.outbox do Django.
+outbox = []
+
+
+class LocMemReplyBackend:
+    def send(self, phone_number, body):
+        outbox.append((phone_number, body))
+
+
+def get_reply_backend():
+    return import_string(getattr(settings, "TWILIO_REPLY_BACKEND", DEFAULT_REPLY_BACKEND))()
+
+
+class WebhookWorker:
+    """Executa `handler(message_id)` num pool de threads; sem threads, executa na hora."""
+
+    def __init__(self, handler, max_workers=WORKER_THREADS):
+        self.handler = handler
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, message_id):
+        if not getattr(settings, "TWILIO_WEBHOOK_THREADED", True):
+            self.handler(message_id)
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="webhook-worker")
+        self._executor.submit(self._run, message_id)
+
+    def _run(self, message_id):
+        try:
+            self.handler(message_id)
+        except Exception:
+            logger.exception("Falha ao processar a mensagem %s do webhook.", message_id)
+        finally:
+            # A thread tem conexões próprias; não deixa nenhuma aberta entre as mensagens.
+            connections.close_all()
@@ -4,6 +4,7 @@ from .models import (
     Account,
     Card,
     CardPurchaseGroup,
+    CardStatement,
     Category,
     ImportBatch,
     ImportItem,
@@ -95,6 +96,13 @@ class InstallmentAdmin(admin.ModelAdmin):
     household.short_description = "Household"
 
 
+@admin.register(CardStatement)
+class CardStatementAdmin(admin.ModelAdmin):
+    list_display = ("card", "year", "month", "closing_date", "due_date", "total", "item_count", "household")
+    list_filter = ("household", "card", "year")
+    list_select_related = ("card", "household")
+
+
 @admin.register(RecurringRule)
 class RecurringRuleAdmin(admin.ModelAdmin):
     list_display = ("description", "amount", "due_day", "active", "household")
@@ -8,6 +8,13 @@ def last_day_of_month(year: int, month: int) -> int:
     return monthrange(year, month)[1]
 
 
+def month_bounds(year: int, month: int) -> tuple[date, date]:
+    """Intervalo semiaberto [primeiro dia do mês, primeiro dia do mês seguinte)."""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
 def normalize_day(year: int, month: int, day: int) -> date:
     safe_day = min(day, last_day_of_month(year, month))
     return date(year, month, safe_day)
@@ -265,23 +265,41 @@ class ImportItemForm(forms.ModelForm):
             ),
         }
 
-    def __init__(self, *args, household=None, **kwargs):
+    def __init__(self, *args, household=None, categories=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.fields["purchase_date"].input_formats = ["%Y-%m-%d"]
 
         if household is not None:
-            categories = Category.objects.filter(
+            field = self.fields["category"]
+            field.queryset = Category.objects.filter(
                 household=household,
                 is_active=True,
             )
-            self.fields["category"].queryset = categories
+            if categories is None:
+                categories = list(field.queryset)
+            # Opções montadas a partir da lista já carregada: o formset inteiro faz uma query só.
+            field.choices = [("", field.empty_label)] + [
+                (category.pk, field.label_from_instance(category)) for category in categories
+            ]
             if not self.instance.category_id:
-                default_category = categories.filter(
-                    name__iexact="Despesas pessoais"
-                ).first()
+                default_category = next(
+                    (category for category in categories if category.name.lower() == "despesas pessoais"),
+                    None,
+                )
                 if default_category:
-                    self.fields["category"].initial = default_category.id
+                    field.initial = default_category.id
+
+
+class BaseImportReviewFormSet(forms.BaseModelFormSet):
+    def __init__(self, *args, form_kwargs=None, **kwargs):
+        form_kwargs = dict(form_kwargs or {})
+        household = form_kwargs.get("household")
+        if household is not None and "categories" not in form_kwargs:
+            form_kwargs["categories"] = list(
+                Category.objects.filter(household=household, is_active=True)
+            )
+        super().__init__(*args, form_kwargs=form_kwargs, **kwargs)
 
 
 class InvestmentAccountForm(HouseholdScopedForm):
@@ -308,7 +326,7 @@ class InvestmentSnapshotForm(HouseholdScopedForm):
 
     def __init__(self, *args, household=None, **kwargs):
         super().__init__(*args, household=household, **kwargs)
-        if household is not None:
+        if household is not None and "account" in self.fields:
             self.fields["account"].queryset = InvestmentAccount.objects.filter(
                 household=household, active=True
             )
@@ -326,9 +344,17 @@ class InvestmentSnapshotForm(HouseholdScopedForm):
         return balance
 
 
+class InvestmentSnapshotGridCellForm(InvestmentSnapshotForm):
+    """Célula da grade de snapshots: mesmas regras, com a conta resolvida pela view."""
+
+    class Meta(InvestmentSnapshotForm.Meta):
+        fields = ["year", "month", "balance"]
+
+
 ImportReviewFormSet = modelformset_factory(
     ImportItem,
     form=ImportItemForm,
+    formset=BaseImportReviewFormSet,
     extra=0,
     can_delete=False,
 )
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+from finance.billing import get_due_date, get_statement_window
+
+
+def backfill_card_statements(apps, schema_editor):
+    """
+    Attributes legacy installments (without statement month) to the month of
+    their due date and materializes one CardStatement per card/month.
+    """
+    Installment = apps.get_model("finance", "Installment")
+    CardStatement = apps.get_model("finance", "CardStatement")
+    Card = apps.get_model("finance", "Card")
+    db_alias = schema_editor.connection.alias
+
+    legacy = Installment.objects.using(db_alias).filter(statement_year__isnull=True)
+    for installment in legacy.iterator():
+        installment.statement_year = installment.due_date.year
+        installment.statement_month = installment.due_date.month
+        installment.save(update_fields=["statement_year", "statement_month"])
+
+    cards = {card.id: card for card in Card.objects.using(db_alias).all()}
+    rows = (
+        Installment.objects.using(db_alias)
+        .values("group__card_id", "statement_year", "statement_month")
+        .annotate(total=Sum("amount"), item_count=Count("id"))
+    )
+    statements = []
+    for row in rows:
+        card = cards[row["group__card_id"]]
+        year, month = row["statement_year"], row["statement_month"]
+        closing_date, _, _ = get_statement_window(year, month, card.closing_day)
+        statements.append(
+            CardStatement(
+                household_id=card.household_id,
+                card_id=card.id,
+                year=year,
+                month=month,
+                closing_date=closing_date,
+                due_date=get_due_date(year, month, card.due_day),
+                total=row["total"],
+                item_count=row["item_count"],
+            )
+        )
+    CardStatement.objects.using(db_alias).bulk_create(statements)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_cardstatementinitialbalance'),
+        ('finance', '0007_backfill_installment_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardStatement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('month', models.PositiveIntegerField()),
+                ('closing_date', models.DateField()),
+                ('due_date', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statements', to='finance.card')),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_statements', to='core.household')),
+            ],
+            options={
+                'ordering': ['-year', '-month'],
+                'indexes': [models.Index(fields=['household', 'closing_date'], name='statement_household_close_idx')],
+                'constraints': [models.UniqueConstraint(fields=('card', 'year', 'month'), name='unique_card_statement_month')],
+            },
+        ),
+        migrations.RunPython(backfill_card_statements, migrations.RunPython.noop),
+    ]
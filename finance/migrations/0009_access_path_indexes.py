@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_access_path_indexes'),
+        ('finance', '0008_cardstatement'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='installment',
+            index=models.Index(fields=['household', 'due_date'], name='installment_household_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='installment',
+            index=models.Index(fields=['group', 'statement_year', 'statement_month'], name='installment_group_stmt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringinstance',
+            index=models.Index(fields=['household', 'year', 'month'], name='recurring_household_ym_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:56
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_received_date(apps, schema_editor):
+    Receivable = apps.get_model("finance", "Receivable")
+    db_alias = schema_editor.connection.alias
+    received = Receivable.objects.using(db_alias).filter(received_at__isnull=False)
+    for receivable in received.iterator():
+        receivable.received_date = timezone.localdate(receivable.received_at)
+        receivable.save(update_fields=["received_date"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_access_path_indexes'),
+        ('finance', '0009_access_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receivable',
+            name='received_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='receivable',
+            index=models.Index(fields=['household', 'received_date'], name='recv_household_received_idx'),
+        ),
+        migrations.RunPython(backfill_received_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_access_path_indexes'),
+        ('finance', '0010_receivable_received_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cardpurchasegroup',
+            index=models.Index(fields=['household', 'first_due_date'], name='purchase_household_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringrule',
+            index=models.Index(fields=['household', 'description'], name='rrule_household_desc_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_account_balances(apps, schema_editor):
+    LedgerEntry = apps.get_model("finance", "LedgerEntry")
+    AccountBalance = apps.get_model("finance", "AccountBalance")
+    db_alias = schema_editor.connection.alias
+    entries = (
+        LedgerEntry.objects.using(db_alias)
+        .exclude(account=None)
+        .order_by("account_id", "date")
+        .values_list("household_id", "account_id", "date", "kind", "amount")
+    )
+    closing = {}
+    running, current = 0, None
+    for household_id, account_id, day, kind, amount in entries.iterator():
+        if account_id != current:
+            running, current = 0, account_id
+        running += -amount if kind == "EXPENSE" else amount
+        closing[(account_id, day)] = (household_id, running)
+    AccountBalance.objects.using(db_alias).bulk_create(
+        [
+            AccountBalance(household_id=household_id, account_id=account_id, date=day, balance=balance)
+            for (account_id, day), (household_id, balance) in closing.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_access_path_indexes'),
+        ('finance', '0011_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='finance.account')),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_balances', to='core.household')),
+            ],
+            options={
+                'ordering': ['account', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('account', 'date'), name='unique_account_balance_day')],
+            },
+        ),
+        migrations.RunPython(backfill_account_balances, migrations.RunPython.noop),
+    ]
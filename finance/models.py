@@ -1,6 +1,10 @@
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
 
 from core.models import Household
 
@@ -107,6 +111,98 @@ class LedgerEntry(models.Model):
     def __str__(self):
         return f"{self.date} - {self.description}"
 
+    def _balance_change(self):
+        return _balance_change(self.account_id, self.date, self.kind, self.amount)
+
+    def save(self, *args, **kwargs):
+        before = None
+        if not self._state.adding:
+            row = (
+                LedgerEntry.objects.filter(pk=self.pk)
+                .values_list("account_id", "date", "kind", "amount")
+                .first()
+            )
+            before = _balance_change(*row) if row else None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            AccountBalance.apply_change(self.household_id, before, self._balance_change())
+
+    def delete(self, *args, **kwargs):
+        before = self._balance_change()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            AccountBalance.apply_change(self.household_id, before, None)
+        return result
+
+
+def _balance_change(account_id, day, kind, amount):
+    """(conta, dia, valor com sinal) de um lançamento; None se não tiver conta."""
+    if not account_id:
+        return None
+    day = LedgerEntry._meta.get_field("date").to_python(day)
+    amount = Decimal(str(amount))
+    return account_id, day, -amount if kind == LedgerEntry.Kind.EXPENSE else amount
+
+
+class AccountBalance(models.Model):
+    """Saldo de fechamento diário por conta, só nos dias com lançamento."""
+
+    household = models.ForeignKey(Household, on_delete=models.CASCADE, related_name="account_balances")
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="balances")
+    date = models.DateField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["account", "date"]
+        constraints = [
+            models.UniqueConstraint(fields=["account", "date"], name="unique_account_balance_day")
+        ]
+
+    def __str__(self):
+        return f"{self.account} {self.date}: {self.balance}"
+
+    @classmethod
+    def apply_delta(cls, household_id, account_id, day, delta):
+        """Soma `delta` ao fechamento de `day` e de todos os dias seguintes, num único UPDATE."""
+        if not delta:
+            return
+        opening = (
+            cls.objects.filter(account_id=account_id, date__lt=day)
+            .order_by("-date")
+            .values_list("balance", flat=True)
+            .first()
+        )
+        cls.objects.bulk_create(
+            [cls(household_id=household_id, account_id=account_id, date=day, balance=opening or 0)],
+            ignore_conflicts=True,
+        )
+        cls.objects.filter(account_id=account_id, date__gte=day).update(balance=F("balance") + delta)
+
+    @classmethod
+    def apply_change(cls, household_id, before, after):
+        if before == after:
+            return
+        if before and after and before[:2] == after[:2]:
+            cls.apply_delta(household_id, *before[:2], after[2] - before[2])
+            return
+        if before:
+            cls.apply_delta(household_id, *before[:2], -before[2])
+        if after:
+            cls.apply_delta(household_id, *after[:2], after[2])
+
+    @classmethod
+    def remove_entries(cls, entries):
+        """Desconta lançamentos que serão apagados em massa (queryset.delete() não chama delete())."""
+        rows = (
+            entries.exclude(account=None)
+            .order_by()
+            .values("household_id", "account_id", "date", "kind")
+            .annotate(total=Sum("amount"))
+        )
+        for row in rows:
+            _, day, signed = _balance_change(row["account_id"], row["date"], row["kind"], row["total"])
+            cls.apply_delta(row["household_id"], row["account_id"], day, -signed)
+
 
 class Receivable(models.Model):
     class Status(models.TextChoices):
@@ -120,6 +216,8 @@ class Receivable(models.Model):
     description = models.CharField(max_length=255)
     status = models.CharField(max_length=12, choices=Status.choices, default=Status.EXPECTED)
     received_at = models.DateTimeField(null=True, blank=True)
+    # Local date of `received_at`, kept in sync on save so date filters can use an index.
+    received_date = models.DateField(null=True, blank=True, editable=False)
     category = models.ForeignKey(
         Category,
         on_delete=models.SET_NULL,
@@ -156,11 +254,19 @@ class Receivable(models.Model):
             models.Index(fields=["household", "expected_date"], name="recv_household_date_idx"),
             models.Index(fields=["household", "status"], name="recv_household_status_idx"),
             models.Index(fields=["household", "category"], name="recv_household_category_idx"),
+            models.Index(fields=["household", "received_date"], name="recv_household_received_idx"),
         ]
 
     def __str__(self):
         return f"{self.description} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        self.received_date = timezone.localdate(self.received_at) if self.received_at else None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "received_at" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "received_date"}
+        super().save(*args, **kwargs)
+
 
 class Card(models.Model):
     household = models.ForeignKey(Household, on_delete=models.CASCADE, related_name="cards")
@@ -221,6 +327,9 @@ class CardPurchaseGroup(models.Model):
 
     class Meta:
         ordering = ["-first_due_date", "-id"]
+        indexes = [
+            models.Index(fields=["household", "first_due_date"], name="purchase_household_due_idx"),
+        ]
 
     def __str__(self):
         return self.description
@@ -248,11 +357,41 @@ class Installment(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["group", "number"], name="unique_installment_group_number")
         ]
+        indexes = [
+            models.Index(fields=["household", "due_date"], name="installment_household_due_idx"),
+            models.Index(
+                fields=["group", "statement_year", "statement_month"], name="installment_group_stmt_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.group} {self.number}/{self.group.installments_count}"
 
 
+class CardStatement(models.Model):
+    household = models.ForeignKey(Household, on_delete=models.CASCADE, related_name="card_statements")
+    card = models.ForeignKey(Card, on_delete=models.CASCADE, related_name="statements")
+    year = models.PositiveIntegerField()
+    month = models.PositiveIntegerField()
+    closing_date = models.DateField()
+    due_date = models.DateField()
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-year", "-month"]
+        constraints = [
+            models.UniqueConstraint(fields=["card", "year", "month"], name="unique_card_statement_month")
+        ]
+        indexes = [
+            models.Index(fields=["household", "closing_date"], name="statement_household_close_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.card} {self.month}/{self.year}"
+
+
 class RecurringRule(models.Model):
     household = models.ForeignKey(Household, on_delete=models.CASCADE, related_name="recurring_rules")
     description = models.CharField(max_length=255)
@@ -287,6 +426,9 @@ class RecurringRule(models.Model):
 
     class Meta:
         ordering = ["description"]
+        indexes = [
+            models.Index(fields=["household", "description"], name="rrule_household_desc_idx"),
+        ]
 
     def __str__(self):
         return self.description
@@ -315,6 +457,9 @@ class RecurringInstance(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["rule", "year", "month"], name="unique_recurring_rule_month")
         ]
+        indexes = [
+            models.Index(fields=["household", "year", "month"], name="recurring_household_ym_idx"),
+        ]
 
     def __str__(self):
         return f"{self.rule} {self.month}/{self.year}"
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+@dataclass(frozen=True)
+class KeysetPage:
+    items: list
+    next_cursor: str | None
+
+
+def _split_ordering(ordering):
+    fields = [name.lstrip("-") for name in ordering]
+    descending = {name.startswith("-") for name in ordering}
+    if len(descending) != 1:
+        raise ValueError("Keyset ordering must use a single direction for every field.")
+    return fields, descending.pop()
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([value.isoformat() if hasattr(value, "isoformat") else str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(model, fields, cursor):
+    """Decodifica o cursor; retorna None se estiver malformado (volta para a primeira página)."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        if len(raw) != len(fields):
+            return None
+        return [model._meta.get_field(name).to_python(value) for name, value in zip(fields, raw)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _after(fields, values, descending):
+    lookup = "lt" if descending else "gt"
+    predicate = Q()
+    for idx, name in enumerate(fields):
+        equal = {fields[pos]: values[pos] for pos in range(idx)}
+        predicate |= Q(**equal, **{f"{name}__{lookup}": values[idx]})
+    return predicate
+
+
+def keyset_paginate(queryset, ordering, cursor=None, page_size=PAGE_SIZE) -> KeysetPage:
+    """
+    Pagina por chave (keyset) em vez de OFFSET: cada página continua a partir dos
+    valores da última linha da anterior, então o custo não cresce com o histórico.
+    A última coluna de `ordering` deve ser única (ex.: "-id").
+    """
+    fields, descending = _split_ordering(ordering)
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(queryset.model, fields, cursor)
+        if values is not None:
+            queryset = queryset.filter(_after(fields, values, descending))
+    items = list(queryset[: page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, name) for name in fields])
+    return KeysetPage(items=items, next_cursor=next_cursor)
@@ -5,12 +5,18 @@ from dataclasses import dataclass
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
 
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Window
 from django.utils import timezone
 
-from .billing import get_statement_window
+from core.metrics import RECURRING_GENERATED
+
+from .billing import get_due_date, get_statement_window
 from .models import (
+    AccountBalance,
+    Card,
     CardPurchaseGroup,
+    CardStatement,
     ImportBatch,
     ImportItem,
     Installment,
@@ -18,6 +24,7 @@ from .models import (
     RecurringInstance,
     RecurringRule,
 )
+from .services_series import signed_amount
 
 
 @dataclass
@@ -41,6 +48,67 @@ def add_months(start: date, months: int) -> date:
     return result
 
 
+def statement_periods(installments) -> set[tuple[int, int]]:
+    return {(item.statement_year, item.statement_month) for item in installments}
+
+
+def sync_card_statements(card: Card, periods=None) -> None:
+    """
+    Recalcula os CardStatement materializados do cartão para os meses informados
+    (ou todos, se `periods` for None). Meses sem parcelas têm o registro removido.
+    """
+    installments = Installment.objects.filter(group__card=card)
+    statements = CardStatement.objects.filter(card=card)
+    if periods is not None:
+        periods = set(periods)
+        if not periods:
+            return
+        years = {year for year, _ in periods}
+        installments = installments.filter(statement_year__in=years)
+        statements = statements.filter(year__in=years)
+
+    rows = (
+        installments.order_by()
+        .values("statement_year", "statement_month")
+        .annotate(total=Sum("amount"), item_count=Count("id"))
+    )
+    fresh = []
+    for row in rows:
+        year, month = row["statement_year"], row["statement_month"]
+        if periods is not None and (year, month) not in periods:
+            continue
+        closing_date, _, _ = get_statement_window(year, month, card.closing_day)
+        fresh.append(
+            CardStatement(
+                household_id=card.household_id,
+                card=card,
+                year=year,
+                month=month,
+                closing_date=closing_date,
+                due_date=get_due_date(year, month, card.due_day),
+                total=row["total"],
+                item_count=row["item_count"],
+            )
+        )
+
+    with transaction.atomic():
+        if fresh:
+            CardStatement.objects.bulk_create(
+                fresh,
+                update_conflicts=True,
+                unique_fields=["card", "year", "month"],
+                update_fields=["closing_date", "due_date", "total", "item_count", "updated_at"],
+            )
+        kept = {(statement.year, statement.month) for statement in fresh}
+        stale = [
+            pk
+            for pk, year, month in statements.values_list("pk", "year", "month")
+            if (periods is None or (year, month) in periods) and (year, month) not in kept
+        ]
+        if stale:
+            CardStatement.objects.filter(pk__in=stale).delete()
+
+
 def installment_plan(total: Decimal, count: int, first_due: date) -> InstallmentPlan:
     if count <= 0:
         raise ValueError("installments_count must be positive")
@@ -94,6 +162,7 @@ def generate_installments_for_group(group: CardPurchaseGroup) -> list[Installmen
                 ledger_entry=entry,
             )
             created.append(installment)
+        sync_card_statements(group.card, statement_periods(created))
     return created
 
 
@@ -135,6 +204,7 @@ def generate_installments_from_statement(
         installment.ledger_entry = entry
         installment.save(update_fields=["ledger_entry"])
         created.append(installment)
+        sync_card_statements(group.card, statement_periods(created))
     return created
 
 
@@ -194,82 +264,147 @@ def generate_future_installments_from_group(
             print(f"    -> ALREADY EXISTS")
     
     print(f"  Total created: {len(created)}\n")
+    sync_card_statements(group.card, statement_periods(created))
     return created
 
 
 def regenerate_future_installments(group: CardPurchaseGroup, from_date: date) -> list[Installment]:
     with transaction.atomic():
         future_installments = group.installments.filter(due_date__gte=from_date)
+        removed_periods = statement_periods(
+            future_installments.only("group", "statement_year", "statement_month")
+        )
         ledger_ids = list(future_installments.exclude(ledger_entry=None).values_list("ledger_entry_id", flat=True))
         future_installments.delete()
         if ledger_ids:
-            LedgerEntry.objects.filter(id__in=ledger_ids).delete()
+            entries = LedgerEntry.objects.filter(id__in=ledger_ids)
+            AccountBalance.remove_entries(entries)
+            entries.delete()
+        sync_card_statements(group.card, removed_periods)
     return generate_installments_for_group(group)
 
 
-def generate_recurring_instances(rule: RecurringRule, months_ahead: int) -> list[RecurringInstance]:
-    print("\n[RECURRING_GENERATE]")
-    print("rule:", rule.id, "-", rule.description)
-    print("months_ahead:", months_ahead)
-
-    if months_ahead <= 0:
-        print("ABORT: months_ahead <= 0")
-        return []
-
-    today = timezone.localdate()
-    start_month = date(today.year, today.month, 1)
-
-    print("today:", today)
-    print("start_month:", start_month)
-    print("rule.start_date:", rule.start_date)
-    print("rule.end_date:", rule.end_date)
+def delete_purchase_group(group: CardPurchaseGroup) -> None:
+    with transaction.atomic():
+        periods = statement_periods(group.installments.only("group", "statement_year", "statement_month"))
+        card = group.card
+        group.delete()
+        sync_card_statements(card, periods)
+
+
+def rebuild_account_balances(household=None) -> int:
+    """Recalcula o saldo diário de todas as contas numa única passada com window function."""
+    entries = LedgerEntry.objects.exclude(account=None)
+    if household is not None:
+        entries = entries.filter(household=household)
+    # O frame padrão com ORDER BY inclui os pares do mesmo dia, então cada linha
+    # já carrega o fechamento do dia e o DISTINCT deixa uma linha por (conta, dia).
+    rows = (
+        entries.annotate(
+            running=Window(Sum(signed_amount()), partition_by=[F("account_id")], order_by=F("date").asc())
+        )
+        .order_by()
+        .values_list("household_id", "account_id", "date", "running")
+        .distinct()
+    )
+    balances = [
+        AccountBalance(household_id=household_id, account_id=account_id, date=day, balance=running)
+        for household_id, account_id, day, running in rows
+    ]
+    stale = AccountBalance.objects.all()
+    if household is not None:
+        stale = stale.filter(household=household)
+    with transaction.atomic():
+        stale.delete()
+        AccountBalance.objects.bulk_create(balances, batch_size=500)
+    return len(balances)
 
-    instances = []
 
+def _recurring_due_dates(rule: RecurringRule, start_month: date, months_ahead: int) -> list[date]:
+    due_dates = []
     for offset in range(months_ahead):
         target_month = add_months(start_month, offset)
-        print(f"\n[CHECK] target:", target_month.year, target_month.month)
-
         if rule.start_date > target_month:
-            print("SKIP: before start_date")
             continue
-
         if rule.end_date and rule.end_date < target_month:
-            print("SKIP: after end_date")
             continue
-
         due_day = min(
             rule.due_day,
             last_day_of_month(target_month.year, target_month.month),
         )
-        due_date = date(target_month.year, target_month.month, due_day)
+        due_dates.append(date(target_month.year, target_month.month, due_day))
+    return due_dates
 
-        instance, created = RecurringInstance.objects.get_or_create(
-            household=rule.household,
-            rule=rule,
-            year=target_month.year,
-            month=target_month.month,
-            defaults={
-                "due_date": due_date,
-                "amount": rule.amount,
-            },
-        )
 
-        print(
-            "RESULT:",
-            f"{target_month.month}/{target_month.year}",
-            "→",
-            "CREATED" if created else "EXISTS",
-            f"(id={instance.id})",
-        )
+def generate_recurring_instances_for_rules(rules, months_ahead: int) -> list[RecurringInstance]:
+    """
+    Cria as ocorrências que faltam para várias regras de uma vez: uma query para as
+    existentes e um bulk_create para as novas (idempotente).
+    """
+    rules = list(rules)
+    print("\n[RECURRING_GENERATE]")
+    print("rules:", [rule.id for rule in rules])
+    print("months_ahead:", months_ahead)
 
-        if created:
-            instances.append(instance)
+    if months_ahead <= 0 or not rules:
+        print("ABORT: nothing to generate")
+        return []
+
+    today = timezone.localdate()
+    start_month = date(today.year, today.month, 1)
+    last_month = add_months(start_month, months_ahead - 1)
+    existing = set(
+        RecurringInstance.objects.filter(
+            rule__in=rules,
+            year__gte=start_month.year,
+            year__lte=last_month.year,
+        ).values_list("rule_id", "year", "month")
+    )
+
+    instances = [
+        RecurringInstance(
+            household_id=rule.household_id,
+            rule=rule,
+            year=due_date.year,
+            month=due_date.month,
+            due_date=due_date,
+            amount=rule.amount,
+        )
+        for rule in rules
+        for due_date in _recurring_due_dates(rule, start_month, months_ahead)
+        if (rule.id, due_date.year, due_date.month) not in existing
+    ]
+    try:
+        with transaction.atomic():
+            instances = RecurringInstance.objects.bulk_create(instances)
+    except IntegrityError:
+        # Outra requisição criou parte dos meses ao mesmo tempo: cai para o caminho linha a linha.
+        created = []
+        for instance in instances:
+            instance.pk = None
+            obj, was_created = RecurringInstance.objects.get_or_create(
+                rule=instance.rule,
+                year=instance.year,
+                month=instance.month,
+                defaults={
+                    "household_id": instance.household_id,
+                    "due_date": instance.due_date,
+                    "amount": instance.amount,
+                },
+            )
+            if was_created:
+                created.append(obj)
+        instances = created
 
     print("[RECURRING_GENERATE] created:", len(instances))
+    RECURRING_GENERATED.inc(len(instances))
     return instances
 
 
+def generate_recurring_instances(rule: RecurringRule, months_ahead: int) -> list[RecurringInstance]:
+    return generate_recurring_instances_for_rules([rule], months_ahead)
+
+
 def pay_recurring_instance(instance: RecurringInstance) -> RecurringInstance:
     with transaction.atomic():
         instance = RecurringInstance.objects.select_for_update().get(pk=instance.pk)
@@ -2,9 +2,21 @@ from __future__ import annotations
 
 from collections import defaultdict
 from dataclasses import dataclass
+from datetime import date
 from decimal import Decimal
 
-from .models import InvestmentSnapshot
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from core.metrics import record_cache
+
+from .models import InvestmentAccount, InvestmentSnapshot
+
+ZERO = Decimal("0.00")
+SERIES_CACHE_TIMEOUT = 60 * 60
+# Meses carregados antes do início da série para calcular MoM/YoY dos primeiros pontos.
+_LOOKBACK_MONTHS = 12
 
 
 @dataclass(frozen=True)
@@ -15,53 +27,248 @@ class MonthlyDelta:
     delta_pct: Decimal | None
 
 
-def get_investment_snapshots(household, year: int):
-    return (
-        InvestmentSnapshot.objects.filter(household=household, year=year)
-        .select_related("account")
-        .order_by("account__name", "month")
-    )
+@dataclass(frozen=True)
+class InvestmentSeries:
+    months: list[date]
+    balances: dict[int, list[Decimal | None]]
+    totals: list[Decimal]
+    observed: list[bool]
+    mom_abs: list[Decimal | None]
+    mom_pct: list[Decimal | None]
+    yoy_abs: list[Decimal | None]
+    yoy_pct: list[Decimal | None]
+    cagr: Decimal | None
+    max_drawdown: Decimal | None
+
+    def monthly_deltas(self) -> list[MonthlyDelta]:
+        return [
+            MonthlyDelta(month=month.month, total=total, delta_abs=delta_abs, delta_pct=delta_pct)
+            for month, total, delta_abs, delta_pct in zip(self.months, self.totals, self.mom_abs, self.mom_pct)
+        ]
+
+
+@dataclass(frozen=True)
+class AccountOverview:
+    account: InvestmentAccount
+    current_snapshot: InvestmentSnapshot | None
+    previous_snapshot: InvestmentSnapshot | None
+    delta_abs: Decimal | None
+    delta_pct: Decimal | None
+
+
+@dataclass(frozen=True)
+class InvestmentData:
+    year: int
+    accounts: list[InvestmentAccount]
+    snapshots: list[InvestmentSnapshot]
+    overview: list[AccountOverview]
+
+
+def percent_change(previous: Decimal, current: Decimal) -> Decimal | None:
+    if previous == 0 and current == 0:
+        return Decimal("0.00")
+    if previous == 0:
+        return None
+    return ((current - previous) / previous) * Decimal("100.00")
+
+
+def _month_index(year: int, month: int) -> int:
+    return year * 12 + month - 1
+
+
+def _month_from_index(index: int) -> date:
+    return date(index // 12, index % 12 + 1, 1)
 
 
-def compute_monthly_totals(snapshots) -> list[Decimal]:
-    totals = [Decimal("0.00") for _ in range(12)]
-    for snapshot in snapshots:
-        if 1 <= snapshot.month <= 12:
-            totals[snapshot.month - 1] += snapshot.balance
-    return totals
+def _series_version_key(household_id) -> str:
+    return f"investments:series-version:{household_id}"
 
 
-def compute_mom_deltas(series: list[Decimal]) -> list[MonthlyDelta]:
-    deltas: list[MonthlyDelta] = []
-    previous = None
-    for idx, current in enumerate(series, start=1):
-        if previous is None:
-            deltas.append(MonthlyDelta(month=idx, total=current, delta_abs=None, delta_pct=None))
-            previous = current
+def investment_series_version(household) -> int:
+    return cache.get(_series_version_key(household.id), 0)
+
+
+def invalidate_investment_series(household) -> None:
+    """Descarta as séries em cache do household (chamar sempre que snapshots mudarem)."""
+    key = _series_version_key(household.id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def _deltas(values: list[Decimal], lag: int, first: int):
+    absolute, percent = [], []
+    for idx in range(first, len(values)):
+        if idx < lag:
+            absolute.append(None)
+            percent.append(None)
             continue
+        absolute.append(values[idx] - values[idx - lag])
+        percent.append(percent_change(values[idx - lag], values[idx]))
+    return absolute, percent
+
+
+def _cagr(points: list[tuple[int, Decimal]]) -> Decimal | None:
+    points = [(idx, total) for idx, total in points if total > 0]
+    if len(points) < 2 or points[-1][0] == points[0][0]:
+        return None
+    (first_idx, first_total), (last_idx, last_total) = points[0], points[-1]
+    years = Decimal(last_idx - first_idx) / Decimal(12)
+    growth = (last_total / first_total) ** (Decimal(1) / years)
+    return ((growth - 1) * Decimal("100.00")).quantize(Decimal("0.01"))
 
-        delta_abs = current - previous
-        if previous == 0 and current == 0:
-            delta_pct = Decimal("0.00")
-        elif previous == 0 and current != 0:
-            delta_pct = None
-        else:
-            delta_pct = (delta_abs / previous) * Decimal("100.00")
-        deltas.append(
-            MonthlyDelta(
-                month=idx,
-                total=current,
+
+def _max_drawdown(values: list[Decimal]) -> Decimal | None:
+    peak = None
+    worst = None
+    for value in values:
+        if peak is None or value > peak:
+            peak = value
+        if peak > 0:
+            drawdown = (value - peak) / peak * Decimal("100.00")
+            worst = drawdown if worst is None else min(worst, drawdown)
+    return worst.quantize(Decimal("0.01")) if worst is not None else None
+
+
+def build_investment_series(household, start: date, end: date, carry_forward: bool = True) -> InvestmentSeries:
+    """
+    Série mensal de saldos por conta entre `start` e `end` (meses inclusivos, anos
+    cruzados). Com `carry_forward`, meses sem snapshot repetem o último saldo
+    conhecido da conta em vez de contar como zero.
+    """
+    first = _month_index(start.year, start.month)
+    last = _month_index(end.year, end.month)
+    origin = first - _LOOKBACK_MONTHS
+    width = last - origin + 1
+
+    rows = InvestmentSnapshot.objects.filter(household=household).filter(
+        Q(year__lt=end.year) | Q(year=end.year, month__lte=end.month)
+    )
+    if not carry_forward:
+        origin_month = _month_from_index(origin)
+        rows = rows.filter(
+            Q(year__gt=origin_month.year) | Q(year=origin_month.year, month__gte=origin_month.month)
+        )
+
+    raw: dict[int, list[Decimal | None]] = defaultdict(lambda: [None] * width)
+    seed: dict[int, tuple[int, Decimal]] = {}
+    for account_id, year, month, balance in rows.order_by().values_list("account_id", "year", "month", "balance"):
+        idx = _month_index(year, month) - origin
+        if idx >= 0:
+            raw[account_id][idx] = balance
+        elif account_id not in seed or seed[account_id][0] < idx:
+            seed[account_id] = (idx, balance)
+
+    observed = [False] * width
+    for values in raw.values():
+        for idx, value in enumerate(values):
+            if value is not None:
+                observed[idx] = True
+
+    balances: dict[int, list[Decimal | None]] = {}
+    for account_id in set(raw) | set(seed):
+        values = raw[account_id]
+        if carry_forward:
+            last_known = seed[account_id][1] if account_id in seed else None
+            filled = []
+            for value in values:
+                if value is not None:
+                    last_known = value
+                filled.append(last_known)
+            values = filled
+        balances[account_id] = values
+
+    columns = list(zip(*balances.values())) if balances else [() for _ in range(width)]
+    totals = [sum((value for value in column if value is not None), ZERO) for column in columns]
+    has_value = [any(value is not None for value in column) for column in columns]
+
+    offset = first - origin
+    window = [(idx, totals[idx]) for idx in range(offset, width) if has_value[idx]]
+    mom_abs, mom_pct = _deltas(totals, 1, offset)
+    yoy_abs, yoy_pct = _deltas(totals, 12, offset)
+    return InvestmentSeries(
+        months=[_month_from_index(idx) for idx in range(first, last + 1)],
+        balances={account_id: values[offset:] for account_id, values in balances.items()},
+        totals=totals[offset:],
+        observed=observed[offset:],
+        mom_abs=mom_abs,
+        mom_pct=mom_pct,
+        yoy_abs=yoy_abs,
+        yoy_pct=yoy_pct,
+        cagr=_cagr(window),
+        max_drawdown=_max_drawdown([total for _, total in window]),
+    )
+
+
+def investment_series(household, start: date, end: date, carry_forward: bool = True) -> InvestmentSeries:
+    """`build_investment_series` com cache por household, válido até um snapshot mudar."""
+    version = investment_series_version(household)
+    key = (
+        f"investments:series:{household.id}:{version}:"
+        f"{start:%Y%m}:{end:%Y%m}:{int(carry_forward)}"
+    )
+    series = cache.get(key)
+    record_cache("investment_series", series is not None)
+    if series is None:
+        series = build_investment_series(household, start, end, carry_forward)
+        cache.set(key, series, SERIES_CACHE_TIMEOUT)
+    return series
+
+
+def upsert_investment_snapshots(snapshots: list[InvestmentSnapshot]) -> list[InvestmentSnapshot]:
+    """Grava vários snapshots em um INSERT, atualizando o saldo dos (conta, ano, mês) existentes."""
+    return InvestmentSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=["account", "year", "month"],
+        update_fields=["balance", "updated_at"],
+    )
+
+
+def load_investment_data(household, year: int, today: date | None = None) -> InvestmentData:
+    """
+    Carrega contas e snapshots em duas consultas: os snapshots do ano do resumo e
+    os do mês atual/anterior da visão geral vêm juntos e são separados em memória.
+    """
+    today = today or timezone.localdate()
+    current = (today.year, today.month)
+    previous = (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+
+    accounts = list(InvestmentAccount.objects.filter(household=household).order_by("name"))
+    rows = InvestmentSnapshot.objects.filter(household=household).filter(
+        Q(year=year)
+        | Q(year=current[0], month=current[1])
+        | Q(year=previous[0], month=previous[1])
+    )
+    by_key = {}
+    year_snapshots = []
+    for snapshot in rows:
+        by_key[(snapshot.account_id, snapshot.year, snapshot.month)] = snapshot
+        if snapshot.year == year:
+            year_snapshots.append(snapshot)
+
+    position = {account.id: idx for idx, account in enumerate(accounts)}
+    accounts_by_id = {account.id: account for account in accounts}
+    for snapshot in year_snapshots:
+        snapshot.account = accounts_by_id[snapshot.account_id]
+    year_snapshots.sort(key=lambda item: (position[item.account_id], item.month))
+
+    overview = []
+    for account in accounts:
+        current_snapshot = by_key.get((account.id, *current))
+        previous_snapshot = by_key.get((account.id, *previous))
+        delta_abs = delta_pct = None
+        if current_snapshot and previous_snapshot:
+            delta_abs = current_snapshot.balance - previous_snapshot.balance
+            delta_pct = percent_change(previous_snapshot.balance, current_snapshot.balance)
+        overview.append(
+            AccountOverview(
+                account=account,
+                current_snapshot=current_snapshot,
+                previous_snapshot=previous_snapshot,
                 delta_abs=delta_abs,
                 delta_pct=delta_pct,
             )
         )
-        previous = current
-    return deltas
-
-
-def compute_account_series(snapshots) -> dict[int, list[Decimal]]:
-    account_series: dict[int, list[Decimal]] = defaultdict(lambda: [Decimal("0.00") for _ in range(12)])
-    for snapshot in snapshots:
-        if 1 <= snapshot.month <= 12:
-            account_series[snapshot.account_id][snapshot.month - 1] = snapshot.balance
-    return account_series
+    return InvestmentData(year=year, accounts=accounts, snapshots=year_snapshots, overview=overview)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+from core.metrics import record_cache
+
+from .models import Installment, LedgerEntry
+from .services import add_months
+from .services_investments import investment_series, investment_series_version
+from .services_series import month_range, signed_amount
+
+ZERO = Decimal("0.00")
+# Escritas fora das views (bot, importação, admin) não invalidam a série; o TTL limita o atraso.
+NET_WORTH_CACHE_TIMEOUT = 60 * 5
+
+
+@dataclass(frozen=True)
+class NetWorthSeries:
+    months: list[date]
+    investments: list[Decimal]
+    accounts: dict[int | None, list[Decimal]]
+    cash: list[Decimal]
+    liabilities: list[Decimal]
+
+    @property
+    def net_worth(self) -> list[Decimal]:
+        return [
+            investments + cash - liabilities
+            for investments, cash, liabilities in zip(self.investments, self.cash, self.liabilities)
+        ]
+
+
+def _account_balances(household, months: list[date]) -> dict[int | None, list[Decimal]]:
+    # Saldo de cada conta ao fim de cada mês: tudo antes da série vira saldo de abertura.
+    index = {month: idx for idx, month in enumerate(months)}
+    rows = (
+        LedgerEntry.objects.filter(household=household, date__lt=add_months(months[-1], 1))
+        .order_by()
+        .annotate(period=TruncMonth("date", output_field=models.DateField()))
+        .values("account_id", "period")
+        .annotate(
+            net=Sum(signed_amount())
+        )
+    )
+    changes: dict[int | None, list[Decimal]] = {}
+    for row in rows:
+        values = changes.setdefault(row["account_id"], [ZERO] * len(months))
+        values[index.get(row["period"], 0)] += row["net"]
+    return {account_id: list(accumulate(values)) for account_id, values in changes.items()}
+
+
+def _installment_liabilities(household, months: list[date]) -> list[Decimal]:
+    """
+    Parcelas em aberto ao fim de cada mês: compradas até o mês e com vencimento
+    posterior. Cada (mês da compra, mês do vencimento) soma um intervalo em um
+    vetor de diferenças, resolvido com uma soma acumulada.
+    """
+    width = len(months)
+    index = {month: idx for idx, month in enumerate(months)}
+    rows = (
+        Installment.objects.filter(household=household, due_date__gte=months[0])
+        .order_by()
+        .annotate(
+            contracted=TruncMonth(
+                Coalesce("group__purchase_date", "group__first_due_date"), output_field=models.DateField()
+            ),
+            due_month=TruncMonth("due_date", output_field=models.DateField()),
+        )
+        .values("contracted", "due_month")
+        .annotate(total=Sum("amount"))
+    )
+    diff = [ZERO] * (width + 1)
+    for row in rows:
+        start = 0 if row["contracted"] < months[0] else index.get(row["contracted"], width)
+        end = index.get(row["due_month"], width)
+        if start < end:
+            diff[start] += row["total"]
+            diff[end] -= row["total"]
+    return list(accumulate(diff[:width]))
+
+
+def build_net_worth_series(household, start: date, end: date) -> NetWorthSeries:
+    """
+    Patrimônio líquido ao fim de cada mês entre `start` e `end`: investimentos
+    (com saldo repetido nos meses sem snapshot) + saldo acumulado das contas
+    - parcelas de cartão ainda a vencer.
+    """
+    months = month_range(start, end)
+    balances = _account_balances(household, months)
+    cash = [sum(column, ZERO) for column in zip(*balances.values())] if balances else [ZERO] * len(months)
+    return NetWorthSeries(
+        months=months,
+        investments=investment_series(household, months[0], months[-1]).totals,
+        accounts=balances,
+        cash=cash,
+        liabilities=_installment_liabilities(household, months),
+    )
+
+
+def _version_key(household_id) -> str:
+    return f"networth:version:{household_id}"
+
+
+def invalidate_net_worth(household) -> None:
+    key = _version_key(household.id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def net_worth_series(household, start: date, end: date) -> NetWorthSeries:
+    """`build_net_worth_series` com cache por household e intervalo."""
+    key = (
+        f"networth:{household.id}:{cache.get(_version_key(household.id), 0)}:"
+        f"{investment_series_version(household)}:{start:%Y%m}:{end:%Y%m}"
+    )
+    series = cache.get(key)
+    record_cache("net_worth", series is not None)
+    if series is None:
+        series = build_net_worth_series(household, start, end)
+        cache.set(key, series, NET_WORTH_CACHE_TIMEOUT)
+    return series
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Case, F, Sum, Value, When, Window
+from django.db.models.functions import TruncMonth
+
+from .models import LedgerEntry
+
+ZERO = Decimal("0.00")
+_SERIES_OUTPUT = models.DecimalField(max_digits=14, decimal_places=2)
+
+
+@dataclass(frozen=True)
+class DailySeries:
+    days: list[date]
+    daily: list[Decimal]
+    cumulative: list[Decimal]
+
+    @property
+    def total(self) -> Decimal:
+        return self.cumulative[-1] if self.cumulative else ZERO
+
+
+@dataclass(frozen=True)
+class CashFlowSeries:
+    months: list[date]
+    income: list[Decimal]
+    expense: list[Decimal]
+    net: list[Decimal]
+    balance: list[Decimal]
+
+
+def _filtered_entries(household, start: date | None, end: date, kind=None, categories=None, accounts=None):
+    queryset = LedgerEntry.objects.filter(household=household, date__lte=end)
+    if start is not None:
+        queryset = queryset.filter(date__gte=start)
+    if kind:
+        queryset = queryset.filter(kind=kind)
+    if categories is not None:
+        queryset = queryset.filter(category__in=categories)
+    if accounts is not None:
+        queryset = queryset.filter(account__in=accounts)
+    # Drop the model's default ordering so it doesn't leak into the window/DISTINCT clause.
+    return queryset.order_by()
+
+
+def signed_amount():
+    return Case(
+        When(kind=LedgerEntry.Kind.EXPENSE, then=-F("amount")),
+        default=F("amount"),
+        output_field=_SERIES_OUTPUT,
+    )
+
+
+def _carry_forward(
+    points: list[date], keys: list[date], values: list[Decimal], initial: Decimal = ZERO
+) -> list[Decimal]:
+    # Last known value at or before each point; `initial` before the first row.
+    return [values[idx - 1] if idx else initial for idx in (bisect_right(keys, point) for point in points)]
+
+
+def month_range(start: date, end: date) -> list[date]:
+    first = start.replace(day=1)
+    last = end.replace(day=1)
+    count = (last.year - first.year) * 12 + (last.month - first.month) + 1
+    return [date(first.year + (first.month - 1 + i) // 12, (first.month - 1 + i) % 12 + 1, 1) for i in range(count)]
+
+
+def daily_series(household, start: date, end: date, kind=None, categories=None, accounts=None) -> DailySeries:
+    """
+    Soma diária e acumulada de lançamentos entre `start` e `end` (inclusivo).
+
+    Os totais são calculados no banco com funções de janela; sem `kind`, despesas
+    entram com sinal negativo (fluxo líquido). Dias sem lançamento repetem o
+    acumulado anterior.
+    """
+    amount = F("amount") if kind else signed_amount()
+    rows = list(
+        _filtered_entries(household, start, end, kind, categories, accounts)
+        .annotate(
+            day_total=Window(Sum(amount), partition_by=[F("date")], output_field=_SERIES_OUTPUT),
+            running_total=Window(Sum(amount), order_by=F("date").asc(), output_field=_SERIES_OUTPUT),
+        )
+        .values_list("date", "day_total", "running_total")
+        .distinct()
+        .order_by("date")
+    )
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    keys = [row[0] for row in rows]
+    by_day = {row[0]: row[1] for row in rows}
+    return DailySeries(
+        days=days,
+        daily=[by_day.get(day, ZERO) for day in days],
+        cumulative=_carry_forward(days, keys, [row[2] for row in rows]),
+    )
+
+
+def monthly_cash_flow(household, start: date, end: date, categories=None, accounts=None) -> CashFlowSeries:
+    """
+    Receitas, despesas, resultado e saldo acumulado por mês entre `start` e `end`.
+    O saldo parte do resultado de todos os lançamentos anteriores a `start` (uma
+    agregação só), então a curva bate com o saldo das contas.
+    """
+    opening = _filtered_entries(
+        household, None, start - timedelta(days=1), categories=categories, accounts=accounts
+    ).aggregate(total=Sum(signed_amount()))["total"] or ZERO
+    month = TruncMonth("date", output_field=models.DateField())
+    rows = list(
+        _filtered_entries(household, start, end, categories=categories, accounts=accounts)
+        .annotate(
+            period=month,
+            month_income=Window(
+                Sum(Case(When(kind=LedgerEntry.Kind.INCOME, then=F("amount")), default=Value(ZERO))),
+                partition_by=[month],
+                output_field=_SERIES_OUTPUT,
+            ),
+            month_expense=Window(
+                Sum(Case(When(kind=LedgerEntry.Kind.EXPENSE, then=F("amount")), default=Value(ZERO))),
+                partition_by=[month],
+                output_field=_SERIES_OUTPUT,
+            ),
+            running_net=Window(Sum(signed_amount()), order_by=month.asc(), output_field=_SERIES_OUTPUT),
+        )
+        .values_list("period", "month_income", "month_expense", "running_net")
+        .distinct()
+        .order_by("period")
+    )
+    months = month_range(start, end)
+    keys = [row[0] for row in rows]
+    by_month = {row[0]: row for row in rows}
+    income = [by_month[m][1] if m in by_month else ZERO for m in months]
+    expense = [by_month[m][2] if m in by_month else ZERO for m in months]
+    return CashFlowSeries(
+        months=months,
+        income=income,
+        expense=expense,
+        net=[inc - exp for inc, exp in zip(income, expense)],
+        balance=_carry_forward(months, keys, [opening + row[3] for row in rows], initial=opening),
+    )
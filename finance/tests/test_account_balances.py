@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Household, HouseholdMembership
+from finance.models import Account, AccountBalance, LedgerEntry
+from finance.services import rebuild_account_balances
+
+
+class AccountBalanceTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
+        self.client.login(username="ana", password="pass1234")
+        self.account = Account.objects.create(household=self.household, name="Banco")
+
+    def _entry(self, day, kind, amount, account=None):
+        return LedgerEntry.objects.create(
+            household=self.household,
+            date=day,
+            kind=kind,
+            amount=Decimal(amount),
+            description="Teste",
+            account=account or self.account,
+        )
+
+    def _balances(self, account=None):
+        return list(
+            AccountBalance.objects.filter(account=account or self.account).values_list("date", "balance")
+        )
+
+    def test_incremental_updates_only_touch_days_from_the_change(self):
+        self._entry(date(2024, 1, 5), LedgerEntry.Kind.INCOME, "1000.00")
+        expense = self._entry(date(2024, 1, 10), LedgerEntry.Kind.EXPENSE, "200.00")
+        self._entry(date(2024, 1, 10), LedgerEntry.Kind.EXPENSE, "50.00")
+        self.assertEqual(
+            self._balances(),
+            [(date(2024, 1, 5), Decimal("1000.00")), (date(2024, 1, 10), Decimal("750.00"))],
+        )
+
+        # Lançamento retroativo cria o dia com o saldo de abertura e ajusta os seguintes.
+        self._entry(date(2024, 1, 7), LedgerEntry.Kind.EXPENSE, "100.00")
+        self.assertEqual(
+            self._balances(),
+            [
+                (date(2024, 1, 5), Decimal("1000.00")),
+                (date(2024, 1, 7), Decimal("900.00")),
+                (date(2024, 1, 10), Decimal("650.00")),
+            ],
+        )
+
+        expense.amount = Decimal("300.00")
+        expense.date = date(2024, 1, 6)
+        expense.save()
+        self.assertEqual(
+            self._balances(),
+            [
+                (date(2024, 1, 5), Decimal("1000.00")),
+                (date(2024, 1, 6), Decimal("700.00")),
+                (date(2024, 1, 7), Decimal("600.00")),
+                (date(2024, 1, 10), Decimal("550.00")),
+            ],
+        )
+
+        other = Account.objects.create(household=self.household, name="Carteira")
+        expense.account = other
+        expense.save()
+        self.assertEqual(self._balances()[-1], (date(2024, 1, 10), Decimal("850.00")))
+        self.assertEqual(self._balances(other), [(date(2024, 1, 6), Decimal("-300.00"))])
+
+        expense.delete()
+        self.assertEqual(self._balances(other), [(date(2024, 1, 6), Decimal("0.00"))])
+
+    def test_rebuild_matches_incremental_history(self):
+        self._entry(date(2024, 1, 5), LedgerEntry.Kind.INCOME, "1000.00")
+        self._entry(date(2024, 1, 10), LedgerEntry.Kind.EXPENSE, "200.00")
+        self._entry(date(2024, 1, 10), LedgerEntry.Kind.EXPENSE, "50.00")
+        self._entry(date(2024, 2, 1), LedgerEntry.Kind.INCOME, "10.00")
+        incremental = self._balances()
+
+        AccountBalance.objects.all().delete()
+        self.assertEqual(rebuild_account_balances(self.household), 3)
+        self.assertEqual(self._balances(), incremental)
+
+        AccountBalance.objects.filter(date=date(2024, 2, 1)).update(balance=Decimal("0.00"))
+        call_command("rebuild_account_balances", household="casa", stdout=StringIO())
+        self.assertEqual(self._balances(), incremental)
+
+    def test_account_list_shows_current_balance_and_sparkline(self):
+        today = timezone.localdate()
+        self._entry(today - timedelta(days=10), LedgerEntry.Kind.INCOME, "500.00")
+        self._entry(today, LedgerEntry.Kind.EXPENSE, "120.00")
+
+        response = self.client.get(reverse("finance:accounts"))
+        account = response.context["accounts"][0]
+        self.assertEqual(account.current_balance, Decimal("380.00"))
+        self.assertContains(response, "<polyline")
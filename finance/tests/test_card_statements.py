@@ -0,0 +1,66 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Household, HouseholdMembership
+from finance.models import Card, CardPurchaseGroup, CardStatement
+from finance.services import generate_installments_for_group, regenerate_future_installments
+
+
+class CardStatementTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
+        self.client.login(username="ana", password="pass1234")
+        self.card = Card.objects.create(
+            household=self.household, name="Visa", closing_day=25, due_day=5, created_by=self.user
+        )
+
+    def _group(self, total="300.00", count=3, first_due=date(2024, 5, 25)):
+        group = CardPurchaseGroup.objects.create(
+            household=self.household,
+            card=self.card,
+            description="Notebook",
+            total_amount=Decimal(total),
+            installments_count=count,
+            first_due_date=first_due,
+            created_by=self.user,
+        )
+        generate_installments_for_group(group)
+        return group
+
+    def test_generated_installments_materialize_statements(self):
+        self._group()
+        self._group(total="50.00", count=1)
+
+        statements = {(s.year, s.month): s for s in CardStatement.objects.filter(card=self.card)}
+        self.assertEqual(set(statements), {(2024, 5), (2024, 6), (2024, 7)})
+        may = statements[(2024, 5)]
+        self.assertEqual(may.total, Decimal("150.00"))
+        self.assertEqual(may.item_count, 2)
+        self.assertEqual(may.closing_date, date(2024, 5, 25))
+        self.assertEqual(may.due_date, date(2024, 5, 5))
+
+    def test_delete_and_regenerate_keep_statements_in_sync(self):
+        group = self._group()
+        regenerate_future_installments(group, date(2024, 6, 1))
+        self.assertEqual(
+            set(CardStatement.objects.filter(card=self.card).values_list("month", flat=True)),
+            {5},
+        )
+
+        self.client.post(reverse("finance:purchase-delete", args=[group.id]))
+        self.assertFalse(CardStatement.objects.filter(card=self.card).exists())
+
+    def test_statement_page_uses_materialized_total(self):
+        self._group()
+        response = self.client.get(
+            reverse("finance:card-statement", args=[self.card.id, 2024, 6])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["statement_total"], Decimal("100.00"))
+        self.assertEqual(len(response.context["installments"]), 1)
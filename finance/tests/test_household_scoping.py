@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core.households import ROLE_MEMBER, ROLE_PRIMARY
 from core.models import Household, HouseholdMembership
 from finance.models import Category
 
@@ -30,3 +33,26 @@ class HouseholdScopingTests(TestCase):
         self.client.login(username="solo", password="pass1234")
         response = self.client.get(reverse("finance:categories"))
         self.assertRedirects(response, reverse("household-missing"))
+
+    def test_household_resolution_is_cached_until_membership_changes(self):
+        self.client.login(username="ana", password="pass1234")
+        url = reverse("finance:categories")
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.wsgi_request.household_role, ROLE_PRIMARY)
+        self.assertFalse(any("core_householdmembership" in query["sql"] for query in queries))
+
+        membership = HouseholdMembership.objects.get(user=self.user)
+        membership.household = self.other_household
+        membership.is_primary = False
+        membership.save()
+        response = self.client.get(url)
+        self.assertEqual(response.wsgi_request.household, self.other_household)
+        self.assertEqual(response.wsgi_request.household_role, ROLE_MEMBER)
+        self.assertContains(response, "Viagem")
+        self.assertNotContains(response, "Mercado")
+
+        membership.delete()
+        self.assertRedirects(self.client.get(url), reverse("household-missing"))
@@ -2,13 +2,20 @@ from datetime import date
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
+from django.core.cache import cache
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
 from core.models import Household, HouseholdMembership
 from finance.models import InvestmentAccount, InvestmentSnapshot, LedgerEntry
-from finance.services_investments import compute_mom_deltas
+from finance.services_investments import (
+    build_investment_series,
+    invalidate_investment_series,
+    investment_series,
+)
 
 
 class InvestmentTests(TestCase):
@@ -17,6 +24,17 @@ class InvestmentTests(TestCase):
         self.household = Household.objects.create(name="Casa", slug="casa")
         HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
         self.client.login(username="ana", password="pass1234")
+        cache.clear()
+
+    def _snapshot(self, account, year, month, balance):
+        return InvestmentSnapshot.objects.create(
+            household=self.household,
+            account=account,
+            year=year,
+            month=month,
+            balance=Decimal(balance),
+            created_by=self.user,
+        )
 
     def test_snapshot_unique_constraint(self):
         account = InvestmentAccount.objects.create(
@@ -41,7 +59,10 @@ class InvestmentTests(TestCase):
             )
 
     def test_mom_delta_zero_handling(self):
-        deltas = compute_mom_deltas([Decimal("0.00"), Decimal("0.00"), Decimal("10.00")])
+        account = InvestmentAccount.objects.create(household=self.household, name="XP", created_by=self.user)
+        for month, balance in ((1, "0.00"), (2, "0.00"), (3, "10.00")):
+            self._snapshot(account, 2024, month, balance)
+        deltas = build_investment_series(self.household, date(2024, 1, 1), date(2024, 3, 1)).monthly_deltas()
         self.assertEqual(deltas[1].delta_pct, Decimal("0.00"))
         self.assertIsNone(deltas[2].delta_pct)
 
@@ -75,3 +96,131 @@ class InvestmentTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.context["income_total"], Decimal("100.00"))
         self.assertEqual(response.context["expense_total"], Decimal("40.00"))
+
+    def _accounts_with_snapshots(self, count, start=0):
+        today = timezone.localdate()
+        previous_year, previous_month = (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+        for idx in range(start, start + count):
+            account = InvestmentAccount.objects.create(
+                household=self.household, name=f"Conta {idx}", created_by=self.user
+            )
+            for year, month, balance in (
+                (previous_year, previous_month, "100.00"),
+                (today.year, today.month, "110.00"),
+            ):
+                InvestmentSnapshot.objects.create(
+                    household=self.household,
+                    account=account,
+                    year=year,
+                    month=month,
+                    balance=Decimal(balance),
+                    created_by=self.user,
+                )
+
+    def test_investments_list_query_count_is_constant(self):
+        url = reverse("finance:investments")
+        self._accounts_with_snapshots(2)
+        self.client.get(url)
+        invalidate_investment_series(self.household)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self._accounts_with_snapshots(20, start=2)
+        invalidate_investment_series(self.household)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+
+        self.assertEqual(len(many), len(few))
+        overview = response.context["account_overview"]
+        self.assertEqual(len(overview), 22)
+        self.assertEqual(overview[0].delta_abs, Decimal("10.00"))
+        self.assertEqual(overview[0].delta_pct, Decimal("10.00"))
+
+    def test_series_carries_forward_across_years(self):
+        account = InvestmentAccount.objects.create(household=self.household, name="XP", created_by=self.user)
+        other = InvestmentAccount.objects.create(household=self.household, name="Nubank", created_by=self.user)
+        self._snapshot(account, 2023, 11, "100.00")
+        self._snapshot(account, 2024, 2, "90.00")
+        self._snapshot(other, 2024, 1, "50.00")
+
+        series = build_investment_series(self.household, date(2023, 12, 1), date(2024, 3, 1))
+
+        self.assertEqual(series.months[0], date(2023, 12, 1))
+        self.assertEqual(series.balances[account.id], [Decimal("100.00"), Decimal("100.00"), Decimal("90.00"), Decimal("90.00")])
+        self.assertEqual(series.balances[other.id][0], None)
+        self.assertEqual(series.totals, [Decimal("100.00"), Decimal("150.00"), Decimal("140.00"), Decimal("140.00")])
+        self.assertEqual(series.observed, [False, True, True, False])
+        self.assertEqual(series.mom_abs[0], Decimal("0.00"))
+        self.assertEqual(series.max_drawdown, Decimal("-6.67"))
+
+        gaps = build_investment_series(self.household, date(2023, 12, 1), date(2024, 3, 1), carry_forward=False)
+        self.assertEqual(gaps.totals, [Decimal("0.00"), Decimal("50.00"), Decimal("90.00"), Decimal("0.00")])
+
+    def test_series_yoy_and_cagr(self):
+        account = InvestmentAccount.objects.create(household=self.household, name="XP", created_by=self.user)
+        self._snapshot(account, 2022, 6, "100.00")
+        self._snapshot(account, 2024, 6, "121.00")
+
+        series = build_investment_series(self.household, date(2022, 6, 1), date(2024, 6, 1))
+
+        self.assertEqual(series.cagr, Decimal("10.00"))
+        self.assertEqual(series.yoy_abs[-1], Decimal("21.00"))
+        self.assertEqual(series.max_drawdown, Decimal("0.00"))
+
+    def test_series_cache_is_invalidated_when_snapshots_change(self):
+        account = InvestmentAccount.objects.create(household=self.household, name="XP", created_by=self.user)
+        self._snapshot(account, 2024, 1, "100.00")
+        start, end = date(2024, 1, 1), date(2024, 2, 1)
+
+        self.assertEqual(investment_series(self.household, start, end).totals[-1], Decimal("100.00"))
+        self._snapshot(account, 2024, 2, "130.00")
+        self.assertEqual(investment_series(self.household, start, end).totals[-1], Decimal("100.00"))
+
+        invalidate_investment_series(self.household)
+        self.assertEqual(investment_series(self.household, start, end).totals[-1], Decimal("130.00"))
+
+        response = self.client.post(
+            reverse("finance:investment-snapshot-create"),
+            {"account": account.id, "year": 2024, "month": 3, "balance": "150.00", "summary_year": 2024},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["monthly_totals"][2], Decimal("150.00"))
+
+    def test_snapshot_grid_upserts_in_one_request(self):
+        xp = InvestmentAccount.objects.create(household=self.household, name="XP", created_by=self.user)
+        nubank = InvestmentAccount.objects.create(household=self.household, name="Nubank", created_by=self.user)
+        existing = self._snapshot(xp, 2024, 1, "100.00")
+        url = reverse("finance:investment-snapshot-grid")
+
+        response = self.client.get(url, {"year": 2024})
+        self.assertContains(response, f'name="balance-{xp.id}-1"')
+        self.assertContains(response, 'value="100.00"')
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(
+                url,
+                {
+                    "year": 2024,
+                    f"balance-{xp.id}-1": "150.00",
+                    f"balance-{xp.id}-2": "160.00",
+                    f"balance-{nubank.id}-2": "40.00",
+                },
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "finance/partials/_investments_summary.html")
+        inserts = [q for q in captured.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.balance, Decimal("150.00"))
+        self.assertEqual(InvestmentSnapshot.objects.filter(household=self.household, year=2024).count(), 3)
+        self.assertEqual(response.context["monthly_totals"][1], Decimal("200.00"))
+
+    def test_snapshot_grid_rejects_invalid_cells(self):
+        xp = InvestmentAccount.objects.create(household=self.household, name="XP", created_by=self.user)
+        response = self.client.post(
+            reverse("finance:investment-snapshot-grid"),
+            {"year": 2024, f"balance-{xp.id}-1": "-5", f"balance-{xp.id}-2": "10.00"},
+        )
+        self.assertEqual(response["HX-Retarget"], "#modal-root")
+        self.assertContains(response, "is-invalid")
+        self.assertFalse(InvestmentSnapshot.objects.filter(account=xp).exists())
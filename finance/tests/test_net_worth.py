@@ -0,0 +1,116 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Household, HouseholdMembership
+from finance.models import (
+    Account,
+    Card,
+    CardPurchaseGroup,
+    InvestmentAccount,
+    InvestmentSnapshot,
+    LedgerEntry,
+)
+from finance.services import generate_installments_for_group
+from finance.services_networth import build_net_worth_series, net_worth_series
+
+
+class NetWorthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
+        self.client.login(username="ana", password="pass1234")
+        self.account = Account.objects.create(household=self.household, name="Banco")
+
+    def _entry(self, day, kind, amount, account=None):
+        return LedgerEntry.objects.create(
+            household=self.household,
+            date=day,
+            kind=kind,
+            amount=Decimal(amount),
+            description="Teste",
+            account=account or self.account,
+        )
+
+    def test_series_combines_accounts_investments_and_open_installments(self):
+        self._entry(date(2023, 12, 5), LedgerEntry.Kind.INCOME, "1000.00")
+        self._entry(date(2024, 2, 10), LedgerEntry.Kind.EXPENSE, "200.00")
+        investment = InvestmentAccount.objects.create(household=self.household, name="XP")
+        InvestmentSnapshot.objects.create(
+            household=self.household, account=investment, year=2024, month=1, balance=Decimal("500.00")
+        )
+        card = Card.objects.create(household=self.household, name="Visa", closing_day=25, due_day=5)
+        group = CardPurchaseGroup.objects.create(
+            household=self.household,
+            card=card,
+            description="Notebook",
+            total_amount=Decimal("300.00"),
+            installments_count=3,
+            purchase_date=date(2024, 1, 20),
+            first_due_date=date(2024, 2, 5),
+        )
+        generate_installments_for_group(group)
+
+        series = build_net_worth_series(self.household, date(2024, 1, 1), date(2024, 4, 1))
+
+        # Parcelas vencidas já estão no razão; as futuras entram como passivo.
+        self.assertEqual(series.cash, [Decimal("1000.00"), Decimal("700.00"), Decimal("600.00"), Decimal("500.00")])
+        self.assertEqual(series.investments, [Decimal("500.00")] * 4)
+        self.assertEqual(
+            series.liabilities, [Decimal("300.00"), Decimal("200.00"), Decimal("100.00"), Decimal("0.00")]
+        )
+        self.assertEqual(
+            series.net_worth, [Decimal("1200.00"), Decimal("1000.00"), Decimal("1000.00"), Decimal("1000.00")]
+        )
+        self.assertEqual(series.accounts[self.account.id][-1], Decimal("800.00"))
+
+    def test_page_and_json_endpoint(self):
+        self._entry(date(2024, 3, 1), LedgerEntry.Kind.INCOME, "50.00")
+        params = {"start": "2024-01", "end": "2024-03"}
+
+        response = self.client.get(reverse("finance:net-worth"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["latest"]["net_worth"], Decimal("50.00"))
+
+        response = self.client.get(reverse("finance:net-worth-data"), params)
+        self.assertEqual(response.json()["labels"], ["01/2024", "02/2024", "03/2024"])
+        self.assertEqual(response.json()["net_worth"], [0.0, 0.0, 50.0])
+
+    def test_cached_series_refreshes_after_entry_mutation(self):
+        params = {"start": "2024-01", "end": "2024-01"}
+        url = reverse("finance:net-worth-data")
+        self.assertEqual(self.client.get(url, params).json()["cash"], [0.0])
+
+        self.client.post(
+            reverse("finance:entry-create"),
+            {"date": "2024-01-10", "kind": LedgerEntry.Kind.INCOME, "amount": "70.00", "description": "Pix"},
+        )
+        self.assertEqual(self.client.get(url, params).json()["cash"], [70.0])
+
+    def test_cached_series_refreshes_after_regenerate_and_card_delete(self):
+        card = Card.objects.create(household=self.household, name="Visa", closing_day=25, due_day=5)
+        group = CardPurchaseGroup.objects.create(
+            household=self.household,
+            card=card,
+            description="Notebook",
+            total_amount=Decimal("300.00"),
+            installments_count=3,
+            purchase_date=date(2024, 1, 20),
+            first_due_date=date(2024, 2, 5),
+        )
+        generate_installments_for_group(group)
+        start, end = date(2024, 1, 1), date(2024, 1, 1)
+        self.assertEqual(net_worth_series(self.household, start, end).liabilities, [Decimal("300.00")])
+
+        CardPurchaseGroup.objects.filter(pk=group.pk).update(total_amount=Decimal("600.00"))
+        self.client.post(reverse("finance:purchase-regenerate", args=[group.pk]), {"from_date": "2024-01-01"})
+        self.assertEqual(net_worth_series(self.household, start, end).liabilities, [Decimal("600.00")])
+
+        self.client.post(reverse("finance:card-delete", args=[card.pk]))
+        self.assertEqual(net_worth_series(self.household, start, end).liabilities, [Decimal("0.00")])
@@ -0,0 +1,111 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Household, HouseholdMembership
+from finance.models import LedgerEntry, Receivable
+from finance.pagination import PAGE_SIZE, keyset_paginate
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
+        self.client.login(username="ana", password="pass1234")
+
+    def _entries(self, count, day=date(2024, 5, 1)):
+        return LedgerEntry.objects.bulk_create(
+            LedgerEntry(
+                household=self.household,
+                date=day.replace(day=1 + idx % 28),
+                kind=LedgerEntry.Kind.EXPENSE,
+                amount=Decimal("10.00"),
+                description=f"Gasto {idx}",
+            )
+            for idx in range(count)
+        )
+
+    def test_pages_cover_every_row_once_with_duplicate_keys(self):
+        self._entries(25)
+        queryset = LedgerEntry.objects.filter(household=self.household)
+
+        seen, cursor = [], None
+        while True:
+            page = keyset_paginate(queryset, ("-date", "-id"), cursor=cursor, page_size=4)
+            seen.extend(entry.id for entry in page.items)
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, list(queryset.order_by("-date", "-id").values_list("id", flat=True)))
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        self._entries(3)
+        page = keyset_paginate(
+            LedgerEntry.objects.filter(household=self.household), ("-date", "-id"), cursor="not-a-cursor"
+        )
+        self.assertEqual(len(page.items), 3)
+        self.assertIsNone(page.next_cursor)
+
+    def test_entry_list_scrolls_with_cursor(self):
+        self._entries(PAGE_SIZE + 5)
+        url = reverse("finance:entries")
+
+        response = self.client.get(url, {"year": 2024, "month": 5})
+        self.assertEqual(len(response.context["entries"]), PAGE_SIZE)
+        next_url = response.context["next_url"]
+        self.assertContains(response, 'hx-trigger="revealed"')
+
+        response = self.client.get(next_url, HTTP_HX_REQUEST="true")
+        self.assertTemplateUsed(response, "finance/partials/_entry_rows.html")
+        self.assertTemplateNotUsed(response, "finance/partials/_entry_table.html")
+        self.assertEqual(len(response.context["entries"]), 5)
+        self.assertIsNone(response.context["next_url"])
+
+    def test_mutations_return_single_row_swaps(self):
+        self._entries(PAGE_SIZE + 5)
+        entry = LedgerEntry.objects.filter(household=self.household).first()
+
+        response = self.client.post(reverse("finance:entry-delete", args=[entry.id]))
+        self.assertContains(response, f'id="entry-{entry.id}" hx-swap-oob="delete"')
+        self.assertNotContains(response, "Gasto")
+
+        response = self.client.post(
+            reverse("finance:entry-create"),
+            {
+                "date": "2024-05-10",
+                "kind": LedgerEntry.Kind.INCOME,
+                "amount": "99.00",
+                "description": "Salário",
+                "year": 2024,
+                "month": 5,
+            },
+        )
+        created = LedgerEntry.objects.get(description="Salário")
+        self.assertContains(response, 'hx-swap-oob="afterbegin:#entry-rows"')
+        self.assertContains(response, f'id="entry-{created.id}"')
+        self.assertNotContains(response, "Gasto")
+
+    def test_invalid_form_is_retargeted_to_modal(self):
+        response = self.client.post(reverse("finance:entry-create"), {"year": 2024, "month": 5})
+        self.assertEqual(response["HX-Retarget"], "#modal-root")
+        self.assertTemplateUsed(response, "finance/partials/_entry_form.html")
+
+    def test_receivable_leaves_filtered_list_when_status_changes(self):
+        receivable = Receivable.objects.create(
+            household=self.household,
+            expected_date=date(2024, 5, 1),
+            amount=Decimal("50.00"),
+            description="Reembolso",
+        )
+        response = self.client.post(
+            reverse("finance:receivable-cancel", args=[receivable.id]), {"status": "EXPECTED"}
+        )
+        self.assertContains(response, f'id="receivable-{receivable.id}" hx-swap-oob="delete"')
+
+        response = self.client.post(reverse("finance:receivable-receive", args=[receivable.id]))
+        self.assertContains(response, f'id="receivable-{receivable.id}" hx-swap-oob="true"')
@@ -0,0 +1,272 @@
+import re
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Household, HouseholdMembership, QuickExpense
+from finance.models import (
+    Card,
+    CardPurchaseGroup,
+    Installment,
+    LedgerEntry,
+    Receivable,
+    RecurringInstance,
+    RecurringRule,
+)
+
+# Household-scoped tables that must never be read with a full table scan.
+TRACKED_TABLES = {
+    Installment._meta.db_table,
+    LedgerEntry._meta.db_table,
+    Receivable._meta.db_table,
+    RecurringInstance._meta.db_table,
+}
+
+# Indexed date columns must be compared directly, never through EXTRACT/CAST/date helpers.
+INDEXED_DATE_COLUMNS = ("date", "due_date", "expected_date", "received_date", "received_at", "data")
+_WRAPPED_DATE_COLUMN = re.compile(
+    r"(?:django_date_extract|django_datetime_extract|django_datetime_cast_date|django_date_trunc"
+    r"|EXTRACT|strftime|DATE)\s*\([^()]*?\"(?:%s)\"" % "|".join(INDEXED_DATE_COLUMNS),
+    re.IGNORECASE,
+)
+_WHERE_CLAUSE = re.compile(r"\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)", re.DOTALL)
+
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_POSTGRES_FULL_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def _query_plan(sql, params=()):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == "postgresql":
+            # Small test tables make a sequential scan cheaper; we only care that an index is usable.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return [row[0] for row in cursor.fetchall()]
+    return []
+
+
+def _full_scans(plan):
+    pattern = _SQLITE_FULL_SCAN if connection.vendor == "sqlite" else _POSTGRES_FULL_SCAN
+    scans = set()
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match:
+            scans.add(match.group(1))
+    return scans
+
+
+def _wrapped_date_filters(sql):
+    return [
+        match.group(0)
+        for where in _WHERE_CLAUSE.findall(sql)
+        for match in _WRAPPED_DATE_COLUMN.finditer(where)
+    ]
+
+
+class QueryPlanTests(TestCase):
+    """Seeds a large dataset and checks view queries hit the access-path indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        cls.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=cls.user, household=cls.household, is_primary=True)
+        other_user = get_user_model().objects.create_user(username="bob", password="pass1234")
+        other = Household.objects.create(name="Outra", slug="outra")
+        HouseholdMembership.objects.create(user=other_user, household=other, is_primary=True)
+
+        start = date(2022, 1, 1)
+        for household, owner in ((cls.household, cls.user), (other, other_user)):
+            card = Card.objects.create(household=household, name="Visa")
+            if household == cls.household:
+                cls.card = card
+            groups = CardPurchaseGroup.objects.bulk_create(
+                CardPurchaseGroup(
+                    household=household,
+                    card=card,
+                    description=f"Compra {idx}",
+                    total_amount=Decimal("120.00"),
+                    installments_count=12,
+                    first_due_date=start + timedelta(days=idx * 3),
+                )
+                for idx in range(150)
+            )
+            Installment.objects.bulk_create(
+                Installment(
+                    household=household,
+                    group=group,
+                    number=number,
+                    due_date=group.first_due_date + timedelta(days=30 * (number - 1)),
+                    statement_year=(group.first_due_date + timedelta(days=30 * (number - 1))).year,
+                    statement_month=(group.first_due_date + timedelta(days=30 * (number - 1))).month,
+                    amount=Decimal("10.00"),
+                )
+                for group in groups
+                for number in range(1, 13)
+            )
+            LedgerEntry.objects.bulk_create(
+                LedgerEntry(
+                    household=household,
+                    date=start + timedelta(days=idx % 1000),
+                    kind=LedgerEntry.Kind.EXPENSE if idx % 3 else LedgerEntry.Kind.INCOME,
+                    amount=Decimal("15.00"),
+                    description=f"Lançamento {idx}",
+                )
+                for idx in range(3000)
+            )
+            Receivable.objects.bulk_create(
+                Receivable(
+                    household=household,
+                    expected_date=start + timedelta(days=idx),
+                    amount=Decimal("50.00"),
+                    description=f"Recebível {idx}",
+                )
+                for idx in range(500)
+            )
+            rules = RecurringRule.objects.bulk_create(
+                RecurringRule(
+                    household=household,
+                    description=f"Regra {idx}",
+                    amount=Decimal("99.00"),
+                    due_day=10,
+                    start_date=start,
+                )
+                for idx in range(20)
+            )
+            RecurringInstance.objects.bulk_create(
+                RecurringInstance(
+                    household=household,
+                    rule=rule,
+                    year=2022 + offset // 12,
+                    month=offset % 12 + 1,
+                    due_date=date(2022 + offset // 12, offset % 12 + 1, 10),
+                    amount=rule.amount,
+                )
+                for rule in rules
+                for offset in range(36)
+            )
+            QuickExpense.objects.bulk_create(
+                QuickExpense(user=owner, descricao=f"Gasto {idx}", valor=Decimal("5.00"))
+                for idx in range(500)
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        if connection.vendor not in {"sqlite", "postgresql"}:
+            self.skipTest("Query plan assertions only support SQLite and PostgreSQL.")
+        self.client.login(username="ana", password="pass1234")
+
+    def assertUsesIndex(self, queryset, index_name):
+        sql, params = queryset.query.sql_with_params()
+        plan = "\n".join(_query_plan(sql, params))
+        self.assertIn(index_name, plan, f"Expected {index_name} in plan:\n{plan}")
+
+    def assertNoFullScans(self, url, params=None):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        for query in captured.captured_queries:
+            sql = query["sql"]
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            scanned = _full_scans(_query_plan(sql)) & TRACKED_TABLES
+            self.assertFalse(scanned, f"Full scan of {scanned} for {url}:\n{sql}")
+
+    def test_installment_due_date_range_uses_household_due_index(self):
+        self.assertUsesIndex(
+            Installment.objects.filter(
+                household=self.household, due_date__range=(date(2023, 3, 1), date(2023, 3, 31))
+            ),
+            "installment_household_due_idx",
+        )
+
+    def test_installment_statement_lookup_uses_group_statement_index(self):
+        self.assertUsesIndex(
+            Installment.objects.filter(
+                household=self.household,
+                group__card=self.card,
+                statement_year=2023,
+                statement_month=3,
+            ),
+            "installment_group_stmt_idx",
+        )
+
+    def test_recurring_instances_use_household_month_index(self):
+        self.assertUsesIndex(
+            RecurringInstance.objects.filter(household=self.household, year=2023, month=3),
+            "recurring_household_ym_idx",
+        )
+
+    def test_quick_expenses_use_user_date_index(self):
+        self.assertUsesIndex(
+            QuickExpense.objects.filter(
+                user=self.user, data__gte=date(2023, 3, 1), data__lt=date(2023, 4, 1)
+            ),
+            "quickexpense_user_data_idx",
+        )
+
+    def test_views_do_not_full_scan_household_tables(self):
+        period = {"year": 2023, "month": 3}
+        self.assertNoFullScans(reverse("dashboard"), period)
+        self.assertNoFullScans(reverse("finance:payables"), period)
+        self.assertNoFullScans(reverse("finance:recurring-instances"), period)
+        self.assertNoFullScans(reverse("finance:card-statement", args=[self.card.id, 2023, 3]))
+        self.assertNoFullScans(reverse("finance:annual-stats"), {"year": 2023})
+
+
+@override_settings(TWILIO_ALLOWED_NUMBERS=["+5516999999999"])
+class SargableDateFilterTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=self.user, household=self.household, is_primary=True)
+        self.card = Card.objects.create(household=self.household, name="Visa")
+        self.client.login(username="ana", password="pass1234")
+
+    def assertSargable(self, method, url, params=None):
+        with CaptureQueriesContext(connection) as captured:
+            getattr(self.client, method)(url, params or {})
+        for query in captured.captured_queries:
+            wrapped = _wrapped_date_filters(query["sql"])
+            self.assertFalse(wrapped, f"{url} wraps a date column in a function: {wrapped}\n{query['sql']}")
+
+    def test_detector_flags_function_wrapped_columns(self):
+        queryset = LedgerEntry.objects.filter(household=self.household, date__month=5)
+        self.assertTrue(_wrapped_date_filters(str(queryset.query)))
+
+    def test_views_filter_dates_with_ranges(self):
+        period = {"year": 2024, "month": 5}
+        self.assertSargable("get", reverse("dashboard"), period)
+        self.assertSargable("get", reverse("finance:entries"), period)
+        self.assertSargable("get", reverse("finance:payables"), period)
+        self.assertSargable("get", reverse("finance:annual-stats"), {"year": 2024})
+        self.assertSargable("get", reverse("finance:card-statement", args=[self.card.id, 2024, 5]))
+
+    def test_bot_handlers_filter_dates_with_ranges(self):
+        url = reverse("twilio_webhook")
+        with self.settings(FINANCE_BOT_USER_ID=self.user.id):
+            for body in ("extrato atual", "extrato anterior", "excluir", "zerar"):
+                self.assertSargable("post", url, {"Body": body, "From": "whatsapp:+5516999999999"})
+
+    def test_received_date_follows_received_at(self):
+        receivable = Receivable.objects.create(
+            household=self.household,
+            expected_date=date(2024, 5, 1),
+            amount=Decimal("10.00"),
+            description="Reembolso",
+        )
+        receivable.received_at = timezone.make_aware(timezone.datetime(2024, 5, 6, 23, 30))
+        receivable.save(update_fields=["received_at"])
+        receivable.refresh_from_db()
+        self.assertEqual(receivable.received_date, date(2024, 5, 6))
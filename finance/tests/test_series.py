@@ -0,0 +1,85 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from core.models import Household
+from finance.models import Category, LedgerEntry
+from finance.services_series import daily_series, monthly_cash_flow
+
+
+class SeriesServiceTests(TestCase):
+    def setUp(self):
+        self.household = Household.objects.create(name="Casa", slug="casa")
+        self.category = Category.objects.create(household=self.household, name="Mercado")
+
+    def _entry(self, day, kind, amount, category=None):
+        return LedgerEntry.objects.create(
+            household=self.household,
+            date=day,
+            kind=kind,
+            amount=Decimal(amount),
+            description="Teste",
+            category=category,
+        )
+
+    def test_daily_series_is_decimal_accurate_and_carries_forward(self):
+        self._entry(date(2024, 5, 1), LedgerEntry.Kind.EXPENSE, "0.10")
+        self._entry(date(2024, 5, 1), LedgerEntry.Kind.EXPENSE, "0.20")
+        self._entry(date(2024, 5, 3), LedgerEntry.Kind.EXPENSE, "10.01")
+        self._entry(date(2024, 5, 2), LedgerEntry.Kind.INCOME, "999.00")
+
+        series = daily_series(
+            self.household, date(2024, 5, 1), date(2024, 5, 4), kind=LedgerEntry.Kind.EXPENSE
+        )
+
+        self.assertEqual(len(series.days), 4)
+        self.assertEqual(
+            series.daily,
+            [Decimal("0.30"), Decimal("0.00"), Decimal("10.01"), Decimal("0.00")],
+        )
+        self.assertEqual(
+            series.cumulative,
+            [Decimal("0.30"), Decimal("0.30"), Decimal("10.31"), Decimal("10.31")],
+        )
+        self.assertEqual(series.total, Decimal("10.31"))
+
+    def test_daily_series_filters_by_category(self):
+        self._entry(date(2024, 5, 1), LedgerEntry.Kind.EXPENSE, "5.00", category=self.category)
+        self._entry(date(2024, 5, 1), LedgerEntry.Kind.EXPENSE, "7.00")
+
+        series = daily_series(
+            self.household,
+            date(2024, 5, 1),
+            date(2024, 5, 1),
+            kind=LedgerEntry.Kind.EXPENSE,
+            categories=[self.category],
+        )
+
+        self.assertEqual(series.cumulative, [Decimal("5.00")])
+
+    def test_monthly_cash_flow_spans_years(self):
+        self._entry(date(2023, 12, 5), LedgerEntry.Kind.INCOME, "100.00")
+        self._entry(date(2023, 12, 9), LedgerEntry.Kind.EXPENSE, "30.00")
+        self._entry(date(2024, 2, 1), LedgerEntry.Kind.EXPENSE, "20.00")
+
+        series = monthly_cash_flow(self.household, date(2023, 12, 1), date(2024, 2, 29))
+
+        self.assertEqual(series.months, [date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 1)])
+        self.assertEqual(series.income, [Decimal("100.00"), Decimal("0.00"), Decimal("0.00")])
+        self.assertEqual(series.expense, [Decimal("30.00"), Decimal("0.00"), Decimal("20.00")])
+        self.assertEqual(series.net, [Decimal("70.00"), Decimal("0.00"), Decimal("-20.00")])
+        self.assertEqual(series.balance, [Decimal("70.00"), Decimal("70.00"), Decimal("50.00")])
+
+    def test_monthly_cash_flow_balance_starts_from_earlier_entries(self):
+        self._entry(date(2023, 6, 1), LedgerEntry.Kind.INCOME, "500.00")
+        self._entry(date(2023, 11, 30), LedgerEntry.Kind.EXPENSE, "120.00", category=self.category)
+        self._entry(date(2024, 1, 10), LedgerEntry.Kind.EXPENSE, "30.00")
+
+        series = monthly_cash_flow(self.household, date(2023, 12, 1), date(2024, 1, 31))
+
+        self.assertEqual(series.net, [Decimal("0.00"), Decimal("-30.00")])
+        self.assertEqual(series.balance, [Decimal("380.00"), Decimal("350.00")])
+
+        filtered = monthly_cash_flow(self.household, date(2023, 12, 1), date(2024, 1, 31), categories=[self.category])
+        self.assertEqual(filtered.balance, [Decimal("-120.00"), Decimal("-120.00")])
@@ -0,0 +1,317 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+
+from core.models import Household, HouseholdMembership, SystemLog
+from finance.models import (
+    Account,
+    Card,
+    CardPurchaseGroup,
+    Category,
+    ImportBatch,
+    ImportItem,
+    Installment,
+    InvestmentAccount,
+    InvestmentSnapshot,
+    LedgerEntry,
+    Receivable,
+    RecurringInstance,
+    RecurringRule,
+)
+from finance.services import rebuild_account_balances, sync_card_statements
+
+# Views left out of the budget run, with the reason.
+EXCLUDED_VIEWS = {
+    "login": "anonymous page, no household data",
+    "logout": "ends the session used by the other cases",
+    "twilio_webhook": "covered by the webhook tests; needs a signed Twilio payload",
+}
+
+# Same bound for every view: with the seeded volume, any per-row query in a list,
+# formset or summary overshoots it by an order of magnitude.
+QUERY_BUDGET = 20
+TIME_BUDGET_SECONDS = 2.0
+
+
+class ViewBudgetTests(TestCase):
+    """
+    Seeds a household with years of history and checks every view stays within a
+    fixed query and wall-time budget, so per-row queries fail here instead of in production.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="ana", password="pass1234")
+        cls.household = h = Household.objects.create(name="Casa", slug="casa")
+        HouseholdMembership.objects.create(user=cls.user, household=h, is_primary=True)
+        start = date(2022, 1, 1)
+
+        categories = Category.objects.bulk_create(Category(household=h, name=f"Categoria {idx}") for idx in range(15))
+        accounts = Account.objects.bulk_create(Account(household=h, name=f"Conta {idx}") for idx in range(24))
+        cls.category, cls.account = categories[0], accounts[0]
+        entries = LedgerEntry.objects.bulk_create(
+            LedgerEntry(
+                household=h,
+                date=start + timedelta(days=idx % 1095),
+                kind=LedgerEntry.Kind.EXPENSE if idx % 4 else LedgerEntry.Kind.INCOME,
+                amount=Decimal("25.00"),
+                description=f"Lançamento {idx}",
+                category=categories[idx % len(categories)],
+                account=accounts[idx % len(accounts)],
+            )
+            for idx in range(4000)
+        )
+        cls.entry = entries[-1]
+        rebuild_account_balances(h)
+
+        receivables = Receivable.objects.bulk_create(
+            Receivable(
+                household=h,
+                expected_date=start + timedelta(days=idx * 2),
+                amount=Decimal("80.00"),
+                description=f"Recebível {idx}",
+            )
+            for idx in range(500)
+        )
+        cls.receivable = receivables[-1]
+
+        cards = Card.objects.bulk_create(
+            Card(household=h, name=f"Cartão {idx}", closing_day=25, due_day=5) for idx in range(4)
+        )
+        cls.card = cards[0]
+        groups = CardPurchaseGroup.objects.bulk_create(
+            CardPurchaseGroup(
+                household=h,
+                card=cards[idx % len(cards)],
+                description=f"Compra {idx}",
+                total_amount=Decimal("120.00"),
+                installments_count=12,
+                purchase_date=start + timedelta(days=idx * 3),
+                first_due_date=start + timedelta(days=idx * 3 + 20),
+                category=categories[idx % len(categories)],
+            )
+            for idx in range(300)
+        )
+        cls.group = groups[-1]
+        installments = []
+        for group in groups:
+            for number in range(1, 13):
+                due = group.first_due_date + timedelta(days=30 * (number - 1))
+                installments.append(
+                    Installment(
+                        household=h,
+                        group=group,
+                        number=number,
+                        due_date=due,
+                        statement_year=due.year,
+                        statement_month=due.month,
+                        amount=Decimal("10.00"),
+                    )
+                )
+        Installment.objects.bulk_create(installments)
+        for card in cards:
+            sync_card_statements(card)
+
+        rules = RecurringRule.objects.bulk_create(
+            RecurringRule(
+                household=h,
+                description=f"Regra {idx}",
+                amount=Decimal("99.00"),
+                due_day=10,
+                start_date=start,
+                category=categories[idx % len(categories)],
+            )
+            for idx in range(40)
+        )
+        cls.rule = rules[0]
+        instances = RecurringInstance.objects.bulk_create(
+            RecurringInstance(
+                household=h,
+                rule=rule,
+                year=2022 + offset // 12,
+                month=offset % 12 + 1,
+                due_date=date(2022 + offset // 12, offset % 12 + 1, 10),
+                amount=rule.amount,
+            )
+            for rule in rules
+            for offset in range(36)
+        )
+        cls.instance = instances[-1]
+
+        investment_accounts = InvestmentAccount.objects.bulk_create(
+            InvestmentAccount(household=h, name=f"Investimento {idx}", created_by=cls.user) for idx in range(20)
+        )
+        cls.investment_account = investment_accounts[0]
+        snapshots = InvestmentSnapshot.objects.bulk_create(
+            InvestmentSnapshot(
+                household=h,
+                account=account,
+                year=2022 + offset // 12,
+                month=offset % 12 + 1,
+                balance=Decimal("1000.00") + offset,
+            )
+            for account in investment_accounts
+            for offset in range(36)
+        )
+        cls.snapshot = snapshots[-1]
+
+        cls.batch = ImportBatch.objects.create(
+            household=h,
+            created_by=cls.user,
+            card=cls.card,
+            statement_year=2024,
+            statement_month=3,
+            source_text="seed",
+        )
+        ImportItem.objects.bulk_create(
+            ImportItem(
+                batch=cls.batch,
+                purchase_date=date(2024, 2, 1) + timedelta(days=idx % 28),
+                statement_year=2024,
+                statement_month=3,
+                description=f"Item {idx}",
+                amount=Decimal("30.00"),
+                installments_total=1 + idx % 6,
+                installments_current=1,
+            )
+            for idx in range(80)
+        )
+
+        cls.log = SystemLog.objects.create(
+            level=SystemLog.LEVEL_ERROR, source=SystemLog.SOURCE_BACKEND, message="Erro"
+        )
+        SystemLog.objects.bulk_create(
+            SystemLog(level=SystemLog.LEVEL_INFO, source=SystemLog.SOURCE_FRONTEND, message=f"Log {idx}")
+            for idx in range(300)
+        )
+
+    def setUp(self):
+        self.client.login(username="ana", password="pass1234")
+
+    def _cases(self):
+        period = {"year": 2023, "month": 6}
+        return {
+            # core
+            "dashboard": ("get", [], period),
+            "household-missing": ("get", [], {}),
+            "settings": ("get", [], {}),
+            "metrics": ("get", [], {}),
+            "system-logs": ("get", [], {}),
+            "system-log-resolve": ("post", [self.log.id], {}),
+            "system-log-delete": ("post", [self.log.id], {}),
+            "system-log-details": ("get", [self.log.id], {}),
+            "log-error": ("post", [], {"message": "Falha"}),
+            "system-logs-api": ("get", [], {}),
+            "system-log-detail-api": ("delete", [self.log.id], {}),
+            "system-logs-pending-count": ("get", [], {}),
+            # finance
+            "finance:cards": ("get", [], {}),
+            "finance:card-create": ("get", [], {}),
+            "finance:card-edit": ("get", [self.card.id], {}),
+            "finance:card-delete": ("post", [self.card.id], {}),
+            "finance:card-statement": ("get", [self.card.id, 2023, 6], {}),
+            "finance:purchases": ("get", [], period),
+            "finance:purchase-create": ("get", [], {}),
+            "finance:purchase-detail": ("get", [self.group.id], {}),
+            "finance:purchase-delete": ("post", [self.group.id], {}),
+            "finance:purchase-regenerate": ("post", [self.group.id], {}),
+            "finance:payables": ("get", [], period),
+            "finance:payables-generate": ("post", [], {"months_ahead": 3}),
+            "finance:payables-recurring-pay": ("post", [self.instance.id], {}),
+            "finance:recurring": ("get", [], {}),
+            "finance:recurring-create": ("get", [], {}),
+            "finance:recurring-edit": ("get", [self.rule.id], {}),
+            "finance:recurring-delete": ("post", [self.rule.id], {}),
+            "finance:recurring-generate": ("post", [self.rule.id], {"months_ahead": 3}),
+            "finance:recurring-instances": ("get", [], period),
+            "finance:recurring-instance-pay": ("post", [self.instance.id], {}),
+            "finance:recurring-instance-value": ("get", [self.instance.id], {}),
+            "finance:import-start": ("get", [], {}),
+            "finance:import-parse": (
+                "post",
+                [],
+                {
+                    "source_text": "10/02 MERCADO 50,00",
+                    "card": self.card.id,
+                    "statement_year": 2024,
+                    "statement_month": 3,
+                },
+            ),
+            "finance:import-review": ("get", [self.batch.id], {}),
+            "finance:import-confirm": ("post", [self.batch.id], {}),
+            "finance:import-cancel": ("post", [self.batch.id], {}),
+            "finance:investments": ("get", [], {"year": 2023}),
+            "finance:investments-summary": ("get", [], {"year": 2023}),
+            "finance:investment-account-create": ("get", [], {}),
+            "finance:investment-account-edit": ("get", [self.investment_account.id], {}),
+            "finance:investment-account-delete": ("post", [self.investment_account.id], {}),
+            "finance:investment-snapshot-create": ("get", [], {}),
+            "finance:investment-snapshot-grid": ("get", [], {"year": 2023}),
+            "finance:investment-snapshot-edit": ("get", [self.snapshot.id], {}),
+            "finance:investment-snapshot-delete": ("post", [self.snapshot.id], {}),
+            "finance:annual-stats": ("get", [], {"year": 2023}),
+            "finance:annual-stats-summary": ("get", [], {"year": 2023}),
+            "finance:net-worth": ("get", [], {"start": "2022-01", "end": "2024-12"}),
+            "finance:net-worth-data": ("get", [], {"start": "2022-01", "end": "2024-12"}),
+            "finance:categories": ("get", [], {}),
+            "finance:category-create": ("get", [], {}),
+            "finance:category-edit": ("get", [self.category.id], {}),
+            "finance:category-delete": ("post", [self.category.id], {}),
+            "finance:accounts": ("get", [], {}),
+            "finance:account-create": ("get", [], {}),
+            "finance:account-edit": ("get", [self.account.id], {}),
+            "finance:account-delete": ("post", [self.account.id], {}),
+            "finance:entries": ("get", [], period),
+            "finance:entry-create": ("get", [], {}),
+            "finance:entry-edit": ("get", [self.entry.id], {}),
+            "finance:entry-delete": ("post", [self.entry.id], {}),
+            "finance:receivables": ("get", [], {}),
+            "finance:receivable-create": ("get", [], {}),
+            "finance:receivable-edit": ("get", [self.receivable.id], {}),
+            "finance:receivable-delete": ("post", [self.receivable.id], {}),
+            "finance:receivable-receive": ("post", [self.receivable.id], {}),
+            "finance:receivable-cancel": ("post", [self.receivable.id], {}),
+        }
+
+    def _measure(self, method, url, data):
+        # Cold caches so the budget covers the worst case; each request is rolled
+        # back so mutations (deletes, payments) don't leak into the next case.
+        cache.clear()
+        savepoint = transaction.savepoint()
+        try:
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                if method == "get":
+                    response = self.client.get(url, data)
+                else:
+                    response = getattr(self.client, method)(url, data)
+            elapsed = time.perf_counter() - started
+        finally:
+            transaction.savepoint_rollback(savepoint)
+        return response, len(queries), elapsed
+
+    def test_every_view_has_a_budget_case(self):
+        def names(patterns, namespace=None):
+            for pattern in patterns:
+                if hasattr(pattern, "url_patterns"):
+                    yield from names(pattern.url_patterns, pattern.namespace or namespace)
+                elif pattern.name:
+                    yield f"{namespace}:{pattern.name}" if namespace else pattern.name
+
+        routed = {name for name in names(get_resolver().url_patterns) if not name.startswith("admin:")}
+        self.assertEqual(routed - set(self._cases()) - set(EXCLUDED_VIEWS), set())
+
+    def test_views_stay_within_query_and_time_budgets(self):
+        for name, (method, args, data) in self._cases().items():
+            with self.subTest(view=name):
+                response, queries, elapsed = self._measure(method, reverse(name, args=args), data)
+                self.assertLess(response.status_code, 400, name)
+                self.assertLessEqual(queries, QUERY_BUDGET, f"{name}: {queries} queries")
+                self.assertLessEqual(elapsed, TIME_BUDGET_SECONDS, f"{name}: {elapsed:.2f}s")
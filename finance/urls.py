@@ -41,6 +41,7 @@ urlpatterns = [
     path("investments/accounts/<int:pk>/edit/", views.investment_account_edit, name="investment-account-edit"),
     path("investments/accounts/<int:pk>/delete/", views.investment_account_delete, name="investment-account-delete"),
     path("investments/snapshots/new/", views.investment_snapshot_create, name="investment-snapshot-create"),
+    path("investments/snapshots/grid/", views.investment_snapshot_grid, name="investment-snapshot-grid"),
     path(
         "investments/snapshots/<int:pk>/edit/",
         views.investment_snapshot_edit,
@@ -53,6 +54,8 @@ urlpatterns = [
     ),
     path("stats/annual/", views.annual_stats, name="annual-stats"),
     path("stats/annual/summary/", views.annual_stats_summary, name="annual-stats-summary"),
+    path("stats/net-worth/", views.net_worth, name="net-worth"),
+    path("stats/net-worth/data/", views.net_worth_data, name="net-worth-data"),
     path("categories/", views.category_list, name="categories"),
     path("categories/new/", views.category_create, name="category-create"),
     path("categories/<int:pk>/edit/", views.category_edit, name="category-edit"),
@@ -1,20 +1,24 @@
 from calendar import monthrange
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
+import time
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import models, transaction
-from django.db.models import Sum, Q
+from django.db.models import OuterRef, Q, Subquery, Sum
 from django.db.models.functions import Coalesce
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 
-from .billing import get_due_date, get_statement_window, get_first_installment_due_date
+from core.metrics import IMPORT_DURATION, IMPORT_ITEMS
+
+from .billing import get_due_date, get_statement_window, get_first_installment_due_date, month_bounds
+from .pagination import keyset_paginate
 from .statement_importer import parse_statement_text
 from .forms import (
     AccountForm,
@@ -26,14 +30,17 @@ from .forms import (
     LedgerEntryForm,
     InvestmentAccountForm,
     InvestmentSnapshotForm,
+    InvestmentSnapshotGridCellForm,
     ReceivableForm,
     RecurringInstanceValueOverrideForm,
     RecurringRuleForm,
 )
 from .models import (
     Account,
+    AccountBalance,
     Card,
     CardPurchaseGroup,
+    CardStatement,
     Category,
     ImportBatch,
     ImportItem,
@@ -46,21 +53,28 @@ from .models import (
     RecurringRule,
 )
 from .services import (
+    delete_purchase_group,
     generate_installments_for_group,
     generate_installments_from_statement,
     generate_future_installments_from_group,
     generate_recurring_instances,
+    generate_recurring_instances_for_rules,
     installment_plan,
     pay_recurring_instance,
     regenerate_future_installments,
     build_import_items,
+    add_months,
+    sync_card_statements,
 )
+from .services_networth import invalidate_net_worth, net_worth_series
+from .services_series import daily_series, monthly_cash_flow
 from .utils import build_installment_logical_key
 from .services_investments import (
-    compute_account_series,
-    compute_mom_deltas,
-    compute_monthly_totals,
-    get_investment_snapshots,
+    invalidate_investment_series,
+    investment_series,
+    load_investment_data,
+    percent_change,
+    upsert_investment_snapshots,
 )
 
 import json
@@ -94,6 +108,45 @@ def _render_partial(request, template, context, trigger=None):
     return response
 
 
+def _render_form(request, template, context):
+    response = render(request, template, context)
+    if request.method == "POST":
+        # Formulários de lista postam com hx-swap="none"; erros voltam para o modal.
+        response["HX-Retarget"] = "#modal-root"
+        response["HX-Reswap"] = "innerHTML"
+    return response
+
+
+def _render_row(request, row_template, context, insert_into=None, trigger=None):
+    """Devolve só a linha criada/alterada como swap out-of-band (mais as mensagens)."""
+    context = {**context, "row_template": row_template, "insert_into": insert_into}
+    return _render_partial(request, "finance/partials/_oob_rows.html", context, trigger=trigger)
+
+
+def _render_row_removal(request, row_id, trigger=None):
+    return _render_partial(
+        request, "finance/partials/_oob_rows.html", {"delete_row": row_id}, trigger=trigger
+    )
+
+
+def _paginated_list(request, queryset, ordering, template, rows_template, context, name):
+    """
+    Lista paginada por cursor: a página inicial renderiza a tabela; pedidos com
+    `cursor` (scroll infinito) devolvem só as próximas linhas.
+    """
+    cursor = request.GET.get("cursor")
+    page = keyset_paginate(queryset, ordering, cursor=cursor)
+    next_url = None
+    if page.next_cursor:
+        params = request.GET.copy()
+        params["cursor"] = page.next_cursor
+        next_url = f"{request.path}?{params.urlencode()}"
+    context = {**context, name: page.items, "next_url": next_url}
+    if cursor:
+        return render(request, rows_template, context)
+    return render(request, template, context)
+
+
 @login_required
 def dashboard(request):
     today = timezone.localdate()
@@ -127,7 +180,7 @@ def dashboard(request):
     receivables_received = Receivable.objects.filter(
         household=request.household,
         status=Receivable.Status.RECEIVED,
-        received_at__date__range=(month_start, month_end),
+        received_date__range=(month_start, month_end),
     )
     received_total = receivables_received.aggregate(
         total=Coalesce(Sum("amount"), Decimal("0.00"), output_field=decimal_output)
@@ -135,7 +188,7 @@ def dashboard(request):
 
     receivables_for_month = Receivable.objects.filter(household=request.household).filter(
         models.Q(expected_date__range=(month_start, month_end))
-        | models.Q(received_at__date__range=(month_start, month_end))
+        | models.Q(received_date__range=(month_start, month_end))
     )
 
     entries_for_month = entries.order_by("-date", "-id")
@@ -149,7 +202,10 @@ def dashboard(request):
     expenses_breakdown = _category_breakdown(entries.filter(kind=LedgerEntry.Kind.EXPENSE), total_expense)
     income_breakdown = _category_breakdown(entries.filter(kind=LedgerEntry.Kind.INCOME), total_income)
 
-    line_labels, line_values = _daily_cumulative(entries.filter(kind=LedgerEntry.Kind.EXPENSE), month_start)
+    expense_series = daily_series(
+        request.household, month_start, month_end, kind=LedgerEntry.Kind.EXPENSE
+    )
+    cash_flow = monthly_cash_flow(request.household, add_months(month_start, -11), month_end)
 
     expense_chart = _donut_data(expenses_breakdown)
     income_chart = _donut_data(income_breakdown)
@@ -170,7 +226,11 @@ def dashboard(request):
         "received_total": received_total,
         "expenses_breakdown": expenses_breakdown,
         "income_breakdown": income_breakdown,
-        "line_chart": {"labels": line_labels, "data": line_values},
+        "line_chart": {
+            "labels": [str(day.day) for day in expense_series.days],
+            "data": [float(value) for value in expense_series.cumulative],
+        },
+        "cash_flow_chart": _cash_flow_chart(cash_flow),
         "expense_chart": expense_chart,
         "income_chart": income_chart,
         "month_names": _month_names(),
@@ -264,26 +324,14 @@ def _payables_context(request, year, month):
     }
 
 
-def _daily_cumulative(queryset, month_start):
-    days_in_month = monthrange(month_start.year, month_start.month)[1]
-    daily = [0] * days_in_month
-    for row in queryset.values("date").annotate(
-        total=Coalesce(
-            Sum("amount"),
-            Decimal("0.00"),
-            output_field=models.DecimalField(max_digits=12, decimal_places=2),
-        )
-    ):
-        day_index = row["date"].day - 1
-        if 0 <= day_index < days_in_month:
-            daily[day_index] = float(row["total"])
-    cumulative = []
-    running = 0
-    for value in daily:
-        running += value
-        cumulative.append(running)
-    labels = [str(day) for day in range(1, days_in_month + 1)]
-    return labels, cumulative
+def _cash_flow_chart(series):
+    month_names = _month_names()
+    return {
+        "labels": [f"{month_names[month.month - 1][:3]}/{month.year}" for month in series.months],
+        "income": [float(value) for value in series.income],
+        "expense": [float(value) for value in series.expense],
+        "balance": [float(value) for value in series.balance],
+    }
 
 
 def _donut_data(breakdown, limit=6):
@@ -371,10 +419,44 @@ def category_delete(request, pk):
     )
 
 
+ACCOUNT_SPARKLINE_DAYS = 90
+
+
+def _sparkline_points(values, width=120, height=24):
+    if len(values) < 2:
+        return ""
+    low, high = min(values), max(values)
+    spread = (high - low) or 1
+    step = width / (len(values) - 1)
+    return " ".join(
+        f"{idx * step:.1f},{height - float((value - low) / spread) * height:.1f}"
+        for idx, value in enumerate(values)
+    )
+
+
+def _account_table_context(request):
+    today = timezone.localdate()
+    latest = AccountBalance.objects.filter(account=OuterRef("pk"), date__lte=today).order_by("-date")
+    accounts = list(
+        Account.objects.filter(household=request.household).annotate(
+            current_balance=Subquery(latest.values("balance")[:1])
+        )
+    )
+    recent = {}
+    for account_id, balance in AccountBalance.objects.filter(
+        household=request.household,
+        date__gt=today - timedelta(days=ACCOUNT_SPARKLINE_DAYS),
+        date__lte=today,
+    ).values_list("account_id", "balance"):
+        recent.setdefault(account_id, []).append(balance)
+    for account in accounts:
+        account.sparkline = _sparkline_points(recent.get(account.id, []))
+    return {"accounts": accounts, "sparkline_days": ACCOUNT_SPARKLINE_DAYS}
+
+
 @login_required
 def account_list(request):
-    accounts = Account.objects.filter(household=request.household)
-    context = {"accounts": accounts}
+    context = _account_table_context(request)
     if _is_htmx(request):
         return render(request, "finance/partials/_account_table.html", context)
     return render(request, "finance/accounts_list.html", context)
@@ -391,11 +473,10 @@ def account_create(request):
             account.created_by = request.user
             account.save()
             messages.success(request, "Conta criada com sucesso.")
-            accounts = Account.objects.filter(household=request.household)
             return _render_partial(
                 request,
                 "finance/partials/_account_table.html",
-                {"accounts": accounts},
+                _account_table_context(request),
                 trigger="closeModal",
             )
     else:
@@ -412,11 +493,10 @@ def account_edit(request, pk):
         if form.is_valid():
             form.save()
             messages.success(request, "Conta atualizada.")
-            accounts = Account.objects.filter(household=request.household)
             return _render_partial(
                 request,
                 "finance/partials/_account_table.html",
-                {"accounts": accounts},
+                _account_table_context(request),
                 trigger="closeModal",
             )
     else:
@@ -434,9 +514,8 @@ def account_delete(request, pk):
     account = get_object_or_404(Account, pk=pk, household=request.household)
     account.delete()
     messages.success(request, "Conta removida.")
-    accounts = Account.objects.filter(household=request.household)
     return _render_partial(
-        request, "finance/partials/_account_table.html", {"accounts": accounts}
+        request, "finance/partials/_account_table.html", _account_table_context(request)
     )
 
 
@@ -448,17 +527,28 @@ def _entry_period(request):
     return year, month
 
 
+def _entries_for_month(request, year, month):
+    month_start, next_month = month_bounds(year, month)
+    return LedgerEntry.objects.filter(
+        household=request.household,
+        date__gte=month_start,
+        date__lt=next_month,
+    )
+
+
 def entry_list(request):
     year, month = _entry_period(request)
-    entries = LedgerEntry.objects.filter(
-        household=request.household,
-        date__year=year,
-        date__month=month,
+    entries = _entries_for_month(request, year, month).select_related("category", "account")
+    template = "finance/partials/_entry_table.html" if _is_htmx(request) else "finance/entries_list.html"
+    return _paginated_list(
+        request,
+        entries,
+        ("-date", "-id"),
+        template,
+        "finance/partials/_entry_rows.html",
+        {"year": year, "month": month},
+        name="entries",
     )
-    context = {"entries": entries, "year": year, "month": month}
-    if _is_htmx(request):
-        return render(request, "finance/partials/_entry_table.html", context)
-    return render(request, "finance/entries_list.html", context)
 
 
 @login_required
@@ -472,21 +562,18 @@ def entry_create(request):
             entry.household = request.household
             entry.created_by = request.user
             entry.save()
+            invalidate_net_worth(request.household)
             messages.success(request, "Lançamento criado.")
-            entries = LedgerEntry.objects.filter(
-                household=request.household,
-                date__year=year,
-                date__month=month,
-            )
-            return _render_partial(
+            return _render_row(
                 request,
-                "finance/partials/_entry_table.html",
-                {"entries": entries, "year": year, "month": month},
+                "finance/partials/_entry_row.html",
+                {"entry": entry, "year": year, "month": month},
+                insert_into="entry-rows",
                 trigger={"closeModal": True, "dashboard:refresh": True},
             )
     else:
         form = LedgerEntryForm(household=request.household)
-    return render(
+    return _render_form(
         request,
         "finance/partials/_entry_form.html",
         {"form": form, "year": year, "month": month},
@@ -502,21 +589,17 @@ def entry_edit(request, pk):
         form = LedgerEntryForm(request.POST, instance=entry, household=request.household)
         if form.is_valid():
             form.save()
+            invalidate_net_worth(request.household)
             messages.success(request, "Lançamento atualizado.")
-            entries = LedgerEntry.objects.filter(
-                household=request.household,
-                date__year=year,
-                date__month=month,
-            )
-            return _render_partial(
+            return _render_row(
                 request,
-                "finance/partials/_entry_table.html",
-                {"entries": entries, "year": year, "month": month},
+                "finance/partials/_entry_row.html",
+                {"entry": entry, "year": year, "month": month},
                 trigger={"closeModal": True, "dashboard:refresh": True},
             )
     else:
         form = LedgerEntryForm(instance=entry, household=request.household)
-    return render(
+    return _render_form(
         request,
         "finance/partials/_entry_form.html",
         {"form": form, "entry": entry, "year": year, "month": month},
@@ -527,32 +610,30 @@ def entry_edit(request, pk):
 @require_http_methods(["POST"])
 def entry_delete(request, pk):
     entry = get_object_or_404(LedgerEntry, pk=pk, household=request.household)
-    year, month = _entry_period(request)
     entry.delete()
+    invalidate_net_worth(request.household)
     messages.success(request, "Lançamento removido.")
-    entries = LedgerEntry.objects.filter(
-        household=request.household,
-        date__year=year,
-        date__month=month,
-    )
-    return _render_partial(
-        request,
-        "finance/partials/_entry_table.html",
-        {"entries": entries, "year": year, "month": month},
-        trigger={"dashboard:refresh": True},
-    )
+    return _render_row_removal(request, f"entry-{pk}", trigger={"dashboard:refresh": True})
 
 
 @login_required
 def receivable_list(request):
     status = request.GET.get("status", "all")
-    receivables = Receivable.objects.filter(household=request.household)
+    receivables = Receivable.objects.filter(household=request.household).select_related("category")
     if status != "all":
         receivables = receivables.filter(status=status)
-    context = {"receivables": receivables, "status": status}
-    if _is_htmx(request):
-        return render(request, "finance/partials/_receivable_table.html", context)
-    return render(request, "finance/receivables_list.html", context)
+    template = (
+        "finance/partials/_receivable_table.html" if _is_htmx(request) else "finance/receivables_list.html"
+    )
+    return _paginated_list(
+        request,
+        receivables,
+        ("-expected_date", "-id"),
+        template,
+        "finance/partials/_receivable_rows.html",
+        {"status": status},
+        name="receivables",
+    )
 
 
 @login_required
@@ -566,16 +647,16 @@ def receivable_create(request):
             receivable.created_by = request.user
             receivable.save()
             messages.success(request, "Recebível criado.")
-            receivables = Receivable.objects.filter(household=request.household)
-            return _render_partial(
+            return _render_row(
                 request,
-                "finance/partials/_receivable_table.html",
-                {"receivables": receivables, "status": "all"},
+                "finance/partials/_receivable_row.html",
+                {"receivable": receivable},
+                insert_into="receivable-rows",
                 trigger={"closeModal": True, "dashboard:refresh": True},
             )
     else:
         form = ReceivableForm(household=request.household)
-    return render(request, "finance/partials/_receivable_form.html", {"form": form})
+    return _render_form(request, "finance/partials/_receivable_form.html", {"form": form})
 
 
 @login_required
@@ -587,16 +668,15 @@ def receivable_edit(request, pk):
         if form.is_valid():
             form.save()
             messages.success(request, "Recebível atualizado.")
-            receivables = Receivable.objects.filter(household=request.household)
-            return _render_partial(
+            return _render_row(
                 request,
-                "finance/partials/_receivable_table.html",
-                {"receivables": receivables, "status": "all"},
+                "finance/partials/_receivable_row.html",
+                {"receivable": receivable},
                 trigger={"closeModal": True, "dashboard:refresh": True},
             )
     else:
         form = ReceivableForm(instance=receivable, household=request.household)
-    return render(
+    return _render_form(
         request,
         "finance/partials/_receivable_form.html",
         {"form": form, "receivable": receivable},
@@ -606,17 +686,22 @@ def receivable_edit(request, pk):
 @login_required
 @require_http_methods(["POST"])
 def receivable_delete(request, pk):
-    status = request.POST.get("status", "all")
     receivable = get_object_or_404(Receivable, pk=pk, household=request.household)
     receivable.delete()
     messages.success(request, "Recebível removido.")
-    receivables = Receivable.objects.filter(household=request.household)
-    if status != "all":
-        receivables = receivables.filter(status=status)
-    return _render_partial(
+    return _render_row_removal(request, f"receivable-{pk}", trigger={"dashboard:refresh": True})
+
+
+def _receivable_status_row(request, receivable, status):
+    # A linha sai da lista quando o novo status não passa mais no filtro ativo.
+    if status != "all" and receivable.status != status:
+        return _render_row_removal(
+            request, f"receivable-{receivable.pk}", trigger={"dashboard:refresh": True}
+        )
+    return _render_row(
         request,
-        "finance/partials/_receivable_table.html",
-        {"receivables": receivables, "status": status},
+        "finance/partials/_receivable_row.html",
+        {"receivable": receivable},
         trigger={"dashboard:refresh": True},
     )
 
@@ -646,16 +731,9 @@ def receivable_receive(request, pk):
                 receivable.ledger_entry = entry
             receivable.save()
 
+    invalidate_net_worth(request.household)
     messages.success(request, "Recebível marcado como recebido.")
-    receivables = Receivable.objects.filter(household=request.household)
-    if status != "all":
-        receivables = receivables.filter(status=status)
-    return _render_partial(
-        request,
-        "finance/partials/_receivable_table.html",
-        {"receivables": receivables, "status": status},
-        trigger={"dashboard:refresh": True},
-    )
+    return _receivable_status_row(request, receivable, status)
 
 
 @login_required
@@ -667,31 +745,28 @@ def receivable_cancel(request, pk):
         receivable.status = Receivable.Status.CANCELED
         receivable.save(update_fields=["status"])
     messages.success(request, "Recebível cancelado.")
-    receivables = Receivable.objects.filter(household=request.household)
-    if status != "all":
-        receivables = receivables.filter(status=status)
-    return _render_partial(
-        request,
-        "finance/partials/_receivable_table.html",
-        {"receivables": receivables, "status": status},
-        trigger={"dashboard:refresh": True},
-    )
+    return _receivable_status_row(request, receivable, status)
+
+
+def _card_table_context(request):
+    today = timezone.localdate()
+    cards = list(Card.objects.filter(household=request.household))
+    open_statements = {}
+    for statement in CardStatement.objects.filter(
+        household=request.household, closing_date__gte=today
+    ).order_by("card_id", "closing_date"):
+        open_statements.setdefault(statement.card_id, statement)
+    for card in cards:
+        card.open_statement = open_statements.get(card.id)
+    return {"cards": cards, "today": today}
 
 
 @login_required
 def card_list(request):
-    cards = Card.objects.filter(household=request.household)
+    context = _card_table_context(request)
     if _is_htmx(request):
-        return render(
-            request,
-            "finance/partials/_card_table.html",
-            {"cards": cards, "today": timezone.localdate()},
-        )
-    return render(
-        request,
-        "finance/cards_list.html",
-        {"cards": cards, "today": timezone.localdate()},
-    )
+        return render(request, "finance/partials/_card_table.html", context)
+    return render(request, "finance/cards_list.html", context)
 
 
 @login_required
@@ -705,11 +780,10 @@ def card_create(request):
             card.created_by = request.user
             card.save()
             messages.success(request, "Cartão criado.")
-            cards = Card.objects.filter(household=request.household)
             return _render_partial(
                 request,
                 "finance/partials/_card_table.html",
-                {"cards": cards, "today": timezone.localdate()},
+                _card_table_context(request),
                 trigger={"closeModal": True},
             )
     else:
@@ -724,13 +798,14 @@ def card_edit(request, pk):
     if request.method == "POST":
         form = CardForm(request.POST, instance=card, household=request.household)
         if form.is_valid():
-            form.save()
+            card = form.save()
+            if "closing_day" in form.changed_data or "due_day" in form.changed_data:
+                sync_card_statements(card)
             messages.success(request, "Cartão atualizado.")
-            cards = Card.objects.filter(household=request.household)
             return _render_partial(
                 request,
                 "finance/partials/_card_table.html",
-                {"cards": cards, "today": timezone.localdate()},
+                _card_table_context(request),
                 trigger={"closeModal": True},
             )
     else:
@@ -743,12 +818,13 @@ def card_edit(request, pk):
 def card_delete(request, pk):
     card = get_object_or_404(Card, pk=pk, household=request.household)
     card.delete()
+    # As parcelas do cartão saem junto (cascade) e deixam de contar como passivo.
+    invalidate_net_worth(request.household)
     messages.success(request, "Cartão removido.")
-    cards = Card.objects.filter(household=request.household)
     return _render_partial(
         request,
         "finance/partials/_card_table.html",
-        {"cards": cards, "today": timezone.localdate()},
+        _card_table_context(request),
     )
 
 
@@ -759,36 +835,50 @@ def card_statement(request, pk, year, month):
         redirect_year = int(request.GET.get("year", year))
         redirect_month = int(request.GET.get("month", month))
         return redirect("finance:card-statement", pk=card.pk, year=redirect_year, month=redirect_month)
-    closing_date, period_start, period_end = get_statement_window(year, month, card.closing_day)
-    due_date = get_due_date(year, month, card.due_day)
+    _, period_start, period_end = get_statement_window(year, month, card.closing_day)
+    statement = CardStatement.objects.filter(card=card, year=year, month=month).first()
+    if statement is None:
+        statement = CardStatement(
+            household=request.household,
+            card=card,
+            year=year,
+            month=month,
+            closing_date=period_end,
+            due_date=get_due_date(year, month, card.due_day),
+            total=Decimal("0.00"),
+        )
     month_label = _month_names()[month - 1]
-    installments = Installment.objects.filter(
-        household=request.household,
-        group__card=card,
-    ).filter(
-        models.Q(statement_year=year, statement_month=month)
-        | models.Q(statement_year__isnull=True, due_date__year=year, due_date__month=month)
-    ).select_related("group")
-    decimal_output = models.DecimalField(max_digits=12, decimal_places=2)
-    total = installments.aggregate(
-        total=Coalesce(Sum("amount"), Decimal("0.00"), output_field=decimal_output)
-    )["total"]
-    by_category = (
-        installments.values("group__category__name")
-        .annotate(total=Coalesce(Sum("amount"), Decimal("0.00"), output_field=decimal_output))
-        .order_by("-total")
+    installments = list(
+        Installment.objects.filter(
+            household=request.household,
+            group__card=card,
+            statement_year=year,
+            statement_month=month,
+        )
+        .select_related("group", "group__category")
+        .order_by("number")
     )
+    category_totals = {}
+    for installment in installments:
+        category = installment.group.category
+        name = category.name if category else None
+        category_totals[name] = category_totals.get(name, Decimal("0.00")) + installment.amount
+    by_category = [
+        {"group__category__name": name, "total": total}
+        for name, total in sorted(category_totals.items(), key=lambda item: item[1], reverse=True)
+    ]
     context = {
         "card": card,
         "statement_year": year,
         "statement_month": month,
         "statement_month_label": month_label,
-        "closing_date": closing_date,
-        "due_date": due_date,
+        "statement": statement,
+        "closing_date": statement.closing_date,
+        "due_date": statement.due_date,
         "period_start": period_start,
         "period_end": period_end,
-        "installments": installments.order_by("number"),
-        "statement_total": total,
+        "installments": installments,
+        "statement_total": statement.total,
         "category_breakdown": by_category,
         "month_names": _month_names(),
         "year_options": _year_options(year),
@@ -799,7 +889,16 @@ def card_statement(request, pk, year, month):
 @login_required
 def purchase_list(request):
     groups = CardPurchaseGroup.objects.filter(household=request.household).select_related("card")
-    return render(request, "finance/purchases_list.html", {"groups": groups})
+    template = "finance/partials/_purchase_table.html" if _is_htmx(request) else "finance/purchases_list.html"
+    return _paginated_list(
+        request,
+        groups,
+        ("-first_due_date", "-id"),
+        template,
+        "finance/partials/_purchase_rows.html",
+        {},
+        name="groups",
+    )
 
 
 @login_required
@@ -813,17 +912,18 @@ def purchase_create(request):
             group.created_by = request.user
             group.save()
             generate_installments_for_group(group)
+            invalidate_net_worth(request.household)
             messages.success(request, "Compra parcelada criada.")
-            groups = CardPurchaseGroup.objects.filter(household=request.household)
-            return _render_partial(
+            return _render_row(
                 request,
-                "finance/partials/_purchase_table.html",
-                {"groups": groups},
+                "finance/partials/_purchase_row.html",
+                {"group": group},
+                insert_into="purchase-rows",
                 trigger={"closeModal": True, "dashboard:refresh": True},
             )
     else:
         form = CardPurchaseGroupForm(household=request.household)
-    return render(request, "finance/partials/_purchase_form.html", {"form": form})
+    return _render_form(request, "finance/partials/_purchase_form.html", {"form": form})
 
 
 @login_required
@@ -841,15 +941,10 @@ def purchase_detail(request, pk):
 @require_http_methods(["POST"])
 def purchase_delete(request, pk):
     group = get_object_or_404(CardPurchaseGroup, pk=pk, household=request.household)
-    group.delete()
+    delete_purchase_group(group)
+    invalidate_net_worth(request.household)
     messages.success(request, "Compra removida.")
-    groups = CardPurchaseGroup.objects.filter(household=request.household)
-    return _render_partial(
-        request,
-        "finance/partials/_purchase_table.html",
-        {"groups": groups},
-        trigger={"dashboard:refresh": True},
-    )
+    return _render_row_removal(request, f"purchase-{pk}", trigger={"dashboard:refresh": True})
 
 
 @login_required
@@ -859,6 +954,7 @@ def purchase_regenerate(request, pk):
     from_date = request.POST.get("from_date")
     from_date = date.fromisoformat(from_date) if from_date else timezone.localdate()
     regenerate_future_installments(group, from_date)
+    invalidate_net_worth(request.household)
     messages.success(request, "Parcelas futuras recriadas.")
     return redirect("finance:purchase-detail", pk=group.pk)
 
@@ -894,17 +990,9 @@ def payables_generate(request):
     print("household:", request.household.id)
 
     rules = RecurringRule.objects.filter(household=request.household, active=True)
-    print("active rules found:", rules.count())
+    created = generate_recurring_instances_for_rules(rules, months_ahead)
 
-    created_count = 0
-
-    for rule in rules:
-        print(f"\n[PAYABLES_GENERATE] rule {rule.id} - {rule.description}")
-        created = generate_recurring_instances(rule, months_ahead)
-        print(f"instances created for rule {rule.id}: {len(created)}")
-        created_count += len(created)
-
-    total_created = created_count
+    total_created = len(created)
     print("[PAYABLES_GENERATE] TOTAL CREATED:", total_created)
     messages.success(
         request,
@@ -925,6 +1013,7 @@ def payables_generate(request):
 def payables_recurring_pay(request, pk):
     instance = get_object_or_404(RecurringInstance, pk=pk, household=request.household)
     instance = pay_recurring_instance(instance)
+    invalidate_net_worth(request.household)
     messages.success(request, "Recorrência paga.")
     return _render_partial(
         request,
@@ -937,7 +1026,16 @@ def payables_recurring_pay(request, pk):
 @login_required
 def recurring_list(request):
     rules = RecurringRule.objects.filter(household=request.household)
-    return render(request, "finance/recurring_list.html", {"rules": rules})
+    template = "finance/partials/_recurring_table.html" if _is_htmx(request) else "finance/recurring_list.html"
+    return _paginated_list(
+        request,
+        rules,
+        ("description", "id"),
+        template,
+        "finance/partials/_recurring_rows.html",
+        {},
+        name="rules",
+    )
 
 
 @login_required
@@ -953,16 +1051,16 @@ def recurring_create(request):
             rule.save()
             generate_recurring_instances(rule, months_ahead)
             messages.success(request, "Recorrência criada.")
-            rules = RecurringRule.objects.filter(household=request.household)
-            return _render_partial(
+            return _render_row(
                 request,
-                "finance/partials/_recurring_table.html",
-                {"rules": rules},
+                "finance/partials/_recurring_row.html",
+                {"rule": rule},
+                insert_into="recurring-rows",
                 trigger={"closeModal": True, "dashboard:refresh": True},
             )
     else:
         form = RecurringRuleForm(household=request.household)
-    return render(
+    return _render_form(
         request,
         "finance/partials/_recurring_form.html",
         {"form": form, "months_ahead": months_ahead},
@@ -978,16 +1076,15 @@ def recurring_edit(request, pk):
         if form.is_valid():
             form.save()
             messages.success(request, "Recorrência atualizada.")
-            rules = RecurringRule.objects.filter(household=request.household)
-            return _render_partial(
+            return _render_row(
                 request,
-                "finance/partials/_recurring_table.html",
-                {"rules": rules},
+                "finance/partials/_recurring_row.html",
+                {"rule": rule},
                 trigger={"closeModal": True},
             )
     else:
         form = RecurringRuleForm(instance=rule, household=request.household)
-    return render(request, "finance/partials/_recurring_form.html", {"form": form, "rule": rule})
+    return _render_form(request, "finance/partials/_recurring_form.html", {"form": form, "rule": rule})
 
 
 @login_required
@@ -996,8 +1093,7 @@ def recurring_delete(request, pk):
     rule = get_object_or_404(RecurringRule, pk=pk, household=request.household)
     rule.delete()
     messages.success(request, "Recorrência removida.")
-    rules = RecurringRule.objects.filter(household=request.household)
-    return _render_partial(request, "finance/partials/_recurring_table.html", {"rules": rules})
+    return _render_row_removal(request, f"recurring-{pk}")
 
 
 @login_required
@@ -1007,8 +1103,7 @@ def recurring_generate(request, pk):
     months_ahead = int(request.POST.get("months_ahead", 3) or 3)
     generate_recurring_instances(rule, months_ahead)
     messages.success(request, "Instâncias geradas.")
-    rules = RecurringRule.objects.filter(household=request.household)
-    return _render_partial(request, "finance/partials/_recurring_table.html", {"rules": rules})
+    return _render_row(request, "finance/partials/_recurring_row.html", {"rule": rule})
 
 
 @login_required
@@ -1030,6 +1125,7 @@ def recurring_instances(request):
 def recurring_instance_pay(request, pk):
     instance = get_object_or_404(RecurringInstance, pk=pk, household=request.household)
     instance = pay_recurring_instance(instance)
+    invalidate_net_worth(request.household)
     messages.success(request, "Recorrência paga.")
     return _render_partial(
         request,
@@ -1130,12 +1226,14 @@ def import_parse(request):
         messages.error(request, "Selecione um cartão para importar.")
         return render(request, "finance/import_start.html", {"form": form})
 
-    parsed_items = parse_statement_text(
-        source_text,
-        statement_year=statement_year,
-        statement_month=statement_month,
-        closing_day=card.closing_day,
-    )
+    with IMPORT_DURATION.time(stage="parse"):
+        parsed_items = parse_statement_text(
+            source_text,
+            statement_year=statement_year,
+            statement_month=statement_month,
+            closing_day=card.closing_day,
+        )
+    IMPORT_ITEMS.inc(len(parsed_items), stage="parse")
 
     print(f"[PARSE] itens parseados: {len(parsed_items)}")
 
@@ -1267,6 +1365,7 @@ def import_review(request, pk):
 @login_required
 @require_http_methods(["POST"])
 def import_confirm(request, pk):
+    started = time.perf_counter()
     batch = get_object_or_404(ImportBatch, pk=pk, household=request.household)
 
     print("\n[IMPORT_CONFIRM] ===============================")
@@ -1450,6 +1549,9 @@ def import_confirm(request, pk):
         print("[IMPORT_CONFIRM] batch confirmado:", batch.id)
 
     print("[IMPORT_CONFIRM] FIM TRANSACTION")
+    invalidate_net_worth(request.household)
+    IMPORT_DURATION.observe(time.perf_counter() - started, stage="confirm")
+    IMPORT_ITEMS.inc(created_installments_count, stage="confirm")
 
     messages.success(
         request,
@@ -1479,21 +1581,22 @@ def import_cancel(request, pk):
 
 
 
-def _investment_summary_context(request, year):
-    snapshots = list(get_investment_snapshots(request.household, year))
-    accounts = InvestmentAccount.objects.filter(household=request.household).order_by("name")
+def _investment_summary_context(request, year, data=None):
+    data = data or load_investment_data(request.household, year)
+    snapshots = data.snapshots
+    accounts = data.accounts
     month_names = _month_names()
-    monthly_totals = compute_monthly_totals(snapshots)
-    deltas = compute_mom_deltas(monthly_totals)
-    account_series = compute_account_series(snapshots)
+    series = investment_series(request.household, date(year, 1, 1), date(year, 12, 1))
+    monthly_totals = series.totals
+    deltas = series.monthly_deltas()
 
     account_trends = []
     for account in accounts:
-        series = account_series.get(account.id, [Decimal("0.00") for _ in range(12)])
+        balances = series.balances.get(account.id, [None] * 12)
         account_trends.append(
             {
                 "label": account.name,
-                "data": [float(value) for value in series],
+                "data": [float(value) if value is not None else None for value in balances],
             }
         )
 
@@ -1510,12 +1613,7 @@ def _investment_summary_context(request, year):
                 delta_pct = None
             else:
                 delta_abs = snapshot.balance - previous_balance
-                if previous_balance == 0 and snapshot.balance == 0:
-                    delta_pct = Decimal("0.00")
-                elif previous_balance == 0 and snapshot.balance != 0:
-                    delta_pct = None
-                else:
-                    delta_pct = (delta_abs / previous_balance) * Decimal("100.00")
+                delta_pct = percent_change(previous_balance, snapshot.balance)
             account_rows.append(
                 {
                     "account": account,
@@ -1527,7 +1625,7 @@ def _investment_summary_context(request, year):
             previous_balance = snapshot.balance
 
     monthly_rows = []
-    for delta in deltas:
+    for delta, yoy_pct in zip(deltas, series.yoy_pct):
         monthly_rows.append(
             {
                 "month": delta.month,
@@ -1535,6 +1633,7 @@ def _investment_summary_context(request, year):
                 "total": delta.total,
                 "delta_abs": delta.delta_abs,
                 "delta_pct": delta.delta_pct,
+                "yoy_pct": yoy_pct,
             }
         )
 
@@ -1543,6 +1642,8 @@ def _investment_summary_context(request, year):
         "month_names": month_names,
         "monthly_totals": monthly_totals,
         "monthly_deltas": deltas,
+        "cagr": series.cagr,
+        "max_drawdown": series.max_drawdown,
         "monthly_rows": monthly_rows,
         "account_rows": account_rows,
         "total_chart": {
@@ -1567,50 +1668,12 @@ def _investment_summary_context(request, year):
 def investments_list(request):
     today = timezone.localdate()
     year = int(request.GET.get("year", today.year))
-    current_year = today.year
-    current_month = today.month
-    previous_month = 12 if current_month == 1 else current_month - 1
-    previous_year = current_year - 1 if current_month == 1 else current_year
-
-    accounts = InvestmentAccount.objects.filter(household=request.household).order_by("name")
-    account_overview = []
-    for account in accounts:
-        current_snapshot = InvestmentSnapshot.objects.filter(
-            household=request.household,
-            account=account,
-            year=current_year,
-            month=current_month,
-        ).first()
-        previous_snapshot = InvestmentSnapshot.objects.filter(
-            household=request.household,
-            account=account,
-            year=previous_year,
-            month=previous_month,
-        ).first()
-        delta_abs = None
-        delta_pct = None
-        if current_snapshot and previous_snapshot:
-            delta_abs = current_snapshot.balance - previous_snapshot.balance
-            if previous_snapshot.balance == 0 and current_snapshot.balance == 0:
-                delta_pct = Decimal("0.00")
-            elif previous_snapshot.balance == 0 and current_snapshot.balance != 0:
-                delta_pct = None
-            else:
-                delta_pct = (delta_abs / previous_snapshot.balance) * Decimal("100.00")
-        account_overview.append(
-            {
-                "account": account,
-                "current_snapshot": current_snapshot,
-                "previous_snapshot": previous_snapshot,
-                "delta_abs": delta_abs,
-                "delta_pct": delta_pct,
-            }
-        )
+    data = load_investment_data(request.household, year, today=today)
 
-    summary_context = _investment_summary_context(request, year)
+    summary_context = _investment_summary_context(request, year, data=data)
     context = {
-        "accounts": accounts,
-        "account_overview": account_overview,
+        "accounts": data.accounts,
+        "account_overview": data.overview,
         "year": year,
         "year_options": _year_options(year),
         **summary_context,
@@ -1676,6 +1739,7 @@ def investment_account_edit(request, pk):
 def investment_account_delete(request, pk):
     account = get_object_or_404(InvestmentAccount, pk=pk, household=request.household)
     account.delete()
+    invalidate_investment_series(request.household)
     accounts = InvestmentAccount.objects.filter(household=request.household).order_by("name")
     return _render_partial(
         request,
@@ -1706,6 +1770,7 @@ def investment_snapshot_create(request):
             snapshot.household = request.household
             snapshot.created_by = request.user
             snapshot.save()
+            invalidate_investment_series(request.household)
             return _render_partial(
                 request,
                 "finance/partials/_investments_summary.html",
@@ -1721,6 +1786,74 @@ def investment_snapshot_create(request):
     )
 
 
+def _snapshot_grid_rows(accounts, values, errors):
+    rows = []
+    for account in accounts:
+        cells = []
+        for month in range(1, 13):
+            name = f"balance-{account.id}-{month}"
+            cells.append({"name": name, "value": values.get(name, ""), "error": errors.get(name)})
+        rows.append({"account": account, "cells": cells})
+    return rows
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def investment_snapshot_grid(request):
+    year = int(request.POST.get("year", request.GET.get("year", timezone.localdate().year)))
+    accounts = list(
+        InvestmentAccount.objects.filter(household=request.household, active=True).order_by("name")
+    )
+    errors = {}
+    if request.method == "POST":
+        values = {}
+        snapshots = []
+        for account in accounts:
+            for month in range(1, 13):
+                name = f"balance-{account.id}-{month}"
+                raw = request.POST.get(name, "").strip()
+                values[name] = raw
+                if not raw:
+                    continue
+                form = InvestmentSnapshotGridCellForm(
+                    {"year": year, "month": month, "balance": raw}, household=request.household
+                )
+                if not form.is_valid():
+                    errors[name] = " ".join(error for field_errors in form.errors.values() for error in field_errors)
+                    continue
+                snapshot = form.save(commit=False)
+                snapshot.household = request.household
+                snapshot.account = account
+                snapshot.created_by = request.user
+                snapshots.append(snapshot)
+        if not errors:
+            upsert_investment_snapshots(snapshots)
+            invalidate_investment_series(request.household)
+            return _render_partial(
+                request,
+                "finance/partials/_investments_summary.html",
+                _investment_summary_context(request, year),
+                trigger={"closeModal": True},
+            )
+    else:
+        values = {
+            f"balance-{account_id}-{month}": balance
+            for account_id, month, balance in InvestmentSnapshot.objects.filter(
+                household=request.household, year=year, account__in=accounts
+            ).values_list("account_id", "month", "balance")
+        }
+    return _render_form(
+        request,
+        "finance/partials/_investment_snapshot_grid.html",
+        {
+            "year": year,
+            "rows": _snapshot_grid_rows(accounts, values, errors),
+            "month_names": _month_names(),
+            "has_errors": bool(errors),
+        },
+    )
+
+
 @login_required
 @require_http_methods(["GET", "POST"])
 def investment_snapshot_edit(request, pk):
@@ -1730,6 +1863,7 @@ def investment_snapshot_edit(request, pk):
         form = InvestmentSnapshotForm(request.POST, instance=snapshot, household=request.household)
         if form.is_valid():
             form.save()
+            invalidate_investment_series(request.household)
             return _render_partial(
                 request,
                 "finance/partials/_investments_summary.html",
@@ -1751,6 +1885,7 @@ def investment_snapshot_delete(request, pk):
     snapshot = get_object_or_404(InvestmentSnapshot, pk=pk, household=request.household)
     summary_year = request.POST.get("summary_year", snapshot.year)
     snapshot.delete()
+    invalidate_investment_series(request.household)
     return _render_partial(
         request,
         "finance/partials/_investments_summary.html",
@@ -1759,7 +1894,10 @@ def investment_snapshot_delete(request, pk):
 
 
 def _annual_stats_context(request, year):
-    entries = LedgerEntry.objects.filter(household=request.household, date__year=year)
+    year_start, next_year = date(year, 1, 1), date(year + 1, 1, 1)
+    entries = LedgerEntry.objects.filter(
+        household=request.household, date__gte=year_start, date__lt=next_year
+    )
     decimal_output = models.DecimalField(max_digits=12, decimal_places=2)
     income_total = entries.filter(kind=LedgerEntry.Kind.INCOME).aggregate(
         total=Coalesce(Sum("amount"), Decimal("0.00"), output_field=decimal_output)
@@ -1794,16 +1932,18 @@ def _annual_stats_context(request, year):
         .order_by("-total")
     )
     purchase_groups = list(
-        Installment.objects.filter(household=request.household, due_date__year=year)
+        Installment.objects.filter(
+            household=request.household, due_date__gte=year_start, due_date__lt=next_year
+        )
         .values("group__description")
         .annotate(total=Coalesce(Sum("amount"), Decimal("0.00"), output_field=decimal_output))
         .order_by("-total")
     )
 
-    snapshots = list(get_investment_snapshots(request.household, year))
+    series = investment_series(request.household, date(year, 1, 1), date(year, 12, 1))
     month_names = _month_names()
-    monthly_totals = compute_monthly_totals(snapshots)
-    monthly_deltas = compute_mom_deltas(monthly_totals)
+    monthly_totals = series.totals
+    monthly_deltas = series.monthly_deltas()
     investment_monthly_rows = [
         {
             "month": delta.month,
@@ -1814,19 +1954,14 @@ def _annual_stats_context(request, year):
         }
         for delta in monthly_deltas
     ]
-    months_with_data = {snapshot.month for snapshot in snapshots}
+    months_with_data = {month.month for month, seen in zip(series.months, series.observed) if seen}
     if months_with_data:
         start_month = min(months_with_data)
         end_month = max(months_with_data)
         start_total = monthly_totals[start_month - 1]
         end_total = monthly_totals[end_month - 1]
         delta_abs = end_total - start_total
-        if start_total == 0 and end_total == 0:
-            delta_pct = Decimal("0.00")
-        elif start_total == 0 and end_total != 0:
-            delta_pct = None
-        else:
-            delta_pct = (delta_abs / start_total) * Decimal("100.00")
+        delta_pct = percent_change(start_total, end_total)
     else:
         start_month = None
         end_month = None
@@ -1895,6 +2030,75 @@ def annual_stats(request):
     return render(request, "finance/annual_stats.html", context)
 
 
+NET_WORTH_MAX_MONTHS = 240
+
+
+def _parse_month(value):
+    try:
+        return date.fromisoformat(f"{value}-01")
+    except (TypeError, ValueError):
+        return None
+
+
+def _net_worth_range(request):
+    # Meses no formato do <input type="month"> (AAAA-MM); padrão: últimos 12 meses.
+    end = _parse_month(request.GET.get("end")) or timezone.localdate().replace(day=1)
+    start = _parse_month(request.GET.get("start")) or add_months(end, -11)
+    if start > end:
+        start, end = end, start
+    return max(start, add_months(end, -(NET_WORTH_MAX_MONTHS - 1))), end
+
+
+@login_required
+def net_worth(request):
+    start, end = _net_worth_range(request)
+    series = net_worth_series(request.household, start, end)
+    accounts = {account.id: account.name for account in Account.objects.filter(household=request.household)}
+    rows = [
+        {
+            "month": month,
+            "investments": investments,
+            "cash": cash,
+            "liabilities": liabilities,
+            "net_worth": total,
+        }
+        for month, investments, cash, liabilities, total in zip(
+            series.months, series.investments, series.cash, series.liabilities, series.net_worth
+        )
+    ]
+    account_rows = sorted(
+        (
+            {"name": accounts.get(account_id, "Sem conta"), "balance": balances[-1]}
+            for account_id, balances in series.accounts.items()
+        ),
+        key=lambda row: row["name"],
+    )
+    context = {
+        "start": start,
+        "end": end,
+        "rows": rows,
+        "latest": rows[-1],
+        "change": rows[-1]["net_worth"] - rows[0]["net_worth"],
+        "account_rows": account_rows,
+    }
+    return render(request, "finance/net_worth.html", context)
+
+
+@login_required
+def net_worth_data(request):
+    start, end = _net_worth_range(request)
+    series = net_worth_series(request.household, start, end)
+    return JsonResponse(
+        {
+            "labels": [month.strftime("%m/%Y") for month in series.months],
+            "investments": [float(value) for value in series.investments],
+            "cash": [float(value) for value in series.cash],
+            "liabilities": [float(value) for value in series.liabilities],
+            "net_worth": [float(value) for value in series.net_worth],
+        }
+    )
+
+
 @login_required
 def annual_stats_summary(request):
     year = int(request.GET.get("year"))
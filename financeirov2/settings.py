@@ -49,10 +49,11 @@ LOGIN_REDIRECT_URL = "dashboard"
 
 # ------------------------------------------------------------------------------
 # Twilio / Finance bot configuration
-# - `TWILIO_ALLOWED_NUMBERS` should contain international phone numbers
-#   (no 'whatsapp:' prefix) allowed to register expenses via the Twilio bot.
-# - `FINANCE_BOT_USER_ID` is the numeric id of the user that will be used
-#   as owner/creator for expenses created by the bot.
+# - Numbers are mapped to users and households with `BotIdentity` (admin).
+# - Fallback for numbers without an identity: `TWILIO_ALLOWED_NUMBERS` should
+#   contain international phone numbers (no 'whatsapp:' prefix) allowed to
+#   register expenses via the Twilio bot, and `FINANCE_BOT_USER_ID` is the
+#   numeric id of the user that will own the expenses they create.
 # You can override these in environment-specific .env files if needed.
 TWILIO_ALLOWED_NUMBERS = os.getenv("TWILIO_ALLOWED_NUMBERS")
 if TWILIO_ALLOWED_NUMBERS:
@@ -64,6 +65,60 @@ else:
 
 FINANCE_BOT_USER_ID = int(os.getenv("FINANCE_BOT_USER_ID") or 3)
 
+# - With TWILIO_WEBHOOK_ASYNC the webhook stores each message once per MessageSid,
+#   acks with an empty TwiML at once and a local worker thread processes it,
+#   replying through the Twilio REST API (retried deliveries become no-ops).
+#   Messages left pending by a restart: `manage.py process_webhook_messages`.
+TWILIO_WEBHOOK_ASYNC = os.getenv("TWILIO_WEBHOOK_ASYNC", "False").lower() == "true"
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
+TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM", "")
+TWILIO_REPLY_BACKEND = os.getenv("TWILIO_REPLY_BACKEND", "core.webhook_worker.TwilioReplyBackend")
+
+# ------------------------------------------------------------------------------
+# Performance budgets
+# - Requests above either budget get flagged in the Server-Timing header,
+#   in the per-route stats on the system logs page and in the app log.
+PERF_QUERY_BUDGET = int(os.getenv("PERF_QUERY_BUDGET") or 40)
+PERF_TIME_BUDGET_MS = int(os.getenv("PERF_TIME_BUDGET_MS") or 800)
+# Queries slower than this are saved as PERF system logs (one entry per SQL
+# fingerprint); SLOW_QUERY_EXPLAIN also stores the query plan.
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv("SLOW_QUERY_THRESHOLD_MS") or 200)
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "False").lower() == "true"
+
+# ------------------------------------------------------------------------------
+# Metrics (/metrics, Prometheus text format)
+# - Each worker writes its counters to METRICS_DIR; the view sums all files.
+# - Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`;
+#   logged-in household owners can open the page without it.
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# ------------------------------------------------------------------------------
+# System logs
+# - Buffered by default in production: records are written in batches by a
+#   background thread, and spooled to SYSTEM_LOG_SPOOL_DIR if the database is
+#   down (import later with `manage.py ingest_system_log_spool`).
+SYSTEM_LOG_BUFFERED = os.getenv("SYSTEM_LOG_BUFFERED", str(ENVIRONMENT == "production")).lower() == "true"
+SYSTEM_LOG_SPOOL_DIR = os.getenv("SYSTEM_LOG_SPOOL_DIR") or None
+# - Frontend errors are accepted in batches and limited per session/IP with a
+#   token bucket: FRONTEND_LOG_BURST distinct errors at once, refilled at
+#   FRONTEND_LOG_RATE_PER_MINUTE.
+FRONTEND_LOG_BURST = int(os.getenv("FRONTEND_LOG_BURST") or 30)
+FRONTEND_LOG_RATE_PER_MINUTE = int(os.getenv("FRONTEND_LOG_RATE_PER_MINUTE") or 30)
+# - Anonymous clients are keyed by IP. Behind the Heroku router REMOTE_ADDR is the
+#   router's; the client IP is the entry the router appends to X-Forwarded-For.
+#   TRUSTED_PROXY_HOPS is how many proxies append to that header (0 = use REMOTE_ADDR).
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS") or (1 if ENVIRONMENT == "production" else 0))
+# - Retention per level, in days since the log was last seen. `cleanup_system_logs`
+#   deletes expired rows in small chunks and keeps daily counts of what it removed.
+SYSTEM_LOG_RETENTION_DAYS = {
+    "INFO": int(os.getenv("SYSTEM_LOG_RETENTION_INFO_DAYS") or 7),
+    "AVISO": int(os.getenv("SYSTEM_LOG_RETENTION_AVISO_DAYS") or 30),
+    "PERF": int(os.getenv("SYSTEM_LOG_RETENTION_PERF_DAYS") or 30),
+    "ERRO": int(os.getenv("SYSTEM_LOG_RETENTION_ERRO_DAYS") or 180),
+}
+
 # ==============================================================================
 # DATABASE
 # ==============================================================================
@@ -84,6 +139,21 @@ else:
         )
     }
 
+# ==============================================================================
+# CACHE
+# ==============================================================================
+# Per-process memory cache by default. With several gunicorn workers, point
+# CACHE_BACKEND/CACHE_LOCATION at a shared backend (Redis, Memcached): the bot's
+# conversation state lives in the cache and its per-month lists rely on atomic
+# incr/decr.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
 # ==============================================================================
 # APPS
 # ==============================================================================
@@ -115,6 +185,7 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
 
+    "core.middleware.PerformanceMiddleware",
     "core.middleware.HouseholdMiddleware",
     "core.middleware.SystemLogMiddleware",
 
@@ -130,7 +201,7 @@ ROOT_URLCONF = "financeirov2.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.perf.TimedDjangoTemplates",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {